@@ -69,7 +69,12 @@ INSTALLED_APPS = DJANGO_APPS + LOCAL_APPS + THIRD_PARTY_APPS
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "core.authentication.CachedJWTAuthentication",
+    ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "common.renderers.ORJSONRenderer",
+        "common.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
     ),
     "DEFAULT_FILTER_BACKENDS": (
         "django_filters.rest_framework.DjangoFilterBackend",
@@ -154,15 +159,77 @@ WSGI_APPLICATION = 'Bangla.wsgi.application'
 
 ASGI_APPLICATION = "Bangla.asgi.application"
 
+TEST_RUNNER = "common.runner.TestRunner"
+
+REDIS_URL = config("REDIS_URL", default="redis://127.0.0.1:6379")
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
         "CONFIG": {
-            "hosts": ["redis://127.0.0.1:6379"],
+            "hosts": [REDIS_URL],
         },
     },
 }
 
+# Generation counters, the feed and category caches, cached users and recently blacklisted tokens
+# must be seen by every process serving the site, so the cache lives in Redis
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+        "KEY_PREFIX": "adconnect",
+    },
+}
+
+# Seconds a process keeps its category tree when the cache is not shared and cannot tell it about changes
+CATEGORY_TREE_MAX_AGE = 60
+
+# Ad view and impression counters are buffered in memory and flushed to the database every N seconds
+AD_COUNTER_FLUSH_INTERVAL = 5
+
+# Trending ads: each signal decays exponentially with this half-life
+AD_TRENDING_HALF_LIFE = timedelta(hours=24)
+
+AD_TRENDING_WEIGHTS = {
+    "views": 1.0,
+    "favourites": 5.0,
+    "chats": 10.0,
+}
+
+# Number of "similar listings" precomputed per ad
+AD_SIMILAR_COUNT = 10
+
+# Ads whose description is at least this similar (estimated Jaccard) to an existing ad are held for review
+AD_DUPLICATE_THRESHOLD = 0.8
+# Each serving process loads the duplicate index in the background when its first request starts
+AD_DUPLICATE_INDEX_PRELOAD = True
+
+# Images whose perceptual hashes differ in at most this many bits are treated as the same picture
+IMAGE_DUPLICATE_DISTANCE = 4
+
+# Active ads are hidden (put back to Pending) once they collect this many reports
+AD_REPORT_HIDE_THRESHOLD = 5
+
+# Ads fetched per query (with one image query per batch) by the streaming ad export
+AD_EXPORT_CHUNK_SIZE = 2000
+
+# Seconds a JWT-authenticated user (and profile) is served from the cache before being reloaded
+AUTH_USER_CACHE_TTL = 60
+
+# Seconds between rebuilds of each process's Bloom filter of blacklisted refresh token JTIs, and its target
+# false-positive rate (a false positive costs one blacklist table lookup)
+TOKEN_BLACKLIST_FILTER_TTL = 300
+TOKEN_BLACKLIST_FILTER_ERROR_RATE = 0.01
+# Stale filters are rebuilt from a background thread rather than by the request that finds them
+TOKEN_BLACKLIST_FILTER_REBUILD_IN_BACKGROUND = True
+
+# Rows deleted per transaction by background account deletion jobs
+ACCOUNT_DELETION_CHUNK_SIZE = 500
+
+# Unfiltered admin changelists of tables larger than this paginate on the planner's row estimate
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100000
+
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
@@ -181,6 +248,17 @@ DATABASES = {
 #     )
 # }
 
+# Password hashing
+# New hashes use Argon2; stored hashes of the other algorithms are upgraded the next time their user logs in
+
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
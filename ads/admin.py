@@ -1,12 +1,15 @@
 from urllib.parse import urlencode
 
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.admin import TabularInline, StackedInline
-from django.db.models import Count
+from django.db.models import OuterRef
 from django.urls import reverse
 from django.utils.html import format_html
 
 from ads.models import Ad, AdCategory, AdImage, AdReport, AdSubCategory
+from ads.moderation import MODERATION_APPROVE, MODERATION_DENY, MODERATION_FEATURE, MODERATION_PAUSE, \
+    MODERATION_UNFEATURE, moderate_ads
+from common.admin import PerformantAdminMixin, SubqueryCount
 
 
 # Register your models here.
@@ -17,15 +20,65 @@ class AdImageAdmin(TabularInline):
     max_num = 3
 
 
+class SuspectedDuplicateFilter(admin.SimpleListFilter):
+    title = "suspected duplicate"
+    parameter_name = "duplicate"
+
+    def lookups(self, request, model_admin):
+        return (("yes", "Yes"), ("no", "No"))
+
+    def queryset(self, request, queryset):
+        if self.value() == "yes":
+            return queryset.filter(fingerprint__duplicate_of__isnull=False)
+        if self.value() == "no":
+            return queryset.exclude(fingerprint__duplicate_of__isnull=False)
+        return queryset
+
+
 @admin.register(Ad)
-class AdAdmin(admin.ModelAdmin):
+class AdAdmin(PerformantAdminMixin, admin.ModelAdmin):
     inlines = (AdImageAdmin,)
-    list_display = ('name', 'ad_creator', 'price', 'category', 'location', 'featured', 'is_approved')
-    list_editable = ('featured', 'is_approved',)
-    list_filter = ('name', 'price', 'category', 'location')
+    list_display = ('name', 'ad_creator', 'price', 'category', 'location', 'featured', 'is_approved', 'report_count',
+                    'duplicate_of')
+    list_filter = ('category', 'status', 'is_approved', 'featured', SuspectedDuplicateFilter)
+    list_select_related = ('ad_creator', 'category', 'fingerprint__duplicate_of')
     list_per_page = 20
     ordering = ('name', 'category', 'ad_creator')
-    search_fields = ('title', 'category__title')
+    search_fields = ('name', 'category__title')
+    actions = ('approve_ads', 'feature_ads', 'unfeature_ads', 'pause_ads', 'deny_ads')
+
+    @admin.display(description="Duplicate of")
+    def duplicate_of(self, ad):
+        fingerprint = getattr(ad, "fingerprint", None)
+        if fingerprint is None or fingerprint.duplicate_of is None:
+            return "-"
+        url = reverse("admin:ads_ad_change", args=[fingerprint.duplicate_of_id])
+        return format_html('<a href="{}">{}</a>', url, fingerprint.duplicate_of)
+
+    # Each action is a single UPDATE over the selection instead of a save() per row
+    def moderate(self, request, queryset, action, verb):
+        updated = moderate_ads(queryset, action)
+        self.message_user(request, f"{updated} ads {verb}.", messages.SUCCESS)
+
+    @admin.action(description="Approve selected ads", permissions=["change"])
+    def approve_ads(self, request, queryset):
+        self.moderate(request, queryset, MODERATION_APPROVE, "approved")
+
+    @admin.action(description="Feature selected ads", permissions=["change"])
+    def feature_ads(self, request, queryset):
+        self.moderate(request, queryset, MODERATION_FEATURE, "featured")
+
+    @admin.action(description="Unfeature selected ads", permissions=["change"])
+    def unfeature_ads(self, request, queryset):
+        self.moderate(request, queryset, MODERATION_UNFEATURE, "unfeatured")
+
+    @admin.action(description="Pause selected ads", permissions=["change"])
+    def pause_ads(self, request, queryset):
+        self.moderate(request, queryset, MODERATION_PAUSE, "paused")
+
+    @admin.action(description="Deny selected ads", permissions=["change"])
+    def deny_ads(self, request, queryset):
+        self.moderate(request, queryset, MODERATION_DENY, "denied")
 
 
 class AdSubCategoryAdmin(TabularInline):
@@ -34,13 +87,14 @@ class AdSubCategoryAdmin(TabularInline):
 
 
 @admin.register(AdCategory)
-class AdCategoryAdmin(admin.ModelAdmin):
+class AdCategoryAdmin(PerformantAdminMixin, admin.ModelAdmin):
     inlines = (AdSubCategoryAdmin,)
     list_display = ('title', 'ads_count', 'sub_categories_count',)
     list_filter = ('title',)
     list_per_page = 20
     ordering = ('title',)
     search_fields = ('title',)
+    prefix_search_fields = ('title',)
 
     @admin.display(ordering="ads_count")
     def ads_count(self, category):
@@ -57,15 +111,16 @@ class AdCategoryAdmin(admin.ModelAdmin):
 
     def get_queryset(self, request):
         queryset = super().get_queryset(request).annotate(
-                ads_count=Count("ads"),
-                sub_categories_count=Count("sub_categories")
+                ads_count=SubqueryCount(Ad.objects.filter(category=OuterRef("pk")).values("id")),
+                sub_categories_count=SubqueryCount(AdSubCategory.objects.filter(category=OuterRef("pk")).values("id"))
         )
         return queryset
 
 
 @admin.register(AdReport)
-class AdReport(admin.ModelAdmin):
+class AdReport(PerformantAdminMixin, admin.ModelAdmin):
     list_display = ('ad_name', 'reporter_email', 'report')
+    list_select_related = ('ad', 'reporter')
     list_per_page = 30
 
     def has_add_permission(self, request):
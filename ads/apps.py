@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class AdsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "ads"
+
+    def ready(self):
+        from django.core.signals import request_started
+
+        from ads import signals
+        from ads.duplicates import ad_duplicates
+
+        # Warmed by the first request rather than here, so management commands never load it
+        request_started.connect(ad_duplicates.preload)
@@ -0,0 +1,81 @@
+import time
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from ads.choices import STATUS_ACTIVE
+from ads.models import Ad, AdCategory, AdImage, AdSubCategory
+from common.cache import cache_is_shared
+
+FEED_GENERATION_KEY = "ads:feed:generation"
+FEED_CACHE_TIMEOUT = 60 * 5
+
+
+def generation(key):
+    """
+    Current value of the generation counter stored under `key`. Entries keyed
+    by it are invalidated all at once by bumping it, without tracking their
+    keys. The initial value is time based so a generation evicted from the
+    cache never comes back lower than one that was already used.
+    """
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, time.time_ns(), None)
+        value = cache.get(key)
+    return value
+
+
+def bump_generation(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        return generation(key)
+
+
+def feed_generation():
+    """
+    Current generation of the cached ad feeds.
+    """
+    return generation(FEED_GENERATION_KEY)
+
+
+def bump_feed_generation():
+    return bump_generation(FEED_GENERATION_KEY)
+
+
+def feed_cache_key(*parts):
+    return ":".join(["ads:feed", str(feed_generation()), *map(str, parts)])
+
+
+def feed_version(request):
+    """
+    `conditional_get` validator for responses built only from ads, their
+    images and categories: the feed generation, with no query at all. A
+    generation in a per-process cache misses what other processes change, so
+    it then also carries aggregates over the feed's ads, their images and the
+    categories, as `category_catalog_version` does.
+    """
+    if cache_is_shared():
+        return feed_generation(), None
+
+    ads = Ad.objects.filter(is_approved=True, status=STATUS_ACTIVE)
+    versions = [queryset.aggregate(count=Count("id"), updated=Max("updated"))
+                for queryset in (ads, AdImage.objects.filter(ad__in=ads))]
+    parts = [f"{version['count']}.{version['updated'].timestamp() if version['updated'] else 0}"
+             for version in versions]
+    return ".".join([str(feed_generation()), *parts, category_catalog_version(request)[0]]), None
+
+
+def category_catalog_version(request):
+    """
+    `conditional_get` validator for the category tree: row counts catch
+    deletions and the latest `updated` catches edits and additions, all
+    from two aggregate queries. There is no Last-Modified: the latest
+    `updated` stays put when an older row is deleted, and HTTP dates drop
+    the sub-second edits the ETag still tells apart.
+    """
+    versions = [model.objects.aggregate(count=Count("id"), updated=Max("updated"))
+                for model in (AdCategory, AdSubCategory)]
+    last_modified = max((version["updated"] for version in versions if version["updated"]), default=None)
+    counts = ".".join(str(version["count"]) for version in versions)
+    return f"{counts}.{last_modified.timestamp() if last_modified else 0}", None
@@ -0,0 +1,135 @@
+import threading
+import time
+from types import MappingProxyType
+from typing import NamedTuple
+from uuid import UUID
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from ads.cache import bump_generation, generation
+from ads.models import AdCategory, AdSubCategory
+from common.cache import cache_is_shared
+
+CATEGORY_TREE_GENERATION_KEY = "ads:categories:generation"
+
+
+class SubCategoryNode(NamedTuple):
+    id: UUID
+    category_id: UUID
+    title: str
+
+
+class CategoryNode(NamedTuple):
+    id: UUID
+    title: str
+    image: str
+    sub_categories: tuple
+
+
+def _match(nodes, name):
+    """
+    The node titled `name` (ignoring case), else the only node whose title
+    contains it, as the `title__icontains` lookups this replaces did.
+    """
+    name = (name or "").strip().casefold()
+    if not name:
+        return None
+    exact = [node for node in nodes if node.title.casefold() == name]
+    if exact:
+        return exact[0]
+    partial = [node for node in nodes if name in node.title.casefold()]
+    return partial[0] if len(partial) == 1 else None
+
+
+class CategoryTree:
+    """
+    Immutable snapshot of every category and its sub-categories, newest
+    category first. It is never modified, only replaced, so readers need no
+    locking.
+    """
+
+    def __init__(self, categories):
+        self.categories = tuple(categories)
+        self._by_id = MappingProxyType({category.id: category for category in self.categories})
+        self._sub_categories_by_id = MappingProxyType({
+            sub_category.id: sub_category
+            for category in self.categories for sub_category in category.sub_categories
+        })
+
+    @classmethod
+    def load(cls):
+        sub_categories = {}
+        for row in AdSubCategory.objects.order_by('created').values('id', 'category_id', 'title'):
+            sub_categories.setdefault(row['category_id'], []).append(SubCategoryNode(**row))
+        return cls(
+            CategoryNode(sub_categories=tuple(sub_categories.get(row['id'], ())), **row)
+            for row in AdCategory.objects.order_by('-created').values('id', 'title', 'image')
+        )
+
+    def category(self, category_id):
+        return self._by_id.get(category_id)
+
+    def sub_category(self, sub_category_id):
+        return self._sub_categories_by_id.get(sub_category_id)
+
+    def resolve_category(self, name):
+        return _match(self.categories, name)
+
+    @staticmethod
+    def resolve_sub_category(category, name):
+        return _match(category.sub_categories, name)
+
+
+_tree_lock = threading.Lock()
+# (tree, generation it was loaded at, time.monotonic() when loaded)
+_loaded = None
+_local = threading.local()
+
+
+def _has_uncommitted_changes():
+    # True while the transaction in which this thread changed categories is still open
+    transaction_block = getattr(_local, "changed_in", None)
+    if transaction_block is None:
+        return False
+    if any(block is transaction_block for block in connection.atomic_blocks):
+        return True
+    _local.changed_in = None
+    return False
+
+
+def _is_current(loaded, current_generation):
+    if loaded is None or loaded[1] != current_generation:
+        return False
+    # A generation in a per-process cache is never bumped by other processes
+    return cache_is_shared() or time.monotonic() - loaded[2] < settings.CATEGORY_TREE_MAX_AGE
+
+
+def category_tree():
+    """
+    The current `CategoryTree`. Each process keeps one and checks it against a
+    generation in the shared cache, so a change committed by any process is
+    seen by all of them on their next read; without a shared cache, by the
+    time the tree is CATEGORY_TREE_MAX_AGE seconds old. A thread that changed
+    categories in a still open transaction gets a private tree with its own
+    changes.
+    """
+    global _loaded
+    if _has_uncommitted_changes():
+        return CategoryTree.load()
+
+    current = generation(CATEGORY_TREE_GENERATION_KEY)
+    loaded = _loaded
+    if _is_current(loaded, current):
+        return loaded[0]
+    with _tree_lock:
+        if not _is_current(_loaded, current):
+            _loaded = (CategoryTree.load(), current, time.monotonic())
+        return _loaded[0]
+
+
+def invalidate_category_tree():
+    if connection.in_atomic_block:
+        _local.changed_in = connection.atomic_blocks[0]
+    # Published once committed: other threads never see changes that may still be rolled back
+    transaction.on_commit(lambda: bump_generation(CATEGORY_TREE_GENERATION_KEY))
@@ -0,0 +1,125 @@
+import atexit
+import threading
+import warnings
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+
+from ads.models import Ad
+
+# Ads per UPDATE: each one costs a few bound parameters per counter, which keeps a statement under SQLite's limit
+COUNTER_FLUSH_BATCH_SIZE = 100
+# Pending ads that trigger a flush from the recording thread, whether or not a flusher thread runs
+COUNTER_MAX_PENDING = 5000
+
+
+class AdCounterBuffer:
+    """
+    Accumulates ad view and impression increments in memory and writes the
+    aggregated deltas to the database with one UPDATE per batch of
+    COUNTER_FLUSH_BATCH_SIZE ads, instead of one `views = views + 1`
+    statement per request.
+    """
+    fields = ("views", "impressions")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = self._empty()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _empty(self):
+        return {field: Counter() for field in self.fields}
+
+    def record_view(self, ad_id):
+        self.increment("views", [ad_id])
+
+    def record_impressions(self, ad_ids):
+        self.increment("impressions", ad_ids)
+
+    def increment(self, field, ad_ids):
+        with self._lock:
+            self._pending[field].update(str(ad_id) for ad_id in ad_ids)
+            full = max(len(deltas) for deltas in self._pending.values()) >= COUNTER_MAX_PENDING
+        self._ensure_started()
+        if full:
+            try:
+                self.flush()
+            except DatabaseError as e:
+                warnings.warn(f"Could not flush ad counters: {e}")
+
+    def pending(self, field, ad_id):
+        with self._lock:
+            return self._pending[field][str(ad_id)]
+
+    def flush(self):
+        """
+        Swap out the pending deltas and apply them in bulk UPDATEs.
+        Returns the number of ads updated.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, self._empty()
+
+        ad_ids = list(set().union(*pending.values()))
+        updated = 0
+        for start in range(0, len(ad_ids), COUNTER_FLUSH_BATCH_SIZE):
+            batch = ad_ids[start:start + COUNTER_FLUSH_BATCH_SIZE]
+            try:
+                updated += self._apply(pending, batch)
+            except DatabaseError:
+                # Put back the deltas of the batches not written, so the next flush retries them
+                unwritten = set(ad_ids[start:])
+                with self._lock:
+                    for field, deltas in pending.items():
+                        self._pending[field].update({ad_id: delta for ad_id, delta in deltas.items()
+                                                     if ad_id in unwritten})
+                raise
+        return updated
+
+    @staticmethod
+    def _apply(pending, ad_ids):
+        updates = {
+            field: F(field) + Case(
+                *[When(id=ad_id, then=Value(deltas[ad_id])) for ad_id in ad_ids if ad_id in deltas],
+                default=Value(0),
+                output_field=PositiveIntegerField(),
+            )
+            for field, deltas in pending.items() if any(ad_id in deltas for ad_id in ad_ids)
+        }
+        return Ad.objects.filter(id__in=ad_ids).update(**updates)
+
+    def _ensure_started(self):
+        interval = getattr(settings, "AD_COUNTER_FLUSH_INTERVAL", None)
+        if not interval or self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def _run(self, interval):
+        while not self._stopped.wait(interval):
+            try:
+                self.flush()
+            except DatabaseError as e:
+                warnings.warn(f"Could not flush ad counters: {e}")
+            finally:
+                connection.close()
+
+    def stop(self):
+        """
+        Stop the background flusher and write out whatever is still pending,
+        so counts survive a worker restart.
+        """
+        self._stopped.set()
+        try:
+            self.flush()
+        except DatabaseError as e:
+            warnings.warn(f"Could not flush ad counters on shutdown: {e}")
+
+
+ad_counters = AdCounterBuffer()
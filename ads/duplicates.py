@@ -0,0 +1,190 @@
+import re
+import threading
+import time
+import warnings
+import zlib
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import DatabaseError, connection
+
+from ads.models import Ad, AdFingerprint
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+# Refreshes re-read fingerprints this far behind the watermark: a transaction that commits after a later one
+# carries an older `updated`, which a strict `updated > watermark` would skip for good
+WATERMARK_OVERLAP = timedelta(minutes=1)
+
+
+def shingles(text, size=3):
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    if len(tokens) < size:
+        return set(tokens)
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures of word shingles with `num_perm` universal hash
+    functions. The seed is fixed so signatures stay comparable across processes.
+    """
+
+    def __init__(self, num_perm=128, seed=1):
+        generator = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = generator.randint(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.b = generator.randint(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        hashed = np.fromiter((zlib.crc32(s.encode()) for s in shingles(text)), dtype=np.uint64)
+        if not len(hashed):
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint32)
+        with np.errstate(over="ignore"):
+            permuted = np.bitwise_and((hashed[:, None] * self.a + self.b) % MERSENNE_PRIME, MAX_HASH)
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+class MinHashLSHIndex:
+    """
+    Locality-sensitive hashing over MinHash signatures: each signature is split
+    into `bands` bands of `rows` values, and two signatures become candidates
+    when any band matches exactly. Candidates are then confirmed against the
+    estimated Jaccard similarity.
+    """
+
+    def __init__(self, bands=16, rows=8):
+        self.bands = bands
+        self.rows = rows
+        self.buckets = [defaultdict(set) for _ in range(bands)]
+        self.signatures = {}
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, key, signature):
+        self.remove(key)
+        self.signatures[key] = signature
+        for bucket, band_key in zip(self.buckets, self._band_keys(signature)):
+            bucket[band_key].add(key)
+
+    def remove(self, key):
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        for bucket, band_key in zip(self.buckets, self._band_keys(signature)):
+            bucket[band_key].discard(key)
+            if not bucket[band_key]:
+                del bucket[band_key]
+
+    def query(self, signature, threshold, exclude=None):
+        """
+        Return `(key, similarity)` pairs at or above `threshold`, most similar first.
+        """
+        candidates = set()
+        for bucket, band_key in zip(self.buckets, self._band_keys(signature)):
+            candidates |= bucket.get(band_key, set())
+        candidates.discard(exclude)
+        matches = [(key, float(np.mean(self.signatures[key] == signature))) for key in candidates]
+        return sorted((match for match in matches if match[1] >= threshold), key=lambda match: -match[1])
+
+
+class AdDuplicateDetector:
+    """
+    Process-wide LSH index of ad descriptions. Signatures are persisted in
+    `AdFingerprint`, loaded by `preload()` when the process serves its first
+    request (or on first use), and topped up with fingerprints other workers
+    have written at most every `refresh_interval` seconds.
+    """
+
+    def __init__(self, refresh_interval=5):
+        self.hasher = MinHasher()
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._index = None
+        self._watermark = None
+        self._refreshed_at = 0
+
+    def load(self):
+        with self._lock:
+            self._index = MinHashLSHIndex()
+            self._watermark = None
+            self._load_since(None)
+
+    def preload(self, **kwargs):
+        """
+        Load the index from a background thread, off the request path. A
+        `request_started` receiver, so only processes serving requests load it.
+        """
+        if not settings.AD_DUPLICATE_INDEX_PRELOAD:
+            return
+        request_started.disconnect(self.preload)
+        threading.Thread(target=self._preload, daemon=True).start()
+
+    def _preload(self):
+        try:
+            if self._index is None:
+                self.load()
+        except DatabaseError as e:
+            warnings.warn(f"Could not load the ad duplicate index: {e}")
+        finally:
+            connection.close()
+
+    def _load_since(self, watermark):
+        fingerprints = AdFingerprint.objects.order_by('updated').values_list('ad_id', 'signature', 'updated')
+        if watermark is not None:
+            fingerprints = fingerprints.filter(updated__gte=watermark - WATERMARK_OVERLAP)
+        for ad_id, signature, updated in fingerprints.iterator():
+            self._index.add(ad_id, np.frombuffer(bytes(signature), dtype=np.uint32))
+            self._watermark = max(updated, self._watermark or updated)
+        self._refreshed_at = time.monotonic()
+
+    def _refresh(self):
+        if self._index is None:
+            self.load()
+        elif time.monotonic() - self._refreshed_at >= self.refresh_interval:
+            with self._lock:
+                self._load_since(self._watermark)
+
+    def find_duplicates(self, text, exclude=None):
+        return self._query(self.hasher.signature(text), exclude)
+
+    def _query(self, signature, exclude):
+        self._refresh()
+        with self._lock:
+            matches = self._index.query(signature, settings.AD_DUPLICATE_THRESHOLD, exclude=exclude)
+        if not matches:
+            return matches
+
+        # Deleted ads linger in other workers' indexes until they reload, drop them here
+        existing = set(Ad.objects.filter(id__in=[key for key, _ in matches]).values_list('id', flat=True))
+        with self._lock:
+            for key, _ in matches:
+                if key not in existing:
+                    self._index.remove(key)
+        return [match for match in matches if match[0] in existing]
+
+    def register(self, ad: Ad):
+        """
+        Fingerprint `ad`, persist it and return the id of the closest existing
+        near-duplicate, or None.
+        """
+        signature = self.hasher.signature(ad.description)
+        matches = self._query(signature, exclude=ad.id)
+        duplicate_of = matches[0][0] if matches else None
+        AdFingerprint.objects.update_or_create(
+                ad=ad, defaults={"signature": signature.tobytes(), "duplicate_of_id": duplicate_of}
+        )
+        with self._lock:
+            self._index.add(ad.id, signature)
+        return duplicate_of
+
+
+ad_duplicates = AdDuplicateDetector()
@@ -0,0 +1,90 @@
+import csv
+import json
+import tempfile
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from ads.choices import STATUS_ACTIVE
+from ads.models import Ad, AdImage
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_FIELDS = ("id", "name", "description", "price", "location", "category", "sub_category", "ad_owner_id",
+                 "featured", "is_approved", "status", "views", "created", "updated", "images")
+# Bytes of a spooled export held in memory before it moves to a temporary file
+EXPORT_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+def export_queryset(include_inactive=False):
+    ads = Ad.objects.all() if include_inactive else Ad.objects.filter(is_approved=True, status=STATUS_ACTIVE)
+    return (
+        ads.select_related("category", "sub_category")
+        .only("id", "name", "description", "price", "location", "ad_creator_id", "featured", "is_approved",
+              "status", "views", "created", "updated", "category__title", "sub_category__title")
+        .prefetch_related(Prefetch("images", queryset=AdImage.objects.only("id", "ad_id", "image")))
+        # Older rows have random uuid4 keys, so the id only breaks ties between equal timestamps
+        .order_by("created", "id")
+    )
+
+
+def export_rows(queryset, chunk_size=None):
+    """
+    Yield one flat dict per ad. Rows are fetched `chunk_size` at a time (a
+    server-side cursor on PostgreSQL) and each chunk's images come from one
+    extra query, so memory stays bounded by the chunk size, not the catalogue.
+    """
+    for ad in queryset.iterator(chunk_size=chunk_size or settings.AD_EXPORT_CHUNK_SIZE):
+        yield {
+            "id": ad.id,
+            "name": ad.name,
+            "description": ad.description,
+            "price": ad.price,
+            "location": ad.location,
+            "category": None if ad.category is None else ad.category.title,
+            "sub_category": None if ad.sub_category is None else ad.sub_category.title,
+            "ad_owner_id": ad.ad_creator_id,
+            "featured": ad.featured,
+            "is_approved": ad.is_approved,
+            "status": ad.status,
+            "views": ad.views,
+            "created": ad.created,
+            "updated": ad.updated,
+            "images": [image.image for image in ad.images.all()],
+        }
+
+
+class _Echo:
+    # csv.writer only needs `write`; returning the line lets it be yielded
+    @staticmethod
+    def write(value):
+        return value
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        row["images"] = " ".join(row["images"])
+        yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+
+def export_lines(output, rows):
+    return csv_lines(rows) if output == "csv" else ndjson_lines(rows)
+
+
+def spool_lines(lines, max_size=EXPORT_SPOOL_MAX_SIZE):
+    """
+    Write `lines` to a temporary file, kept in memory up to `max_size` bytes,
+    and return it rewound for reading.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=max_size)
+    spool.writelines(line.encode() for line in lines)
+    spool.seek(0)
+    return spool
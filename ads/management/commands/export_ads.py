@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from ads.export import EXPORT_FORMATS, export_lines, export_queryset, export_rows
+
+
+class Command(BaseCommand):
+    help = 'Streams ads as NDJSON or CSV to a file or stdout, holding one chunk of ads in memory at a time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', choices=EXPORT_FORMATS, default='ndjson')
+        parser.add_argument('--file', help='Defaults to stdout.')
+        parser.add_argument('--chunk-size', type=int, default=None)
+        parser.add_argument('--all', action='store_true', dest='include_inactive',
+                            help='Include unapproved and inactive ads.')
+
+    def handle(self, *args, **options):
+        rows = export_rows(export_queryset(options['include_inactive']), options['chunk_size'])
+        destination = open(options['file'], 'w', newline='', encoding='utf-8') if options['file'] else self.stdout
+        try:
+            for line in export_lines(options['output'], rows):
+                destination.write(line)
+        finally:
+            if destination is not self.stdout:
+                destination.close()
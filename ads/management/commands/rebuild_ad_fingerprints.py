@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from ads.duplicates import ad_duplicates
+from ads.models import Ad, AdFingerprint
+
+
+class Command(BaseCommand):
+    help = 'Computes the MinHash fingerprint of every ad that does not have one yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ads = Ad.objects.filter(fingerprint__isnull=True).only('id', 'description').order_by()
+        batch, created = [], 0
+        for ad in ads.iterator(chunk_size=batch_size):
+            batch.append(AdFingerprint(ad=ad, signature=ad_duplicates.hasher.signature(ad.description).tobytes()))
+            if len(batch) == batch_size:
+                created += len(AdFingerprint.objects.bulk_create(batch))
+                batch = []
+        created += len(AdFingerprint.objects.bulk_create(batch))
+        self.stdout.write(f'Fingerprinted {created} ads.')
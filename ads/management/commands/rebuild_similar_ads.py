@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from ads.recommendations import rebuild_similar_ads
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the precomputed "similar listings" of active ads from TF-IDF vectors.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incremental', action='store_true',
+                            help='Only compute neighbours for ads that do not have any yet.')
+        parser.add_argument('--k', type=int, default=None, help='Number of neighbours to keep per ad.')
+
+    def handle(self, *args, **options):
+        processed = rebuild_similar_ads(incremental=options['incremental'], k=options['k'])
+        self.stdout.write(f'Similar ads computed for {processed} ads.')
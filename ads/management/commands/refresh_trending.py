@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ads.trending import refresh_trending_scores
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the decayed trending score of every active ad. Meant to run periodically (e.g. from cron).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        scored = refresh_trending_scores(batch_size=options['batch_size'])
+        self.stdout.write(f'Trending scores refreshed for {scored} ads.')
@@ -0,0 +1,22 @@
+# Generated by Django 4.1.7 on 2026-10-19 13:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ads", "0010_alter_ad_options_ad_ads_ad_is_appr_b74706_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ad",
+            name="impressions",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="ad",
+            name="views",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.1.7 on 2026-10-19 13:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ads", "0011_ad_views_impressions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ad",
+            name="trending_score",
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name="ad",
+            name="trending_updated",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="ad",
+            name="trending_views",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Views already counted in the trending score"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                fields=["is_approved", "status", "-trending_score"],
+                name="ads_ad_is_appr_ae2095_idx",
+            ),
+        ),
+    ]
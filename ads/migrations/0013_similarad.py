@@ -0,0 +1,54 @@
+# Generated by Django 4.1.7 on 2026-10-19 13:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ads", "0012_ad_trending_score"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SimilarAd",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rank", models.PositiveSmallIntegerField()),
+                ("score", models.FloatField()),
+                (
+                    "ad",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="similar_ads",
+                        to="ads.ad",
+                    ),
+                ),
+                (
+                    "similar",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="ads.ad",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Similar Ads",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="similarad",
+            constraint=models.UniqueConstraint(
+                fields=("ad", "rank"), name="unique_similar_ad_rank"
+            ),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.1.7 on 2026-10-19 13:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ads", "0013_similarad"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="ad",
+            name="name",
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.CreateModel(
+            name="AdFingerprint",
+            fields=[
+                (
+                    "ad",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="fingerprint",
+                        serialize=False,
+                        to="ads.ad",
+                    ),
+                ),
+                ("signature", models.BinaryField()),
+                ("updated", models.DateTimeField(auto_now=True, db_index=True)),
+                (
+                    "duplicate_of",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="ads.ad",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.1.7 on 2026-10-19 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ads", "0014_adfingerprint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="adimage",
+            name="phash",
+            field=models.BigIntegerField(
+                blank=True,
+                db_index=True,
+                help_text="Perceptual (difference) hash",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.7 on 2026-10-19 13:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ads", "0015_adimage_phash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ad",
+            name="report_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                fields=["-report_count", "id"], name="ads_ad_report__012d96_idx"
+            ),
+        ),
+    ]
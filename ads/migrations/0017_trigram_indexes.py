@@ -0,0 +1,24 @@
+# Generated by Django 4.1.7 on 2026-10-19 13:33
+
+import common.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ads", "0016_ad_report_count_ad_ads_ad_report__012d96_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(common.indexes.create_trigram_extension, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="ad",
+            index=common.indexes.TrigramIndex(fields=["name"], name="ads_ad_name_trgm"),
+        ),
+        migrations.AddIndex(
+            model_name="adcategory",
+            index=common.indexes.TrigramIndex(
+                fields=["title"], name="ads_adcategory_title_trgm"
+            ),
+        ),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 4.1.7 on 2026-10-19 13:35
+
+import common.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ads", "0017_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="ad",
+            name="id",
+            field=models.UUIDField(
+                default=common.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="adcategory",
+            name="id",
+            field=models.UUIDField(
+                default=common.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="adimage",
+            name="id",
+            field=models.UUIDField(
+                default=common.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="adreport",
+            name="id",
+            field=models.UUIDField(
+                default=common.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="adsubcategory",
+            name="id",
+            field=models.UUIDField(
+                default=common.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="chat",
+            name="id",
+            field=models.UUIDField(
+                default=common.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="favouritead",
+            name="id",
+            field=models.UUIDField(
+                default=common.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="message",
+            name="id",
+            field=models.UUIDField(
+                default=common.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.1.7 on 2026-10-19 13:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ads", "0018_uuid7_primary_keys"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="adreport",
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name="chat",
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name="favouritead",
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name="message",
+            options={},
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                fields=["ad_creator", "-created"], name="ads_ad_ad_crea_c0d1a9_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["chat", "-created"], name="ads_message_chat_id_84484f_idx"
+            ),
+        ),
+    ]
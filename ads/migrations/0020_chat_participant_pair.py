@@ -0,0 +1,66 @@
+# Generated by Django 4.1.7 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+def backfill_participant_pairs(apps, schema_editor):
+    """
+    Store the canonical participant pair of every chat, then merge chats that
+    share an ad and pair into the oldest one so the unique constraint holds.
+    """
+    Chat = apps.get_model("ads", "Chat")
+    Message = apps.get_model("ads", "Message")
+
+    rooms = {}
+    pending = []
+    chats = Chat.objects.order_by("created").only("id", "ad_id", "initiator_id", "receiver_id")
+    for chat in chats.iterator():
+        chat.participant_low, chat.participant_high = sorted((chat.initiator_id, chat.receiver_id))
+        key = (chat.ad_id, chat.participant_low, chat.participant_high)
+        keeper = rooms.setdefault(key, chat.id)
+        if keeper != chat.id:
+            Message.objects.filter(chat_id=chat.id).update(chat_id=keeper)
+            chat.delete()
+            continue
+        pending.append(chat)
+        if len(pending) == 500:
+            Chat.objects.bulk_update(pending, ["participant_low", "participant_high"])
+            pending = []
+    Chat.objects.bulk_update(pending, ["participant_low", "participant_high"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ads", "0019_explicit_orderings"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chat",
+            name="participant_low",
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="chat",
+            name="participant_high",
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_participant_pairs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="chat",
+            name="participant_low",
+            field=models.UUIDField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name="chat",
+            name="participant_high",
+            field=models.UUIDField(editable=False),
+        ),
+        migrations.AddConstraint(
+            model_name="chat",
+            constraint=models.UniqueConstraint(
+                fields=("ad", "participant_low", "participant_high"),
+                name="unique_chat_participants",
+            ),
+        ),
+    ]
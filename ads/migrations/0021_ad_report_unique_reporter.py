@@ -0,0 +1,41 @@
+# Generated by Django 4.1.7 on 2026-10-19 14:22
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+
+def remove_repeated_reports(apps, schema_editor):
+    """
+    Keep the first report of each user on an ad, and take the repeats off the
+    ad's report count so the unique constraint holds.
+    """
+    Ad = apps.get_model("ads", "Ad")
+    AdReport = apps.get_model("ads", "AdReport")
+
+    seen = set()
+    repeats = {}
+    reports = AdReport.objects.order_by("created").values_list("id", "ad_id", "reporter_id")
+    for report_id, ad_id, reporter_id in reports.iterator():
+        if (ad_id, reporter_id) in seen:
+            repeats.setdefault(ad_id, []).append(report_id)
+        seen.add((ad_id, reporter_id))
+    for ad_id, report_ids in repeats.items():
+        AdReport.objects.filter(id__in=report_ids).delete()
+        Ad.objects.filter(id=ad_id).update(report_count=Greatest(F("report_count") - len(report_ids), 0))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ads", "0020_chat_participant_pair"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_repeated_reports, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="adreport",
+            constraint=models.UniqueConstraint(
+                fields=("ad", "reporter"), name="unique_ad_reporter"
+            ),
+        ),
+    ]
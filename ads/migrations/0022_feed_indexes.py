@@ -0,0 +1,28 @@
+# Generated by Django 4.1.7 on 2026-10-19 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ads", "0021_ad_report_unique_reporter"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                condition=models.Q(("is_approved", True), ("status", "Active")),
+                fields=["-created"],
+                name="ads_ad_feed_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                condition=models.Q(("is_approved", True), ("status", "Active")),
+                fields=["category", "-created"],
+                name="ads_ad_category_feed_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.1.7 on 2026-10-19 14:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ads", "0022_feed_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="ad",
+            name="ads_ad_is_appr_ae2095_idx",
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                condition=models.Q(("is_approved", True), ("status", "Active")),
+                fields=["-trending_score"],
+                name="ads_ad_feed_trending_idx",
+            ),
+        ),
+    ]
@@ -5,4 +5,6 @@ from ads.models import Ad
 class AdsByCategoryMixin:
     @staticmethod
     def get_ads_by_category(category):
-        return Ad.objects.select_related('category').filter(category=category, is_approved=True, status=STATUS_ACTIVE)
+        return Ad.objects.select_related('category').filter(
+                category=category, is_approved=True, status=STATUS_ACTIVE
+        ).order_by('-created')
@@ -1,8 +1,9 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
-from ads.choices import STATUS_CHOICES, STATUS_PENDING
-from common.models import BaseModel
+from ads.choices import STATUS_ACTIVE, STATUS_CHOICES, STATUS_PENDING
+from common.indexes import TrigramIndex
+from common.models import BaseModel, ParticipantPairModel
 
 User = get_user_model()
 
@@ -16,6 +17,9 @@ class AdCategory(BaseModel):
 
     class Meta:
         verbose_name_plural = "Ad Categories"
+        indexes = [
+            TrigramIndex(fields=['title'], name="ads_adcategory_title_trgm"),
+        ]
 
     def __str__(self):
         return str(self.title)
@@ -32,9 +36,13 @@ class AdSubCategory(BaseModel):
         verbose_name_plural = "Ad SubCategories"
 
 
+# The ads shown in feeds
+FEED_CONDITION = models.Q(is_approved=True, status=STATUS_ACTIVE)
+
+
 class Ad(BaseModel):
     ad_creator = models.ForeignKey(User, on_delete=models.CASCADE, null=True, related_name="created_ads")
-    name = models.CharField(max_length=255)
+    name = models.CharField(max_length=255, db_index=True)
     description = models.TextField()
     price = models.CharField(max_length=255, null=True)
     location = models.CharField(max_length=255, null=True)
@@ -43,10 +51,25 @@ class Ad(BaseModel):
     featured = models.BooleanField(default=False)
     is_approved = models.BooleanField(default=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, null=True)
+    views = models.PositiveIntegerField(default=0)
+    impressions = models.PositiveIntegerField(default=0)
+    trending_score = models.FloatField(default=0)
+    trending_views = models.PositiveIntegerField(default=0, help_text="Views already counted in the trending score")
+    trending_updated = models.DateTimeField(null=True, blank=True)
+    report_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         indexes = [
             models.Index(fields=['is_approved', 'status']),
+            # Newest-first and trending feeds of approved active ads. Partial indexes: SQLite
+            # cannot seek a leading boolean column tested as `WHERE is_approved`, which is how Django filters it
+            models.Index(fields=['-created'], condition=FEED_CONDITION, name="ads_ad_feed_created_idx"),
+            models.Index(fields=['category', '-created'], condition=FEED_CONDITION,
+                         name="ads_ad_category_feed_idx"),
+            models.Index(fields=['-trending_score'], condition=FEED_CONDITION, name="ads_ad_feed_trending_idx"),
+            models.Index(fields=['-report_count', 'id']),
+            models.Index(fields=['ad_creator', '-created']),
+            TrigramIndex(fields=['name'], name="ads_ad_name_trgm"),
         ]
 
     def __str__(self):
@@ -56,6 +79,11 @@ class Ad(BaseModel):
 class AdImage(BaseModel):
     ad = models.ForeignKey(Ad, on_delete=models.CASCADE, null=True, related_name="images")
     image = models.URLField()
+    phash = models.BigIntegerField(null=True, blank=True, db_index=True, help_text="Perceptual (difference) hash")
+
+    class Meta:
+        # A listing has at most a handful of images and clients rely on their order
+        ordering = ("-created",)
 
     def __str__(self):
         return self.ad.name
@@ -69,11 +97,17 @@ class FavouriteAd(BaseModel):
         return f"{self.customer} --- {self.ad.name}"
 
 
-class Chat(BaseModel):
+class Chat(ParticipantPairModel):
     ad = models.ForeignKey(Ad, on_delete=models.CASCADE, related_name="ad_chats")
     initiator = models.ForeignKey(User, on_delete=models.CASCADE, related_name="chat_initiators")
     receiver = models.ForeignKey(User, on_delete=models.CASCADE, related_name="chat_receivers")
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ad', 'participant_low', 'participant_high'],
+                                    name="unique_chat_participants"),
+        ]
+
 
 class Message(BaseModel):
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name="message_sender")
@@ -81,11 +115,55 @@ class Message(BaseModel):
     attachment = models.FileField(blank=True)
     chat = models.ForeignKey(Chat, on_delete=models.CASCADE, related_name="messages")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['chat', '-created']),
+        ]
+
 
 class AdReport(BaseModel):
     ad = models.ForeignKey(Ad, on_delete=models.CASCADE, related_name="ad_reports")
     reporter = models.ForeignKey(User, on_delete=models.CASCADE, related_name="reports")
     text = models.TextField()
 
+    class Meta:
+        constraints = [
+            # An ad is hidden by the number of people reporting it, not by how often one of them does
+            models.UniqueConstraint(fields=['ad', 'reporter'], name="unique_ad_reporter"),
+        ]
+
     def __str__(self):
         return f"{self.reporter.full_name} ----> {self.text[:30]}"
+
+
+class AdFingerprint(models.Model):
+    """
+    MinHash signature of an ad description, used to find near-duplicate listings.
+    """
+    ad = models.OneToOneField(Ad, on_delete=models.CASCADE, primary_key=True, related_name="fingerprint")
+    signature = models.BinaryField()
+    duplicate_of = models.ForeignKey(Ad, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    updated = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return str(self.ad_id)
+
+
+class SimilarAd(models.Model):
+    """
+    Precomputed nearest neighbours of an ad, ranked by TF-IDF cosine similarity.
+    Rebuilt in the background by the `rebuild_similar_ads` command.
+    """
+    ad = models.ForeignKey(Ad, on_delete=models.CASCADE, related_name="similar_ads")
+    similar = models.ForeignKey(Ad, on_delete=models.CASCADE, related_name="+")
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        verbose_name_plural = "Similar Ads"
+        constraints = [
+            models.UniqueConstraint(fields=['ad', 'rank'], name="unique_similar_ad_rank"),
+        ]
+
+    def __str__(self):
+        return f"{self.ad_id} ---- {self.similar_id} ({self.rank})"
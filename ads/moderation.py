@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, QuerySet
+from django.db.models.functions import Greatest
+from django.dispatch import Signal
+from django.utils import timezone
+
+from ads.choices import STATUS_ACTIVE, STATUS_DENIED, STATUS_PAUSED, STATUS_PENDING
+from ads.models import Ad
+
+MODERATION_APPROVE = "approve"
+MODERATION_DENY = "deny"
+MODERATION_PAUSE = "pause"
+MODERATION_FEATURE = "feature"
+MODERATION_UNFEATURE = "unfeature"
+# Not a staff action: sent when reports push an ad out of the feed
+MODERATION_HIDE = "hide"
+
+MODERATION_ACTIONS = {
+    MODERATION_APPROVE: {"is_approved": True, "status": STATUS_ACTIVE},
+    MODERATION_DENY: {"is_approved": False, "status": STATUS_DENIED},
+    MODERATION_PAUSE: {"status": STATUS_PAUSED},
+    MODERATION_FEATURE: {"featured": True},
+    MODERATION_UNFEATURE: {"featured": False},
+}
+
+# Keeps each `id IN (...)` below the bound-parameter limits of the database
+MODERATION_BATCH_SIZE = 500
+
+# Sent once per bulk operation with `action` and `count`, in place of a
+# post_save per row. Receivers refresh caches and indexes in one go.
+ads_bulk_updated = Signal()
+
+
+def record_ad_report(ad_id):
+    """
+    Count a new report against the ad and hide it once it crosses
+    AD_REPORT_HIDE_THRESHOLD. Both steps are single conditional UPDATEs.
+    """
+    Ad.objects.filter(id=ad_id).update(report_count=F('report_count') + 1)
+    hidden = Ad.objects.filter(
+            id=ad_id, status=STATUS_ACTIVE, report_count__gte=settings.AD_REPORT_HIDE_THRESHOLD
+    ).update(status=STATUS_PENDING)
+    if hidden:
+        ads_bulk_updated.send(sender=Ad, action=MODERATION_HIDE, count=hidden)
+
+
+def discard_ad_report(ad_id):
+    Ad.objects.filter(id=ad_id).update(report_count=Greatest(F('report_count') - 1, 0))
+
+
+def moderate_ads(ads, action):
+    """
+    Apply a moderation action to `ads` (a queryset or a list of ids) with
+    set-based UPDATEs, then send `ads_bulk_updated` once. Reviewed ads leave
+    the report queue, so their report count is reset; featuring or unfeaturing
+    an ad is not a review and leaves it alone.
+    Returns the number of ads updated.
+    """
+    # update() leaves auto_now alone; feed validators read `updated` to see the change
+    values = dict(MODERATION_ACTIONS[action], updated=timezone.now())
+    if action not in (MODERATION_FEATURE, MODERATION_UNFEATURE):
+        values["report_count"] = 0
+
+    if isinstance(ads, QuerySet):
+        updated = ads.order_by().update(**values)
+    else:
+        ad_ids = list(ads)
+        batches = [ad_ids[i:i + MODERATION_BATCH_SIZE] for i in range(0, len(ad_ids), MODERATION_BATCH_SIZE)]
+        if len(batches) == 1:
+            updated = Ad.objects.filter(id__in=batches[0]).update(**values)
+        else:
+            with transaction.atomic():
+                updated = sum(Ad.objects.filter(id__in=batch).update(**values) for batch in batches)
+
+    if updated:
+        ads_bulk_updated.send(sender=Ad, action=action, count=updated)
+    return updated
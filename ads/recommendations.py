@@ -0,0 +1,112 @@
+import re
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from scipy import sparse
+
+from ads.choices import STATUS_ACTIVE
+from ads.models import Ad, SimilarAd
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def ad_tokens(ad: Ad):
+    tokens = TOKEN_PATTERN.findall(f"{ad.name} {ad.description}".lower())
+    if ad.category_id is not None:
+        # A dedicated token lets ads in the same category share a feature even with different wording
+        tokens.append(f"category:{ad.category_id}")
+        tokens.extend(TOKEN_PATTERN.findall(ad.category.title.lower()))
+    return tokens
+
+
+def build_tfidf_matrix(documents):
+    """
+    Build an L2-normalised sparse TF-IDF matrix (one row per document) from
+    lists of tokens, using sublinear term frequency and smoothed IDF.
+    """
+    vocabulary = {}
+    indptr, indices, data = [0], [], []
+    for tokens in documents:
+        counts = Counter(vocabulary.setdefault(token, len(vocabulary)) for token in tokens)
+        indices.extend(counts.keys())
+        data.extend(counts.values())
+        indptr.append(len(indices))
+
+    matrix = sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr)),
+            shape=(len(documents), len(vocabulary)),
+    )
+    matrix.data = 1 + np.log(matrix.data)
+
+    document_frequency = np.bincount(matrix.indices, minlength=len(vocabulary))
+    idf = np.log((1 + len(documents)) / (1 + document_frequency)) + 1
+    matrix = matrix.multiply(idf.astype(np.float32)).tocsr()
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms).dot(matrix).tocsr()
+
+
+def top_k_neighbours(matrix, rows, k, chunk_size=256):
+    """
+    Yield `(row, [(neighbour_row, score), ...])` with the `k` most similar rows
+    for each of `rows`, best first. Similarities are computed a chunk of rows
+    at a time and kept sparse, so memory stays bounded on large catalogues.
+    """
+    transposed = matrix.T.tocsc()
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        similarities = matrix[chunk].dot(transposed).tocsr()
+        for offset, row in enumerate(chunk):
+            begin, end = similarities.indptr[offset], similarities.indptr[offset + 1]
+            columns = similarities.indices[begin:end]
+            scores = similarities.data[begin:end]
+            keep = (columns != row) & (scores > 0)
+            columns, scores = columns[keep], scores[keep]
+            if len(scores) > k:
+                best = np.argpartition(-scores, k)[:k]
+                columns, scores = columns[best], scores[best]
+            order = np.argsort(-scores, kind="stable")
+            yield row, list(zip(columns[order].tolist(), scores[order].tolist()))
+
+
+def rebuild_similar_ads(incremental=False, k=None, chunk_size=256):
+    """
+    Recompute the neighbour table for active ads. With `incremental`, only ads
+    that have no neighbours yet (e.g. newly approved ones) are computed; a full
+    rebuild refreshes every ad. Returns the number of ads processed.
+    """
+    k = k or settings.AD_SIMILAR_COUNT
+    ads = list(
+            Ad.objects.filter(is_approved=True, status=STATUS_ACTIVE)
+            .select_related('category')
+            .only('id', 'name', 'description', 'category__id', 'category__title')
+            .order_by('id')
+    )
+    if not ads:
+        return 0
+
+    if incremental:
+        done = set(SimilarAd.objects.values_list('ad_id', flat=True).distinct())
+        rows = [row for row, ad in enumerate(ads) if ad.id not in done]
+    else:
+        rows = list(range(len(ads)))
+    if not rows:
+        return 0
+
+    matrix = build_tfidf_matrix([ad_tokens(ad) for ad in ads])
+    neighbours = [
+        SimilarAd(ad_id=ads[row].id, similar_id=ads[column].id, rank=rank, score=score)
+        for row, similar in top_k_neighbours(matrix, rows, k, chunk_size)
+        for rank, (column, score) in enumerate(similar)
+    ]
+
+    with transaction.atomic():
+        if incremental:
+            SimilarAd.objects.filter(ad_id__in=[ads[row].id for row in rows]).delete()
+        else:
+            SimilarAd.objects.all().delete()
+        SimilarAd.objects.bulk_create(neighbours, batch_size=1000)
+    return len(rows)
@@ -1,12 +1,23 @@
 from django.contrib.auth import get_user_model
-from rest_framework import serializers
-
-from ads.choices import STATUS_CHOICES
-from ads.models import Ad, AdCategory, AdImage, AdReport, AdSubCategory, Chat, Message
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from rest_framework import serializers, status
+
+from ads.categories import category_tree
+from ads.choices import STATUS_CHOICES, STATUS_PENDING
+from ads.duplicates import ad_duplicates
+from ads.models import Ad, AdImage, AdReport, Chat, Message
+from ads.moderation import MODERATION_ACTIONS
+from common.compiled import CompiledListSerializer, ManyValues
 from common.exceptions import CustomValidation
+from common.fieldsets import Projection, SparseFieldsetMixin
+from common.identity import IdentityMapMixin
+from common.images import hash_images_on_commit
 
 User = get_user_model()
 
+AD_IMAGES_PREFETCH = Prefetch("images", queryset=AdImage.objects.only("id", "ad_id", "image"))
+
 
 class AdCategorySerializer(serializers.Serializer):
     id = serializers.UUIDField()
@@ -20,7 +31,23 @@ class AdSubCategorySerializer(serializers.Serializer):
     title = serializers.CharField()
 
 
-class AdSerializer(serializers.Serializer):
+class AdSerializer(SparseFieldsetMixin, serializers.Serializer):
+    projections = {
+        "id": Projection(),
+        "name": Projection("name"),
+        "description": Projection("description"),
+        "price": Projection("price"),
+        "location": Projection("location"),
+        "featured": Projection("featured"),
+        "images": Projection(prefetch=(AD_IMAGES_PREFETCH,)),
+        "is_approved": Projection("is_approved"),
+        "status": Projection("status"),
+    }
+    compiled_values = {"images": ManyValues(AdImage, "ad_id", "image")}
+
+    class Meta:
+        list_serializer_class = CompiledListSerializer
+
     id = serializers.UUIDField()
     name = serializers.CharField()
     description = serializers.CharField()
@@ -73,15 +100,14 @@ class CreateAdSerializer(serializers.Serializer):
         category_name = validated_data.pop('category')
         sub_category_name = validated_data.pop('sub_category')
 
-        try:
-            category = AdCategory.objects.get(title__icontains=category_name)
-        except AdCategory.DoesNotExist:
+        tree = category_tree()
+        category = tree.resolve_category(category_name)
+        if category is None:
             raise CustomValidation({"message": "Category does not exist", "status": "failed"})
 
         if sub_category_name is not None:
-            try:
-                sub_category = category.sub_categories.get(title__icontains=sub_category_name)
-            except AdSubCategory.DoesNotExist:
+            sub_category = tree.resolve_sub_category(category, sub_category_name)
+            if sub_category is None:
                 raise CustomValidation({"message": "Sub Category does not exist", "status": "failed"})
         else:
             sub_category = None
@@ -92,14 +118,16 @@ class CreateAdSerializer(serializers.Serializer):
             raise CustomValidation({"message": "The maximum number of allowed images is 3", "status": "failed"})
 
         # Create the Ad instance without saving it to the database
-        ad = Ad.objects.create(ad_creator=creator, category=category, sub_category=sub_category, **validated_data)
+        ad = Ad.objects.create(ad_creator=creator, category_id=category.id,
+                               sub_category_id=None if sub_category is None else sub_category.id, **validated_data)
 
         # Create AdImage instances and associate them with the Ad instance using set()
         ad_images = [AdImage(ad=ad, image=image) for image in images]
         AdImage.objects.bulk_create(ad_images)
+        hash_images_on_commit(AdImage, [ad_image.id for ad_image in ad_images])
 
-        # Finally, save the Ad instance to the database and return it
-        ad.save()
+        # New ads await review anyway; a near-duplicate is recorded for moderators in its fingerprint
+        ad_duplicates.register(ad)
         return ad
 
     def update(self, instance, validated_data):
@@ -110,22 +138,25 @@ class CreateAdSerializer(serializers.Serializer):
             setattr(instance, field, value)
 
         if category_name is not None:
-            try:
-                category = AdCategory.objects.get(title__icontains=category_name)
-            except AdCategory.DoesNotExist:
+            tree = category_tree()
+            category = tree.resolve_category(category_name)
+            if category is None:
                 raise CustomValidation({"message": "Category does not exist", "status": "failed"})
 
             if sub_category_name is not None:
-                try:
-                    sub_category = category.sub_categories.get(title__icontains=sub_category_name)
-                except AdSubCategory.DoesNotExist:
+                sub_category = tree.resolve_sub_category(category, sub_category_name)
+                if sub_category is None:
                     raise CustomValidation({"message": "Sub Category does not exist", "status": "failed"})
             else:
                 raise CustomValidation({"message": "You are trying to change the category without selecting a sub",
                                         "status": "failed"})
 
-            instance.category = category
-            instance.sub_category = sub_category
+            instance.category_id = category.id
+            instance.sub_category_id = sub_category.id
+
+        if 'description' in validated_data and ad_duplicates.register(instance) is not None:
+            instance.status = STATUS_PENDING
+            instance.is_approved = False
         instance.save()
         return instance
 
@@ -143,10 +174,35 @@ class ReportAdSerializer(serializers.Serializer):
         except Ad.DoesNotExist:
             raise CustomValidation({"message": "Ad does not exist", "status": "failed"})
 
-        return AdReport.objects.create(ad=ad, reporter=reporter, **validated_data)
+        try:
+            with transaction.atomic():
+                return AdReport.objects.create(ad=ad, reporter=reporter, **validated_data)
+        except IntegrityError:
+            raise CustomValidation({"message": "You have already reported this ad", "status": "failed"},
+                                   status.HTTP_400_BAD_REQUEST)
+
+
+class ReportedAdSerializer(serializers.Serializer):
+    id = serializers.UUIDField()
+    name = serializers.CharField()
+    ad_creator = serializers.UUIDField(source="ad_creator_id")
+    status = serializers.ChoiceField(choices=STATUS_CHOICES)
+    is_approved = serializers.BooleanField()
+    report_count = serializers.IntegerField()
+    duplicate_of = serializers.UUIDField(source="fingerprint.duplicate_of_id", allow_null=True)
+
+
+class ModerationActionSerializer(serializers.Serializer):
+    action = serializers.ChoiceField(choices=list(MODERATION_ACTIONS))
+    ads = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=5000)
 
 
 class MessageSerializer(serializers.Serializer):
+    compiled_values = {"sender": "sender_id"}
+
+    class Meta:
+        list_serializer_class = CompiledListSerializer
+
     id = serializers.UUIDField(read_only=True)
     sender = serializers.SerializerMethodField()
     text = serializers.CharField(required=False)
@@ -155,7 +211,7 @@ class MessageSerializer(serializers.Serializer):
 
     @staticmethod
     def get_sender(obj: Message):
-        return obj.sender.id
+        return obj.sender_id
 
 
 def validate_users(attrs):
@@ -172,7 +228,7 @@ def validate_users(attrs):
     return attrs
 
 
-class ChatListSerializer(serializers.Serializer):
+class ChatListSerializer(IdentityMapMixin, serializers.Serializer):
     id = serializers.UUIDField()
     ad_id = serializers.SerializerMethodField()
     ad_title = serializers.SerializerMethodField()
@@ -181,23 +237,29 @@ class ChatListSerializer(serializers.Serializer):
     avatar = serializers.SerializerMethodField()
     last_message = serializers.SerializerMethodField()
 
+    def prime(self, chats):
+        # Chats share participants, so each user and profile is loaded once
+        users = self.identity_map.attach(chats, "initiator", "receiver")
+        self.identity_map.attach(users, "profile")
+        self.identity_map.attach(chats, "ad")
+
     @staticmethod
     def get_ad_id(obj: Chat):
-        return obj.ad.id
+        return obj.ad_id
 
     # get profile image
     def get_avatar(self, obj: Chat):
         current_user = self.context["request"].user
-        if current_user == obj.initiator:
+        if current_user.id == obj.initiator_id:
             return obj.receiver.profile.avatar
         return obj.initiator.profile.avatar
 
     def get_receiving_user(self, obj: Chat):
         current_user = self.context["request"].user
-        if current_user == obj.initiator:
-            return {"full_name": obj.receiver.full_name, "id": obj.receiver.id}
+        if current_user.id == obj.initiator_id:
+            return {"full_name": obj.receiver.full_name, "id": obj.receiver_id}
         else:
-            return {"full_name": obj.initiator.full_name, "id": obj.initiator.id}
+            return {"full_name": obj.initiator.full_name, "id": obj.initiator_id}
 
     @staticmethod
     def get_last_message(obj: Chat):
@@ -212,7 +274,8 @@ class ChatListSerializer(serializers.Serializer):
 
     @staticmethod
     def get_ad_image(obj: Chat):
-        return obj.ad.images.first().image if obj.ad.images.first() else None
+        image = obj.ad.images.first()
+        return image.image if image else None
 
     def validate(self, attrs):
         attrs = validate_users(attrs)
@@ -248,19 +311,15 @@ class ChatCreateSerializer(serializers.Serializer):
         if receiver == initiator:
             raise CustomValidation({"message": "Initiator cannot chat with him/herself", "status": "failed"})
 
-        # Check if a conversation already exists between the ad and receiver
-        existing_chat = Chat.objects.filter(ad=ad, receiver=receiver).first()
-
-        if existing_chat:
-            # Create and add a message to the existing chat
-            if text or attachment:
-                Message.objects.create(sender=initiator, chat=existing_chat, text=text, attachment=attachment)
-            return existing_chat
-        else:
-            chat = Chat.objects.create(ad=ad, initiator=initiator, receiver=receiver)
-            if text or attachment:
-                Message.objects.create(sender=initiator, chat=chat, text=text, attachment=attachment)
-            return chat
+        # One chat per ad and pair of users, whoever writes first; the unique
+        # constraint makes concurrent first messages land in the same chat
+        chat, _ = Chat.objects.get_or_create(
+                ad=ad, **Chat.participant_pair(initiator, receiver),
+                defaults={"initiator": initiator, "receiver": receiver}
+        )
+        if text or attachment:
+            Message.objects.create(sender=initiator, chat=chat, text=text, attachment=attachment)
+        return chat
 
 
 class ChatSerializer(serializers.Serializer):
@@ -277,7 +336,7 @@ class ChatSerializer(serializers.Serializer):
 
     def get_receiving_user(self, obj: Chat):
         current_user = self.context["request"].user
-        if current_user == obj.initiator:
-            return {"full_name": obj.receiver.full_name, "id": obj.receiver.id}
+        if current_user.id == obj.initiator_id:
+            return {"full_name": obj.receiver.full_name, "id": obj.receiver_id}
         else:
-            return {"full_name": obj.initiator.full_name, "id": obj.initiator.id}
+            return {"full_name": obj.initiator.full_name, "id": obj.initiator_id}
@@ -0,0 +1,43 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ads.cache import bump_feed_generation
+from ads.categories import invalidate_category_tree
+from ads.models import Ad, AdCategory, AdImage, AdReport, AdSubCategory
+from ads.moderation import ads_bulk_updated, discard_ad_report, record_ad_report
+
+
+@receiver(post_save, sender=AdReport)
+def handle_ad_report_creation(sender, instance, created, **kwargs):
+    if created:
+        record_ad_report(instance.ad_id)
+
+
+@receiver(post_delete, sender=AdReport)
+def handle_ad_report_deletion(sender, instance, **kwargs):
+    discard_ad_report(instance.ad_id)
+
+
+@receiver(post_save, sender=Ad)
+@receiver(post_delete, sender=Ad)
+@receiver(post_save, sender=AdImage)
+@receiver(post_delete, sender=AdImage)
+@receiver(post_save, sender=AdCategory)
+@receiver(post_delete, sender=AdCategory)
+@receiver(post_save, sender=AdSubCategory)
+@receiver(post_delete, sender=AdSubCategory)
+def handle_ad_change(sender, **kwargs):
+    bump_feed_generation()
+
+
+@receiver(ads_bulk_updated, sender=Ad)
+def handle_ads_bulk_update(sender, **kwargs):
+    bump_feed_generation()
+
+
+@receiver(post_save, sender=AdCategory)
+@receiver(post_delete, sender=AdCategory)
+@receiver(post_save, sender=AdSubCategory)
+@receiver(post_delete, sender=AdSubCategory)
+def handle_category_change(sender, **kwargs):
+    invalidate_category_tree()
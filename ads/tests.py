@@ -1,3 +1,1083 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import socket
+import uuid
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.signals import request_started
+from django.db import DatabaseError, IntegrityError, close_old_connections, connection, transaction
+from django.db.models import Prefetch
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse_lazy
+from django.utils import timezone
+from django.utils.http import http_date
+from PIL import Image, ImageDraw
+from rest_framework import serializers, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ads.choices import STATUS_ACTIVE, STATUS_DENIED, STATUS_PAUSED, STATUS_PENDING
+from ads.categories import category_tree
+from ads.counters import AdCounterBuffer
+from ads.duplicates import AdDuplicateDetector, ad_duplicates
+from ads.mixins import AdsByCategoryMixin
+from ads.models import Ad, AdCategory, AdFingerprint, AdImage, AdReport, AdSubCategory, Chat, FavouriteAd, Message, \
+    SimilarAd
+from ads.moderation import ads_bulk_updated, moderate_ads
+from ads.recommendations import rebuild_similar_ads
+from ads.serializers import AdSerializer, MessageSerializer as AdMessageSerializer
+from ads.trending import refresh_trending_scores
+from ads.views import FilteredAdsListView, ModerationQueueView
+from common.admin import EstimatedCountPaginator
+from common.identity import IdentityMap
+from common.images import build_image_index, check_image_url, fetch_image, hash_images, to_unsigned
+from common.pagination import encode_cursor
+from common.testing import AuthenticatedAPITestCase, create_user
+from core.models import Otp
+from matrimonials.models import ConnectionRequest, Conversation, MatrimonialProfile, MatrimonialProfileImage, \
+    Message as ProfileMessage
+from matrimonials.serializers import MatrimonialProfileSerializer, MessageSerializer as ProfileMessageSerializer
+
 
 # Create your tests here.
+
+
+@override_settings(AD_COUNTER_FLUSH_INTERVAL=None)
+class AdCounterTestCase(AuthenticatedAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("counter@example.com", "Counter User")
+        cls.category = AdCategory.objects.create(title="Events", image="https://example.com/events.png")
+        cls.ads = [
+            Ad.objects.create(ad_creator=cls.user, name=f"Ad {i}", description="An ad", category=cls.category,
+                              is_approved=True, status=STATUS_ACTIVE)
+            for i in range(3)
+        ]
+
+    def test_flush_applies_aggregated_deltas_in_one_query(self):
+        counters = AdCounterBuffer()
+        for _ in range(3):
+            counters.record_view(self.ads[0].id)
+        counters.record_view(str(self.ads[1].id))
+        counters.record_impressions([ad.id for ad in self.ads])
+
+        with self.assertNumQueries(1):
+            self.assertEqual(counters.flush(), 3)
+
+        self.assertEqual(
+                list(Ad.objects.order_by("name").values_list("views", "impressions")),
+                [(3, 1), (1, 1), (0, 1)]
+        )
+        # Nothing is left pending after a flush
+        with self.assertNumQueries(0):
+            self.assertEqual(counters.flush(), 0)
+
+    @mock.patch("ads.counters.COUNTER_FLUSH_BATCH_SIZE", 2)
+    def test_flush_is_batched_and_failed_batches_are_kept(self):
+        counters = AdCounterBuffer()
+        counters.record_impressions([ad.id for ad in self.ads])
+        with self.assertNumQueries(2):
+            self.assertEqual(counters.flush(), 3)
+
+        counters.record_impressions([ad.id for ad in self.ads])
+        original = AdCounterBuffer._apply
+        with mock.patch.object(AdCounterBuffer, "_apply", side_effect=[2, DatabaseError("locked")]):
+            with self.assertRaises(DatabaseError):
+                counters.flush()
+        # Only the ad of the failed batch is still pending
+        self.assertEqual(sum(counters.pending("impressions", ad.id) for ad in self.ads), 1)
+        with mock.patch.object(AdCounterBuffer, "_apply", side_effect=original):
+            self.assertEqual(counters.flush(), 1)
+
+    @mock.patch("ads.counters.COUNTER_MAX_PENDING", 3)
+    def test_a_full_buffer_is_flushed_without_a_flusher_thread(self):
+        counters = AdCounterBuffer()
+        counters.record_impressions([ad.id for ad in self.ads[:2]])
+        self.assertEqual(counters.pending("impressions", self.ads[0].id), 1)
+        counters.record_impressions([self.ads[2].id])
+        self.assertEqual(counters.pending("impressions", self.ads[0].id), 0)
+        self.assertEqual(list(Ad.objects.values_list("impressions", flat=True)), [1, 1, 1])
+
+    def test_stop_flushes_pending_counts(self):
+        counters = AdCounterBuffer()
+        counters.record_view(self.ads[2].id)
+        counters.stop()
+        self.assertEqual(Ad.objects.get(id=self.ads[2].id).views, 1)
+
+    def test_ad_detail_reports_buffered_views(self):
+        url = reverse_lazy("ad_details", kwargs={"ad_id": self.ads[0].id})
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["data"]["views"], Ad.objects.get(id=self.ads[0].id).views + 2)
+
+
+class TrendingAdsTestCase(AuthenticatedAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("trending@example.com", "Trending User")
+        cls.other_user = create_user("other@example.com", "Other User", phone_number="+123456780")
+        cls.category = AdCategory.objects.create(title="Events", image="https://example.com/events.png")
+        cls.quiet_ad, cls.viewed_ad, cls.hot_ad = [
+            Ad.objects.create(ad_creator=cls.user, name=name, description="An ad", category=cls.category,
+                              is_approved=True, status=STATUS_ACTIVE)
+            for name in ("Quiet", "Viewed", "Hot")
+        ]
+        Ad.objects.filter(id=cls.viewed_ad.id).update(views=6)
+        FavouriteAd.objects.create(customer=cls.other_user, ad=cls.hot_ad)
+        Chat.objects.create(ad=cls.hot_ad, initiator=cls.other_user, receiver=cls.user)
+
+    def test_scores_rank_by_recent_activity(self):
+        self.assertEqual(refresh_trending_scores(), 3)
+        ranked = list(Ad.objects.order_by("-trending_score").values_list("name", flat=True))
+        self.assertEqual(ranked, ["Hot", "Viewed", "Quiet"])
+
+    def test_scores_are_written_in_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(refresh_trending_scores(batch_size=2), 3)
+        updates = [query["sql"] for query in queries.captured_queries if query["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 2)
+        ranked = list(Ad.objects.order_by("-trending_score").values_list("name", flat=True))
+        self.assertEqual(ranked, ["Hot", "Viewed", "Quiet"])
+
+    @override_settings(AD_TRENDING_HALF_LIFE=timedelta(hours=1))
+    def test_scores_decay_and_count_each_signal_once(self):
+        now = timezone.now()
+        refresh_trending_scores(now=now)
+        first = Ad.objects.get(id=self.viewed_ad.id).trending_score
+        refresh_trending_scores(now=now + timedelta(hours=1))
+        self.assertAlmostEqual(Ad.objects.get(id=self.viewed_ad.id).trending_score, first / 2)
+
+    def test_feed_can_be_sorted_by_trending(self):
+        refresh_trending_scores()
+        response = self.client.get(reverse_lazy("all_ads"), {"sort": "trending"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([ad["name"] for ad in response.data["data"]], ["Hot", "Viewed", "Quiet"])
+
+
+@override_settings(AD_COUNTER_FLUSH_INTERVAL=None)
+class SimilarAdsTestCase(AuthenticatedAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("similar@example.com", "Similar User")
+        cls.music = AdCategory.objects.create(title="Music", image="https://example.com/music.png")
+        cls.cars = AdCategory.objects.create(title="Cars", image="https://example.com/cars.png")
+        cls.guitar, cls.lessons, cls.car = [
+            Ad.objects.create(ad_creator=cls.user, name=name, description=description, category=category,
+                              is_approved=True, status=STATUS_ACTIVE)
+            for name, description, category in (
+                ("Acoustic guitar", "Acoustic guitar for sale, barely used", cls.music),
+                ("Guitar lessons", "Weekly acoustic guitar lessons for beginners", cls.music),
+                ("Car rental", "Rent a family car by the day", cls.cars),
+            )
+        ]
+
+    def test_rebuild_ranks_closest_listings_first(self):
+        self.assertEqual(rebuild_similar_ads(k=2), 3)
+        neighbours = list(SimilarAd.objects.filter(ad=self.guitar).order_by("rank").values_list("similar", flat=True))
+        self.assertEqual(neighbours[0], self.lessons.id)
+        self.assertNotIn(self.guitar.id, neighbours)
+
+    def test_incremental_rebuild_only_computes_new_ads(self):
+        rebuild_similar_ads()
+        existing = list(SimilarAd.objects.values_list("id", flat=True))
+        new_ad = Ad.objects.create(ad_creator=self.user, name="Electric guitar", description="Electric guitar and amp",
+                                   category=self.music, is_approved=True, status=STATUS_ACTIVE)
+        rebuild_similar_ads(incremental=True)
+        self.assertTrue(SimilarAd.objects.filter(ad=new_ad).exists())
+        self.assertTrue(SimilarAd.objects.filter(id__in=existing).exists())
+
+    def test_ad_detail_lists_similar_ads_in_one_query(self):
+        rebuild_similar_ads()
+        response = self.client.get(reverse_lazy("ad_details", kwargs={"ad_id": self.guitar.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["data"]["similar_ads"][0]["id"], self.lessons.id)
+
+
+class DuplicateAdsTestCase(AuthenticatedAPITestCase):
+    description = ("Spacious two bedroom apartment in the city centre with a balcony, "
+                   "fitted kitchen and parking space, available from next month")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.User = get_user_model()
+        cls.user = create_user("duplicates@example.com", "Duplicate User")
+        cls.category = AdCategory.objects.create(title="Property", image="https://example.com/property.png")
+        AdSubCategory.objects.create(category=cls.category, title="Apartments")
+
+    def setUp(self):
+        super().setUp()
+        ad_duplicates.load()
+
+    def _create_ad(self, name, description):
+        data = {"name": name, "description": description, "price": "500", "location": "Dhaka",
+                "category": "Property", "sub_category": "Apartments"}
+        response = self.client.post(reverse_lazy("create_ads"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Ad.objects.get(id=response.data["data"]["id"])
+
+    def test_near_duplicate_description_is_flagged(self):
+        original = self._create_ad("Apartment", self.description)
+        repost = self._create_ad("Apartment for rent", self.description.replace("balcony", "balcony!") + " today")
+        unrelated = self._create_ad("Bicycle", "Mountain bike with new tyres, lightly used, collection only")
+
+        self.assertEqual(AdFingerprint.objects.get(ad=repost).duplicate_of_id, original.id)
+        self.assertIsNone(AdFingerprint.objects.get(ad=unrelated).duplicate_of_id)
+
+    def test_suspected_duplicates_are_shown_to_moderators(self):
+        original = self._create_ad("Apartment", self.description)
+        repost = self._create_ad("Apartment for rent", self.description + " today")
+        AdReport.objects.create(ad=repost, reporter=self.user, text="Spam")
+        staff = self.User.objects.create_superuser(email="moderator@example.com", full_name="Moderator",
+                                                   phone_number="+123456789", password="string")
+
+        self.client.force_login(staff)
+        response = self.client.get(reverse_lazy("admin:ads_ad_changelist"), {"duplicate": "yes"})
+        self.assertEqual([ad.id for ad in response.context["cl"].result_list], [repost.id])
+        self.assertContains(response, reverse_lazy("admin:ads_ad_change", args=[original.id]))
+
+        self.client.force_authenticate(user=staff)
+        response = self.client.get(reverse_lazy("ads_moderation_queue"))
+        self.assertEqual(response.json()["data"][0]["duplicate_of"], str(original.id))
+
+    def test_updating_to_a_duplicate_description_holds_the_ad(self):
+        self._create_ad("Apartment", self.description)
+        other = self._create_ad("Bicycle", "Mountain bike with new tyres, lightly used, collection only")
+        Ad.objects.filter(id=other.id).update(status=STATUS_ACTIVE, is_approved=True)
+
+        response = self.client.patch(reverse_lazy("update_ad", kwargs={"ad_id": other.id}),
+                                     {"description": self.description}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        other.refresh_from_db()
+        self.assertEqual((other.status, other.is_approved), (STATUS_PENDING, False))
+
+    def test_index_is_loaded_from_persisted_fingerprints(self):
+        original = self._create_ad("Apartment", self.description)
+        detector = AdDuplicateDetector()
+        self.assertEqual(detector.find_duplicates(self.description)[0][0], original.id)
+
+    @override_settings(AD_DUPLICATE_INDEX_PRELOAD=True)
+    def test_first_request_preloads_the_index_in_the_background(self):
+        original = self._create_ad("Apartment", self.description)
+        detector = AdDuplicateDetector()
+        request_started.connect(detector.preload)
+        self.addCleanup(request_started.disconnect, detector.preload)
+        with mock.patch("ads.duplicates.threading.Thread") as thread:
+            request_started.send(sender=None)
+            request_started.send(sender=None)
+        thread.assert_called_once_with(target=detector._preload, daemon=True)
+
+        with mock.patch("ads.duplicates.connection"):
+            detector._preload()
+        with self.assertNumQueries(1):
+            # Only the check that the match still exists
+            self.assertEqual(detector.find_duplicates(self.description)[0][0], original.id)
+
+    def test_refresh_picks_up_fingerprints_committed_out_of_order(self):
+        self._create_ad("Bicycle", "Mountain bike with new tyres, lightly used, collection only")
+        detector = AdDuplicateDetector()
+        detector.load()
+        # Written by a transaction that started before the last load but committed after it
+        late = Ad.objects.create(ad_creator=self.user, name="Apartment", description=self.description)
+        AdFingerprint.objects.create(ad=late, signature=detector.hasher.signature(self.description).tobytes())
+        AdFingerprint.objects.filter(ad=late).update(updated=detector._watermark - timedelta(seconds=30))
+
+        detector._refreshed_at = 0
+        self.assertEqual(detector.find_duplicates(self.description)[0][0], late.id)
+
+
+class ImageDeduplicationTestCase(APITestCase):
+    """
+    Images are served from an in-memory store through an injected fetcher.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("images@example.com", "Image User")
+        cls.profile = MatrimonialProfile.objects.create(user=cls.user, age=30, gender="Male", country="Bangladesh",
+                                                        city="Dhaka")
+
+    def setUp(self):
+        self.store = {}
+        self.ad = Ad.objects.create(ad_creator=self.user, name="Sofa", description="Sofa")
+
+    def _store_image(self, name, image):
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG" if name.endswith(".png") else "JPEG")
+        url = f"https://images.example.com/{name}"
+        self.store[url] = buffer.getvalue()
+        return url
+
+    def _fetch(self, url):
+        try:
+            return self.store[url]
+        except KeyError:
+            raise OSError(f"404: {url}")
+
+    @staticmethod
+    def _picture(size, shapes):
+        image = Image.new("RGB", size, "white")
+        draw = ImageDraw.Draw(image)
+        for box, colour in shapes:
+            draw.ellipse([coordinate * size[0] // 100 for coordinate in box], fill=colour)
+        return image
+
+    def test_reused_photo_is_found_across_ads_and_profiles(self):
+        sofa = self._picture((400, 300), [((10, 10, 60, 60), "red"), ((50, 40, 95, 90), "navy")])
+        original = AdImage.objects.create(ad=self.ad, image=self._store_image("sofa.png", sofa))
+        # The same photo, downscaled and recompressed
+        reused = MatrimonialProfileImage.objects.create(
+                matrimonial_profile=self.profile, image=self._store_image("reused.jpg", sofa.resize((200, 150)))
+        )
+        other = AdImage.objects.create(ad=self.ad, image=self._store_image(
+                "other.png", self._picture((400, 300), [((40, 5, 95, 50), "green"), ((5, 50, 45, 95), "black")])
+        ))
+        missing = AdImage.objects.create(ad=self.ad, image="https://images.example.com/missing.png")
+
+        self.assertEqual(hash_images(AdImage.objects.all(), fetch=self._fetch), (2, 1))
+        self.assertEqual(hash_images(MatrimonialProfileImage.objects.all(), fetch=self._fetch), (1, 0))
+
+        tree = build_image_index(AdImage.objects.all(), MatrimonialProfileImage.objects.all())
+        original.refresh_from_db()
+        matches = {key for key, _ in tree.search(to_unsigned(original.phash), max_distance=4)}
+        self.assertEqual(matches, {("ads.AdImage", original.id), ("matrimonials.MatrimonialProfileImage", reused.id)})
+        self.assertNotIn(("ads.AdImage", other.id), matches)
+        self.assertIsNone(AdImage.objects.get(id=missing.id).phash)
+
+    def test_new_ad_images_are_hashed_once_committed(self):
+        category = AdCategory.objects.create(title="Furniture", image="https://example.com/furniture.png")
+        AdSubCategory.objects.create(category=category, title="Sofas")
+        url = self._store_image("sofa.png", self._picture((400, 300), [((10, 10, 60, 60), "red")]))
+        self.client.force_authenticate(user=self.user)
+        with mock.patch("common.images.threading.Thread") as thread, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse_lazy("create_ads"), {
+                "name": "Red sofa", "description": "A red sofa", "price": "80", "location": "Dhaka",
+                "category": "Furniture", "sub_category": "Sofas", "images": [url],
+            }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        image = AdImage.objects.get(ad_id=response.data["data"]["id"])
+        self.assertIsNone(image.phash)
+
+        target, args = thread.call_args.kwargs["target"], thread.call_args.kwargs["args"]
+        self.assertEqual(args, (AdImage, [image.id]))
+        with mock.patch("common.images.open_image", side_effect=lambda url, fetch: Image.open(
+                io.BytesIO(self._fetch(url)))), mock.patch("common.images.connection"):
+            target(*args)
+        image.refresh_from_db()
+        self.assertIsNotNone(image.phash)
+
+    def test_unsafe_image_urls_are_not_fetched(self):
+        public = [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("93.184.216.34", 443))]
+        with mock.patch("common.images.socket.getaddrinfo", return_value=public):
+            check_image_url("https://images.example.com/sofa.png")
+        for url in ("file:///etc/passwd", "ftp://images.example.com/sofa.png", "gopher://images.example.com/"):
+            with self.subTest(url=url), self.assertRaises(ValueError):
+                check_image_url(url)
+        for address in ("127.0.0.1", "10.0.0.5", "169.254.169.254", "192.168.1.1", "::1"):
+            family = socket.AF_INET6 if ":" in address else socket.AF_INET
+            resolved = [(family, socket.SOCK_STREAM, 6, "", (address, 80))]
+            with self.subTest(address=address), self.assertRaises(ValueError), \
+                    mock.patch("common.images.socket.getaddrinfo", return_value=resolved):
+                check_image_url("http://internal.example.com/sofa.png")
+
+    def test_oversized_images_are_rejected(self):
+        public = [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("93.184.216.34", 443))]
+        with mock.patch("common.images.socket.getaddrinfo", return_value=public), \
+                mock.patch("common.images._opener.open", side_effect=lambda *args, **kwargs: io.BytesIO(b"x" * 11)):
+            self.assertEqual(fetch_image("https://images.example.com/a.png", max_bytes=11), b"x" * 11)
+            with self.assertRaises(ValueError):
+                fetch_image("https://images.example.com/a.png", max_bytes=10)
+
+
+@override_settings(AD_REPORT_HIDE_THRESHOLD=3)
+class ModerationQueueTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.User = get_user_model()
+        cls.staff = cls.User.objects.create_superuser(
+                email="staff@example.com", full_name="Staff User", phone_number="+123456789", password="string"
+        )
+        cls.reporters = [
+            create_user(f"reporter{i}@example.com", f"Reporter {i}")
+            for i in range(3)
+        ]
+        cls.ads = [
+            Ad.objects.create(ad_creator=cls.staff, name=f"Ad {i}", description="An ad", is_approved=True,
+                              status=STATUS_ACTIVE)
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.staff)
+
+    def _report(self, ad, times):
+        for reporter in self.reporters[:times]:
+            AdReport.objects.create(ad=ad, reporter=reporter, text="Spam")
+
+    def test_ad_is_hidden_once_reports_reach_the_threshold(self):
+        self._report(self.ads[0], 2)
+        self.ads[0].refresh_from_db()
+        self.assertEqual((self.ads[0].report_count, self.ads[0].status), (2, STATUS_ACTIVE))
+
+        self._report(self.ads[1], 3)
+        self.ads[1].refresh_from_db()
+        self.assertEqual((self.ads[1].report_count, self.ads[1].status), (3, STATUS_PENDING))
+
+        AdReport.objects.filter(ad=self.ads[1]).first().delete()
+        self.ads[1].refresh_from_db()
+        self.assertEqual(self.ads[1].report_count, 2)
+
+    def test_a_user_reporting_an_ad_again_is_not_counted(self):
+        self.client.force_authenticate(user=self.reporters[0])
+        url = reverse_lazy("report_ad")
+        response = self.client.post(url, {"ad": self.ads[0].id, "text": "Spam"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for _ in range(4):
+            response = self.client.post(url, {"ad": self.ads[0].id, "text": "Spam"})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.ads[0].refresh_from_db()
+        self.assertEqual((self.ads[0].report_count, self.ads[0].status), (1, STATUS_ACTIVE))
+        self.assertEqual(AdReport.objects.filter(ad=self.ads[0]).count(), 1)
+
+    def test_queue_pages_by_report_count_with_a_cursor(self):
+        for ad, times in zip(self.ads, [1, 3, 2, 1]):
+            self._report(ad, times)
+
+        url = reverse_lazy("ads_moderation_queue")
+        pages, cursor = [], None
+        with mock.patch.object(ModerationQueueView, "page_size", 2):
+            while True:
+                response = self.client.get(url, {"cursor": cursor} if cursor else {})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                pages.append([(ad["name"], ad["report_count"]) for ad in response.json()["data"]])
+                cursor = response.json()["next"]
+                if cursor is None:
+                    break
+        self.assertEqual([len(page) for page in pages], [2, 2])
+        seen = pages[0] + pages[1]
+        self.assertEqual(seen[:2], [("Ad 1", 3), ("Ad 2", 2)])
+        self.assertEqual(sorted(seen[2:]), [("Ad 0", 1), ("Ad 3", 1)])
+
+        response = self.client.get(url, {"cursor": "not a cursor"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_malformed_cursors_are_rejected(self):
+        url = reverse_lazy("ads_moderation_queue")
+        for values in [5, ["a"], {"a": 1}, [1, "not-a-uuid"], ["1", str(self.ads[0].id)], [1, 2], None]:
+            with self.subTest(values=values):
+                response = self.client.get(url, {"cursor": encode_cursor(values)})
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_moderation_is_a_single_update(self):
+        for ad in self.ads[:3]:
+            self._report(ad, 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(moderate_ads([ad.id for ad in self.ads[:3]], "deny"), 3)
+        self.assertEqual(
+                set(Ad.objects.filter(id__in=[ad.id for ad in self.ads[:3]]).values_list("status", "report_count")),
+                {(STATUS_DENIED, 0)}
+        )
+
+        response = self.client.post(reverse_lazy("moderate_ads"),
+                                    {"action": "approve", "ads": [str(self.ads[0].id)]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["data"]["updated"], 1)
+
+
+@override_settings(AD_COUNTER_FLUSH_INTERVAL=None)
+class BulkAdModerationTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.User = get_user_model()
+        cls.staff = cls.User.objects.create_superuser(
+                email="bulk@example.com", full_name="Bulk Staff", phone_number="+123456789", password="string"
+        )
+        cls.category = AdCategory.objects.create(title="Cars", image="https://example.com/cars.png")
+
+    def setUp(self):
+        self.ads = [
+            Ad.objects.create(ad_creator=self.staff, name=f"Car {i}", description="A car", category=self.category)
+            for i in range(4)
+        ]
+        self.bulk_events = []
+        handler = lambda sender, **kwargs: self.bulk_events.append(kwargs)
+        ads_bulk_updated.connect(handler, sender=Ad)
+        self.addCleanup(ads_bulk_updated.disconnect, handler, sender=Ad)
+
+    def test_admin_actions_update_the_selection_in_one_query(self):
+        self.client.force_login(self.staff)
+        changelist = reverse_lazy("admin:ads_ad_changelist")
+        selection = [str(ad.id) for ad in self.ads[:3]]
+
+        response = self.client.post(changelist, {"action": "approve_ads", "_selected_action": selection})
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.client.post(changelist, {"action": "pause_ads", "_selected_action": selection[:1]})
+
+        self.assertEqual(
+                list(Ad.objects.order_by("name").values_list("is_approved", "status")),
+                [(True, STATUS_PAUSED), (True, STATUS_ACTIVE), (True, STATUS_ACTIVE), (False, STATUS_PENDING)]
+        )
+        self.assertEqual([(event["action"], event["count"]) for event in self.bulk_events],
+                         [("approve", 3), ("pause", 1)])
+
+    def test_featured_ads_can_be_unfeatured(self):
+        self.client.force_login(self.staff)
+        changelist = reverse_lazy("admin:ads_ad_changelist")
+        Ad.objects.filter(id=self.ads[0].id).update(report_count=2)
+        self.client.post(changelist, {"action": "feature_ads", "_selected_action": [str(ad.id) for ad in self.ads]})
+        self.client.post(changelist, {"action": "unfeature_ads", "_selected_action": [str(self.ads[0].id)]})
+
+        self.assertEqual(list(Ad.objects.order_by("name").values_list("featured", flat=True)),
+                         [False, True, True, True])
+        # Neither is a review, so the reports stay queued
+        self.assertEqual(Ad.objects.get(id=self.ads[0].id).report_count, 2)
+        self.assertEqual([(event["action"], event["count"]) for event in self.bulk_events],
+                         [("feature", 4), ("unfeature", 1)])
+
+    def test_large_id_lists_are_batched_and_announced_once(self):
+        ad_ids = [ad.id for ad in self.ads]
+        with mock.patch("ads.moderation.MODERATION_BATCH_SIZE", 3):
+            self.assertEqual(moderate_ads(ad_ids, "feature"), 4)
+        self.assertEqual(Ad.objects.filter(featured=True).count(), 4)
+        self.assertEqual(self.bulk_events, [{"action": "feature", "count": 4, "signal": ads_bulk_updated}])
+
+    def test_feed_cache_is_invalidated_by_bulk_updates(self):
+        client = APIClient()
+        client.force_authenticate(user=self.staff)
+        url = reverse_lazy("all_ads")
+        moderate_ads([ad.id for ad in self.ads[:2]], "approve")
+
+        self.assertEqual(len(client.get(url).json()["data"]), 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(client.get(url).json()["data"]), 2)
+
+        moderate_ads([ad.id for ad in self.ads], "approve")
+        self.assertEqual(len(client.get(url).json()["data"]), 4)
+
+
+class AdminChangelistTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.User = get_user_model()
+        cls.staff = cls.User.objects.create_superuser(
+                email="admin@example.com", full_name="Admin User", phone_number="+123456789", password="string"
+        )
+        cls.category = AdCategory.objects.create(title="Phones", image="https://example.com/phones.png")
+        for i in range(3):
+            AdSubCategory.objects.create(category=cls.category, title=f"Brand {i}")
+
+    def _add_ads(self, count):
+        for i in range(count):
+            creator = create_user(f"seller{self.User.objects.count()}@example.com", "Seller")
+            category = AdCategory.objects.create(title=f"Category {creator.email}", image="https://example.com/c.png")
+            Ad.objects.create(ad_creator=creator, name=f"Phone {i}", description="A phone", category=category)
+
+    def test_category_counts_do_not_multiply(self):
+        Ad.objects.create(ad_creator=self.staff, name="Phone A", description="A phone", category=self.category)
+        Ad.objects.create(ad_creator=self.staff, name="Phone B", description="A phone", category=self.category)
+        category = admin.site._registry[AdCategory].get_queryset(None).get(id=self.category.id)
+        self.assertEqual((category.ads_count, category.sub_categories_count), (2, 3))
+
+    def test_ad_changelist_queries_do_not_grow_with_rows(self):
+        self.client.force_login(self.staff)
+        changelist = reverse_lazy("admin:ads_ad_changelist")
+
+        self._add_ads(2)
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(self.client.get(changelist).status_code, status.HTTP_200_OK)
+        self._add_ads(5)
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(self.client.get(changelist).status_code, status.HTTP_200_OK)
+        self.assertEqual(len(few), len(many))
+
+    @override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=1)
+    def test_unfiltered_lists_paginate_on_the_row_estimate(self):
+        self._add_ads(3)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self._add_ads(1)
+
+        self.assertEqual(EstimatedCountPaginator(Ad.objects.all(), 20).count, 3)
+        self.assertEqual(EstimatedCountPaginator(Ad.objects.filter(name__startswith="Phone"), 20).count, 4)
+
+    def test_admin_search_uses_the_search_indexes(self):
+        self.client.force_login(self.staff)
+        self._add_ads(1)
+        response = self.client.get(reverse_lazy("admin:core_user_changelist"), {"q": "ADMIN@"})
+        self.assertContains(response, "admin@example.com")
+        self.assertNotContains(response, "seller")
+        response = self.client.get(reverse_lazy("admin:core_profile_changelist"), {"q": "admin"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Fields that did not opt into prefix search still match anywhere
+        response = self.client.get(reverse_lazy("admin:core_user_changelist"), {"q": "@EXAMPLE.com"})
+        self.assertContains(response, "admin@example.com")
+        self.assertContains(response, "seller")
+        for term, titles in (("PHO", ["Phones"]), ("hones", [])):
+            response = self.client.get(reverse_lazy("admin:ads_adcategory_changelist"), {"q": term})
+            self.assertEqual([category.title for category in response.context["cl"].result_list], titles)
+
+        # SQLite fallback: prefix searches are answered from the NOCASE indexes
+        self.assertIn("core_user_email_trgm", self.User.objects.filter(email__istartswith="adm").explain())
+        self.assertIn("ads_ad_name_trgm", Ad.objects.filter(name__istartswith="pho").explain())
+
+
+class IndexedOrderingTestCase(APITestCase):
+    """
+    The newest-first lists served per user, chat and profile must be read in
+    index order. SQLite reports a separate sort step as "USE TEMP B-TREE".
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("ordering@example.com", "Ordering User")
+        cls.ad = Ad.objects.create(ad_creator=cls.user, name="Bike", description="A bike")
+        cls.chat = Chat.objects.create(ad=cls.ad, initiator=cls.user, receiver=cls.user)
+        cls.profile = MatrimonialProfile.objects.create(user=cls.user, age=30, gender="Male", country="Bangladesh",
+                                                        city="Dhaka")
+
+    def assertIndexedOrdering(self, queryset):
+        plan = queryset.explain()
+        self.assertNotIn("TEMP B-TREE", plan, f"{queryset.query}\n{plan}")
+
+    def test_hot_orderings_are_served_by_indexes(self):
+        querysets = [
+            self.user.otp.order_by('-created')[:1],
+            Ad.objects.filter(ad_creator=self.user).order_by('-created'),
+            self.chat.messages.order_by('-created'),
+            Message.objects.filter(chat=self.chat).order_by('-created')[:1],
+            ConnectionRequest.objects.filter(sender=self.profile).order_by('-created'),
+            ConnectionRequest.objects.filter(receiver=self.profile).order_by('-created'),
+            ProfileMessage.objects.filter(conversation_id=self.profile.id).order_by('-created')[:1],
+            Ad.objects.filter(is_approved=True, status=STATUS_ACTIVE).order_by('-created'),
+            Ad.objects.filter(is_approved=True, status=STATUS_ACTIVE).order_by('-trending_score'),
+            AdsByCategoryMixin.get_ads_by_category(uuid.uuid4()),
+            FilteredAdsListView.queryset,
+        ]
+        for queryset in querysets:
+            with self.subTest(query=str(queryset.query)):
+                self.assertIndexedOrdering(queryset)
+
+    def test_models_have_no_implicit_ordering(self):
+        for model in (Ad, Chat, Message, Otp, ConnectionRequest, ProfileMessage):
+            with self.subTest(model=model.__name__):
+                self.assertFalse(model.objects.all().query.get_meta().ordering)
+                self.assertNotIn("ORDER BY", str(model.objects.filter(created__isnull=False).query))
+
+
+class ChatRoomTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_user("seller@example.com", "Seller")
+        cls.buyer = create_user("buyer@example.com", "Buyer")
+        for user in (cls.seller, cls.buyer):
+            user.profile.avatar = "https://example.com/avatar.png"
+            user.profile.save()
+        cls.ad = Ad.objects.create(ad_creator=cls.seller, name="Desk", description="A desk")
+
+    def _send(self, sender, receiver, text):
+        client = APIClient()
+        client.force_authenticate(user=sender)
+        response = client.post(reverse_lazy("start_chat"),
+                               {"ad_id": str(self.ad.id), "receiver": str(receiver.id), "text": text})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.json()["data"]["id"]
+
+    def test_both_parties_write_into_one_chat(self):
+        first = self._send(self.buyer, self.seller, "Is it available?")
+        reply = self._send(self.seller, self.buyer, "Yes")
+        self.assertEqual(first, reply)
+        self.assertEqual(Chat.objects.count(), 1)
+        self.assertEqual(Message.objects.filter(chat_id=first).count(), 2)
+
+    def test_pair_is_unique_per_ad(self):
+        Chat.objects.create(ad=self.ad, initiator=self.buyer, receiver=self.seller)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Chat.objects.create(ad=self.ad, initiator=self.seller, receiver=self.buyer)
+
+        other_ad = Ad.objects.create(ad_creator=self.seller, name="Chair", description="A chair")
+        Chat.objects.create(ad=other_ad, initiator=self.seller, receiver=self.buyer)
+        self.assertEqual(Chat.objects.count(), 2)
+
+
+@override_settings(AD_EXPORT_CHUNK_SIZE=2)
+class AdExportTestCase(AuthenticatedAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("exporter@example.com", "Exporter")
+        category = AdCategory.objects.create(title="Furniture")
+        cls.ads = [
+            Ad.objects.create(ad_creator=cls.user, name=f"Ad {i}", description="An ad", category=category,
+                              is_approved=True, status=STATUS_ACTIVE)
+            for i in range(5)
+        ]
+        for ad in cls.ads:
+            AdImage.objects.create(ad=ad, image=f"https://example.com/{ad.name}.png")
+        Ad.objects.create(ad_creator=cls.user, name="Hidden", description="Not approved")
+
+    def _export(self, output):
+        response = self.client.get(reverse_lazy("export_ads"), {"output": output})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        # One query for the ads plus one image query per chunk of two
+        with self.assertNumQueries(4):
+            return b"".join(response.streaming_content).decode()
+
+    async def test_export_under_asgi_queries_outside_the_event_loop(self):
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": str(reverse_lazy("export_ads")), "query_string": b"output=csv", "server": ("testserver", 80),
+            "headers": [(b"host", b"testserver"),
+                        (b"authorization", f"Bearer {AccessToken.for_user(self.user)}".encode())],
+        }
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        # As the test client does: closing the connection would end the test's transaction
+        request_started.disconnect(close_old_connections)
+        try:
+            await get_asgi_application()(scope, receive, send)
+        finally:
+            request_started.connect(close_old_connections)
+
+        self.assertEqual(messages[0]["status"], status.HTTP_200_OK)
+        self.assertIn((b"Content-Disposition", b'attachment; filename="ads.csv"'), messages[0]["headers"])
+        body = b"".join(message.get("body", b"") for message in messages[1:]).decode()
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([row["name"] for row in rows], [ad.name for ad in self.ads])
+
+    def test_ndjson_export_streams_approved_active_ads(self):
+        rows = [json.loads(line) for line in self._export("ndjson").splitlines()]
+        self.assertEqual([row["name"] for row in rows], [ad.name for ad in self.ads])
+        self.assertEqual(rows[0]["images"], ["https://example.com/Ad 0.png"])
+        self.assertEqual((rows[0]["category"], rows[0]["ad_owner_id"]), ("Furniture", str(self.user.id)))
+
+    def test_csv_export_has_a_header_and_one_line_per_ad(self):
+        rows = list(csv.DictReader(io.StringIO(self._export("csv"))))
+        self.assertEqual([row["name"] for row in rows], [ad.name for ad in self.ads])
+        self.assertEqual(rows[4]["images"], "https://example.com/Ad 4.png")
+
+    def test_unknown_output_is_rejected(self):
+        response = self.client.get(reverse_lazy("export_ads"), {"output": "xml"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_command_can_include_inactive_ads(self):
+        out = io.StringIO()
+        call_command("export_ads", "--all", stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 6)
+
+
+class SparseFieldsetTestCase(AuthenticatedAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("cards@example.com", "Card Seller")
+        category = AdCategory.objects.create(title="Phones")
+        for i in range(3):
+            ad = Ad.objects.create(ad_creator=cls.user, name=f"Phone {i}", description="A long description",
+                                   price="10", category=category, is_approved=True, status=STATUS_ACTIVE)
+            AdImage.objects.create(ad=ad, image=f"https://example.com/{i}.png")
+
+    def _get(self, name, fields=None):
+        params = {} if fields is None else {"fields": fields}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse_lazy(name), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()["data"], [query["sql"] for query in queries.captured_queries]
+
+    def test_all_ads_select_only_the_requested_fields(self):
+        full, _ = self._get("all_ads")
+        self.assertEqual(len(full[0]), 15)
+
+        data, queries = self._get("all_ads", "name,price")
+        self.assertEqual([sorted(row) for row in data], [["id", "name", "price"]] * 3)
+        self.assertEqual({row["name"] for row in data}, {row["name"] for row in full})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"description"', queries[0])
+        self.assertNotIn("JOIN", queries[0])
+
+        data, queries = self._get("all_ads", "ad_owner_image,images")
+        self.assertEqual(data[0]["ad_owner_image"], full[0]["ad_owner_image"])
+        self.assertEqual(data[0]["images"], full[0]["images"])
+        self.assertEqual(len(queries), 2)
+
+    def test_filtered_ads_trim_the_serializer_and_skip_the_image_prefetch(self):
+        data, queries = self._get("ads_search_and_filters", "name")
+        self.assertEqual(sorted(data[0]), ["id", "name"])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"description"', queries[0])
+
+        data, queries = self._get("ads_search_and_filters")
+        self.assertEqual(data[0]["images"], ["https://example.com/2.png"])
+        self.assertEqual(len(queries), 2)
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(reverse_lazy("all_ads"), {"fields": "name,password"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConditionalGetTestCase(AuthenticatedAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("etag@example.com", "ETag User")
+        cls.category = AdCategory.objects.create(title="Books", image="https://example.com/books.png")
+        cls.sub_category = AdSubCategory.objects.create(category=cls.category, title="Novels")
+        cls.ad = Ad.objects.create(ad_creator=cls.user, name="Novel", description="A novel", category=cls.category,
+                                   is_approved=True, status=STATUS_ACTIVE)
+
+    def test_category_tree_revalidates_from_aggregates(self):
+        url = reverse_lazy("categories_and_sub_categories")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.sub_category.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code,
+                         status.HTTP_200_OK)
+
+    def test_category_tree_is_not_revalidated_by_date(self):
+        url = reverse_lazy("categories_and_sub_categories")
+        AdSubCategory.objects.create(category=self.category, title="Poetry")
+        response = self.client.get(url)
+        self.assertNotIn("Last-Modified", response)
+
+        # Deleting an older row leaves the newest `updated` as it was
+        self.sub_category.delete()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([sub["title"] for sub in response.json()["data"][0]["sub_category"]], ["Poetry"])
+
+    @mock.patch("ads.cache.cache_is_shared", return_value=True)
+    def test_ads_and_categories_revalidate_without_queries(self, cache_is_shared):
+        url = reverse_lazy("ads_and_categories")
+        etag = self.client.get(url)["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # Another representation of the same data is not a match
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        AdImage.objects.create(ad=self.ad, image="https://example.com/novel.png")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    @mock.patch("ads.cache.cache_is_shared", return_value=False)
+    def test_ads_and_categories_revalidate_from_aggregates_without_a_shared_cache(self, cache_is_shared):
+        url = reverse_lazy("ads_and_categories")
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Changes made by another process leave this process's generation alone
+        changes = [
+            lambda: Ad.objects.filter(id=self.ad.id).update(name="Poems", updated=timezone.now()),
+            lambda: AdImage.objects.bulk_create([AdImage(ad=self.ad, image="https://example.com/poems.png")]),
+            lambda: AdSubCategory.objects.filter(id=self.sub_category.id).delete(),
+            lambda: moderate_ads([self.ad.id], "deny"),
+        ]
+        for change in changes:
+            with mock.patch("ads.signals.bump_feed_generation"):
+                change()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            etag = response["ETag"]
+
+
+class CategoryTreeTestCase(AuthenticatedAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("tree@example.com", "Tree User")
+        # bulk_create sends no signals, so the tree is only invalidated by the cache.clear() in setUp
+        for title, sub_titles in (("Vehicles", ("Cars", "Motorbikes")), ("Electronics", ("Phones", "Laptops")),
+                                  ("Fashion", ())):
+            category, = AdCategory.objects.bulk_create([AdCategory(title=title,
+                                                                   image=f"https://example.com/{title}.png")])
+            AdSubCategory.objects.bulk_create([AdSubCategory(category=category, title=sub_title)
+                                               for sub_title in sub_titles])
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_listing_does_not_query_per_category(self):
+        self.assertIs(category_tree(), category_tree())
+        # Only the conditional GET validator's two aggregates
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse_lazy("categories_and_sub_categories"))
+        self.assertEqual([category["title"] for category in response.data["data"]],
+                         ["Fashion", "Electronics", "Vehicles"])
+        self.assertEqual(response.data["data"][2]["sub_category"], [{"title": "Cars"}, {"title": "Motorbikes"}])
+
+    def test_titles_resolve_case_insensitively_and_by_unique_substring(self):
+        tree = category_tree()
+        vehicles = tree.resolve_category("vehicles")
+        self.assertEqual(vehicles.title, "Vehicles")
+        self.assertEqual(tree.resolve_category("Electro").title, "Electronics")
+        self.assertEqual(tree.resolve_sub_category(vehicles, "motor").title, "Motorbikes")
+        # "o" is in several titles, so it names none of them
+        self.assertIsNone(tree.resolve_category("o"))
+        self.assertIsNone(tree.resolve_sub_category(vehicles, "Phones"))
+        self.assertEqual(tree.category(vehicles.id), vehicles)
+
+    def test_ads_are_created_with_categories_from_the_tree(self):
+        category_tree()
+        data = {"name": "Hatchback", "description": "Small car", "price": "500", "location": "Dhaka",
+                "category": "VEHICLES", "sub_category": "cars"}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse_lazy("create_ads"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse([query for query in queries.captured_queries if "ads_adsubcategory" in query["sql"]])
+        ad = Ad.objects.get(name="Hatchback")
+        self.assertEqual((ad.category.title, ad.sub_category.title), ("Vehicles", "Cars"))
+
+
+class CategoryTreeInvalidationTestCase(APITestCase):
+    def test_changes_replace_the_tree_once_committed(self):
+        category = AdCategory.objects.create(title="Vehicles", image="https://example.com/vehicles.png")
+        shared = category_tree()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AdSubCategory.objects.create(category=category, title="Vans")
+            # The writing transaction sees its own change straight away
+            self.assertEqual(len(category_tree().resolve_category("Vehicles").sub_categories), 1)
+        self.assertIsNot(category_tree(), shared)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            category.delete()
+        self.assertIsNone(category_tree().resolve_category("Vehicles"))
+
+
+class CategoryTreeExpiryTestCase(APITestCase):
+    def test_without_a_shared_cache_the_tree_expires(self):
+        tree = category_tree()
+        # Added by another process: nothing bumps this process's generation
+        AdCategory.objects.bulk_create([AdCategory(title="Boats", image="https://example.com/boats.png")])
+        with mock.patch("ads.categories.cache_is_shared", return_value=True):
+            self.assertIs(category_tree(), tree)
+        with mock.patch("ads.categories.cache_is_shared", return_value=False):
+            self.assertIs(category_tree(), tree)
+            with override_settings(CATEGORY_TREE_MAX_AGE=0):
+                self.assertIsNotNone(category_tree().resolve_category("Boats"))
+
+
+class IdentityMapTestCase(AuthenticatedAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, *cls.others = [
+            create_user(f"identity-{i}@example.com", f"Identity User {i}")
+            for i in range(4)
+        ]
+        cls.ad = Ad.objects.create(ad_creator=cls.user, name="Lamp", description="A lamp")
+
+    def test_lookups_are_batched_and_remembered(self):
+        identity = IdentityMap()
+        missing = uuid.uuid4()
+        with self.assertNumQueries(1):
+            users = identity.get_many(get_user_model(), [user.id for user in self.others] + [missing])
+        self.assertIsNone(users[missing])
+        with self.assertNumQueries(0):
+            self.assertIs(identity.get(get_user_model(), self.others[0].email, field="email"),
+                          users[self.others[0].id])
+            self.assertIsNone(identity.get(get_user_model(), missing))
+
+    def test_chat_list_loads_each_user_and_profile_once(self):
+        for i, other in enumerate(self.others):
+            initiator, receiver = (self.user, other) if i % 2 else (other, self.user)
+            chat = Chat.objects.create(ad=self.ad, initiator=initiator, receiver=receiver)
+            Message.objects.create(chat=chat, sender=initiator, text=f"Hello {i}")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse_lazy("chat_list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Newest chat first
+        self.assertEqual([chat["receiving_user"]["full_name"] for chat in response.data["data"]],
+                         [other.full_name for other in reversed(self.others)])
+        tables = [query["sql"].split(" FROM ")[1].split()[0] for query in queries.captured_queries]
+        self.assertEqual(tables.count('"core_user"'), 1)
+        self.assertEqual(tables.count('"core_profile"'), 1)
+
+
+class CompiledSerializerTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.other = [
+            create_user(f"compiled-{i}@example.com", f"Compiled User {i}")
+            for i in range(2)
+        ]
+        category = AdCategory.objects.create(title="Compiled", image="https://example.com/compiled.png")
+        for i, (price, status_, images) in enumerate((("100", STATUS_ACTIVE, 2), (None, STATUS_PAUSED, 0),
+                                                      ("7.50", STATUS_PENDING, 1))):
+            ad = Ad.objects.create(ad_creator=cls.user, name=f"Compiled ad {i}", description="Described",
+                                   price=price, location="Dhaka", category=category, featured=i == 0,
+                                   is_approved=i != 1, status=status_)
+            AdImage.objects.bulk_create([AdImage(ad=ad, image=f"https://example.com/{i}-{n}.png")
+                                         for n in range(images)])
+        for i, (user, religion) in enumerate(((cls.user, "Islam"), (cls.other, None))):
+            profile = MatrimonialProfile.objects.create(user=user, age=30 + i, gender="Male", country="Bangladesh",
+                                                        city="Dhaka", religion=religion)
+            MatrimonialProfileImage.objects.create(matrimonial_profile=profile, image=f"https://example.com/p{i}.png")
+        cls.profile, cls.other_profile = MatrimonialProfile.objects.order_by("age")
+
+        cls.chat = Chat.objects.create(ad=Ad.objects.first(), initiator=cls.user, receiver=cls.other)
+        conversation = Conversation.objects.create(initiator=cls.profile, receiver=cls.other_profile)
+        for attachment in ("", "attachments/receipt.pdf"):
+            Message.objects.create(chat=cls.chat, sender=cls.user, text="Hi", attachment=attachment)
+            ProfileMessage.objects.create(conversation=conversation, sender=cls.other_profile, text="Hi",
+                                          attachment=attachment)
+
+    def assertCompiledOutput(self, serializer_class, queryset, context=None, **kwargs):
+        context = context or {}
+        expected = serializers.ListSerializer(queryset.all(), child=serializer_class(**kwargs), context=context).data
+        self.assertTrue(expected)
+        # From values() rows and from model instances
+        for data in (queryset.all(), list(queryset.all())):
+            compiled = serializer_class(data, many=True, context=context, **kwargs).data
+            self.assertEqual(compiled, expected)
+            self.assertEqual(JSONRenderer().render(compiled), JSONRenderer().render(expected))
+
+    def test_ads_match_drf(self):
+        self.assertCompiledOutput(AdSerializer, Ad.objects.order_by("-created"))
+        self.assertCompiledOutput(AdSerializer, Ad.objects.order_by("name"), fields=("id", "price", "images"))
+
+    def test_matrimonial_profiles_match_drf(self):
+        self.assertCompiledOutput(MatrimonialProfileSerializer, MatrimonialProfile.objects.order_by("-age"))
+
+    def test_messages_match_drf(self):
+        context = {"request": APIRequestFactory().get("/")}
+        self.assertCompiledOutput(AdMessageSerializer, Message.objects.order_by("created"), context=context)
+        self.assertCompiledOutput(AdMessageSerializer, Message.objects.order_by("created"))
+        self.assertCompiledOutput(ProfileMessageSerializer, ProfileMessage.objects.order_by("-created"),
+                                  context=context)
+        with timezone.override("Asia/Dhaka"):
+            self.assertCompiledOutput(ProfileMessageSerializer, ProfileMessage.objects.order_by("-created"))
+
+    def test_querysets_are_read_as_values(self):
+        with self.assertNumQueries(2):
+            data = AdSerializer(Ad.objects.order_by("-created"), many=True).data
+        self.assertEqual(len(data), 3)
+
+    def test_prefetched_messages_are_not_read_again(self):
+        chat = Chat.objects.prefetch_related(Prefetch("messages", queryset=Message.objects.order_by("-created"))).get()
+        with self.assertNumQueries(0):
+            messages = AdMessageSerializer(chat.messages, many=True).data
+        self.assertTrue(messages[0]["attachment"].endswith("attachments/receipt.pdf"))
+        self.assertIsNone(messages[1]["attachment"])
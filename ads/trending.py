@@ -0,0 +1,64 @@
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils import timezone
+
+from ads.choices import STATUS_ACTIVE
+from ads.models import Ad, Chat, FavouriteAd
+
+
+def refresh_trending_scores(now=None, batch_size=500):
+    """
+    Decay every active ad's trending score to `now` and add the signals that
+    arrived since it was last scored: new views, favourites and chat starts.
+    Favourites and chats are weighted by their own age, views are counted at
+    `now` because only their running total is stored. Ads are streamed and
+    written back `batch_size` at a time.
+
+    Returns the number of ads scored.
+    """
+    now = now or timezone.now()
+    decay_rate = math.log(2) / settings.AD_TRENDING_HALF_LIFE.total_seconds()
+    weights = settings.AD_TRENDING_WEIGHTS
+
+    # Walk the primary key so rewriting trending_score never moves rows the cursor has still to read
+    ads = (Ad.objects.filter(is_approved=True, status=STATUS_ACTIVE)
+           .only('id', 'created', 'views', 'trending_score', 'trending_views', 'trending_updated')
+           .order_by('pk'))
+    batch = []
+    scored = 0
+    for ad in ads.iterator(chunk_size=batch_size):
+        batch.append(ad)
+        if len(batch) == batch_size:
+            scored += _score_batch(batch, now, decay_rate, weights)
+            batch = []
+    if batch:
+        scored += _score_batch(batch, now, decay_rate, weights)
+    return scored
+
+
+def _score_batch(ads, now, decay_rate, weights):
+    scored_until = {ad.id: ad.trending_updated or ad.created for ad in ads}
+    oldest = min(scored_until.values())
+
+    event_scores = defaultdict(float)
+    for model, weight in ((FavouriteAd, weights["favourites"]), (Chat, weights["chats"])):
+        events = (model.objects.filter(ad_id__in=scored_until, created__gt=oldest, created__lte=now)
+                  .order_by()
+                  .values_list('ad_id', 'created'))
+        for ad_id, created in events.iterator():
+            if created > scored_until[ad_id]:
+                event_scores[ad_id] += weight * math.exp(-decay_rate * (now - created).total_seconds())
+
+    for ad in ads:
+        elapsed = (now - scored_until[ad.id]).total_seconds()
+        new_views = max(ad.views - ad.trending_views, 0)
+        ad.trending_score = (ad.trending_score * math.exp(-decay_rate * elapsed)
+                             + weights["views"] * new_views
+                             + event_scores[ad.id])
+        ad.trending_views = ad.views
+        ad.trending_updated = now
+
+    Ad.objects.bulk_update(ads, ['trending_score', 'trending_views', 'trending_updated'])
+    return len(ads)
@@ -14,12 +14,15 @@ urlpatterns = [
     path('ad/<str:ad_id>/details/', views.RetrieveAdView.as_view(), name="ad_details"),
     path('ad/<str:ad_id>/delete/', views.DeleteUserAdView.as_view(), name="delete_ad"),
     path('ad/<str:ad_id>/update/', views.UpdateUserAdView.as_view(), name="update_ad"),
+    path('ads/export/', views.ExportAdsView.as_view(), name="export_ads"),
     path('ads/search-filters/', views.FilteredAdsListView.as_view(), name="ads_search_and_filters"),
     path('categories/sub-categories/', views.RetrieveAllCategoriesAndSubcategories.as_view(),
          name="categories_and_sub_categories"),
     path('creator/ads/all/', views.RetrieveUserAdsView.as_view(), name="all_creator_ads"),
     path('favourite-ads/<str:ad_id>/add/', views.FavouriteAdView.as_view(), name="add_favourite_ad"),
     path('favourite-ads/', views.FavouriteAdListView.as_view(), name="favourite_ads_list"),
+    path('moderation/queue/', views.ModerationQueueView.as_view(), name="ads_moderation_queue"),
+    path('moderation/ads/', views.ModerateAdsView.as_view(), name="moderate_ads"),
 ]
 
 websocket_urlpatterns = [
@@ -1,25 +1,37 @@
 from collections import defaultdict
+from operator import attrgetter
 
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from django.db.models import Q
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
+from django.db.models import Prefetch, Q
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from drf_spectacular.utils import OpenApiResponse, extend_schema
+from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema
 from rest_framework import status
 from rest_framework.filters import SearchFilter
 from rest_framework.generics import GenericAPIView, ListAPIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.throttling import UserRateThrottle
 
+from ads.cache import FEED_CACHE_TIMEOUT, category_catalog_version, feed_cache_key, feed_version
+from ads.categories import category_tree
 from ads.choices import STATUS_ACTIVE
+from ads.counters import ad_counters
+from ads.export import EXPORT_CONTENT_TYPES, EXPORT_FORMATS, export_lines, export_queryset, export_rows, \
+    spool_lines
 from ads.filters import AdFilter
 from ads.mixins import AdsByCategoryMixin
-from ads.models import Ad, AdCategory, Chat, FavouriteAd
-from ads.serializers import AdCategorySerializer, AdSerializer, ChatListSerializer, ChatSerializer, CreateAdSerializer, \
-    ReportAdSerializer, ChatCreateSerializer
+from ads.models import Ad, Chat, FavouriteAd, Message, SimilarAd
+from ads.moderation import moderate_ads
+from ads.serializers import AD_IMAGES_PREFETCH, AdCategorySerializer, AdSerializer, ChatListSerializer, ChatSerializer, CreateAdSerializer, \
+    ModerationActionSerializer, ReportAdSerializer, ReportedAdSerializer, ChatCreateSerializer
+from common.conditional import conditional_get
+from common.fieldsets import Projection, project, render_rows, requested_fields
+from common.identity import identity_map
+from common.pagination import keyset_paginate
 
 User = get_user_model()
 
@@ -28,13 +40,46 @@ User = get_user_model()
 
 class RetrieveAllApprovedActiveAdsView(GenericAPIView):
     permission_classes = [IsAuthenticated]
+    projections = {
+        "id": Projection(value=attrgetter("id")),
+        "name": Projection("name", value=attrgetter("name")),
+        "ad_owner_id": Projection("ad_creator", value=attrgetter("ad_creator_id")),
+        "ad_owner_image": Projection("ad_creator__profile__avatar", select_related=("ad_creator__profile",),
+                                     value=lambda ad: ad.ad_creator.profile.avatar),
+        "ad_owner_name": Projection("ad_creator__full_name", select_related=("ad_creator",),
+                                    value=lambda ad: ad.ad_creator.full_name),
+        "ad_owner_phone_number": Projection("ad_creator__phone_number", select_related=("ad_creator",),
+                                            value=lambda ad: ad.ad_creator.phone_number),
+        "description": Projection("description", value=attrgetter("description")),
+        "price": Projection("price", value=attrgetter("price")),
+        "location": Projection("location", value=attrgetter("location")),
+        "category": Projection("category__title", select_related=("category",),
+                               value=lambda ad: {"id": ad.category.id, "title": ad.category.title}),
+        "sub_category": Projection(
+            "sub_category__title", select_related=("sub_category",),
+            value=lambda ad: "" if ad.sub_category is None else {"id": ad.sub_category.id,
+                                                                 "title": ad.sub_category.title}
+        ),
+        "images": Projection(prefetch=(AD_IMAGES_PREFETCH,),
+                             value=lambda ad: [image.image for image in ad.images.all()]),
+        "featured": Projection("featured", value=attrgetter("featured")),
+        "is_approved": Projection("is_approved", value=attrgetter("is_approved")),
+        "status": Projection("status", value=attrgetter("status")),
+    }
 
     @extend_schema(
         summary="Get all ads",
         description=
         """
         Retrieve list of all ads approved and made active by client.
+        Pass `?fields=` (comma-separated, e.g. `name,price,images`) to receive only those fields; `id` is always included.
         """,
+        parameters=[
+            OpenApiParameter(name="sort", description="`trending` to order by trending score (optional)",
+                             required=False),
+            OpenApiParameter(name="fields", description="comma-separated fields to return (optional)",
+                             required=False),
+        ],
         responses={
             status.HTTP_200_OK: OpenApiResponse(
                 description="Ad successfully fetched",
@@ -42,40 +87,27 @@ class RetrieveAllApprovedActiveAdsView(GenericAPIView):
             ),
         }
     )
-    @method_decorator(cache_page(60 * 5))
     def get(self, request, *args, **kwargs):
-        all_ads = Ad.objects.filter(is_approved=True, status=STATUS_ACTIVE)
-        data = [
-            {
-                "id": ad.id,
-                "name": ad.name,
-                "ad_owner_id": ad.ad_creator.id,
-                "ad_owner_image": ad.ad_creator.profile.avatar,
-                "ad_owner_name": ad.ad_creator.full_name,
-                "ad_owner_phone_number": ad.ad_creator.phone_number,
-                "description": ad.description,
-                "price": ad.price,
-                "location": ad.location,
-                "category": {
-                    "id": ad.category.id,
-                    "title": ad.category.title
-                },
-                "sub_category": "" if ad.sub_category is None else {
-                    "id": ad.sub_category.id,
-                    "title": ad.sub_category.title,
-                },
-                "images": [image.image for image in ad.images.all()],
-                "featured": ad.featured,
-                "is_approved": ad.is_approved,
-                "status": ad.status,
-            }
-            for ad in all_ads
-        ]
+        sort = 'trending' if request.query_params.get('sort') == 'trending' else 'latest'
+        fields = requested_fields(request, self.projections)
+        cache_key = feed_cache_key('all', sort, '*' if len(fields) == len(self.projections) else ','.join(fields))
+        data = cache.get(cache_key)
+        if data is None:
+            data = self.get_ads_data(sort, fields)
+            cache.set(cache_key, data, FEED_CACHE_TIMEOUT)
+        ad_counters.record_impressions(ad["id"] for ad in data)
 
         return Response(
             {"message": "Ads retrieved successfully", "data": data, "status": "success"},
             status=status.HTTP_200_OK)
 
+    @classmethod
+    def get_ads_data(cls, sort, fields=None):
+        fields = fields or tuple(cls.projections)
+        all_ads = Ad.objects.filter(is_approved=True, status=STATUS_ACTIVE)
+        all_ads = all_ads.order_by('-trending_score' if sort == 'trending' else '-created')
+        return render_rows(project(all_ads, cls.projections, fields), cls.projections, fields)
+
 
 class AdsCategoryView(AdsByCategoryMixin, GenericAPIView):
     permission_classes = [IsAuthenticated]
@@ -86,6 +118,7 @@ class AdsCategoryView(AdsByCategoryMixin, GenericAPIView):
         description=
         """
         Get all active ads and categories including featured ads.
+        Responses carry an `ETag`; send it back in `If-None-Match` to get a `304` while nothing has changed.
         """,
         responses={
             status.HTTP_200_OK: OpenApiResponse(
@@ -94,23 +127,27 @@ class AdsCategoryView(AdsByCategoryMixin, GenericAPIView):
             ),
         }
     )
+    @conditional_get(feed_version)
     def get(self, request):
-        ad_categories = AdCategory.objects.all()
+        ad_categories = category_tree().categories
         serializer = AdCategorySerializer(ad_categories, many=True)
         featured_ads = Ad.objects.select_related('category').filter(featured=True, is_approved=True,
-                                                                    status=STATUS_ACTIVE)
+                                                                    status=STATUS_ACTIVE).order_by('-created')
         serialized_featured_ads = AdSerializer(featured_ads, many=True)
         count_featured_ads = featured_ads.count()
         all_ads_by_category = []
         for category in ad_categories:
             ads = self.get_ads_by_category(category.id)
             num_ads = ads.count()
+            serialized_ads = AdSerializer(ads, many=True).data
+            ad_counters.record_impressions(ad["id"] for ad in serialized_ads)
             all_ads_by_category.append({
                 "category": category.id,
                 "title": category.title,
                 "num_ads": num_ads,
-                "ads": AdSerializer(ads, many=True).data
+                "ads": serialized_ads
             })
+        ad_counters.record_impressions(ad["id"] for ad in serialized_featured_ads.data)
         data = {
             "ad_categories": serializer.data,
             "featured_ads": {
@@ -125,13 +162,13 @@ class AdsCategoryView(AdsByCategoryMixin, GenericAPIView):
 
 class RetrieveAllCategoriesAndSubcategories(GenericAPIView):
     permission_classes = [IsAuthenticated]
-    queryset = AdCategory.objects.all()
 
     @extend_schema(
         summary="Categories and Sub-Categories",
         description=
         """
         Get all categories and sub-categories.
+        Responses carry an `ETag`; send it back in `If-None-Match` to get a `304` while nothing has changed.
         """,
         responses={
             status.HTTP_200_OK: OpenApiResponse(
@@ -140,8 +177,8 @@ class RetrieveAllCategoriesAndSubcategories(GenericAPIView):
             ),
         }
     )
+    @conditional_get(category_catalog_version)
     def get(self, request):
-        categories = self.get_queryset()
         serialized_data = [
             {
                 "title": category.title,
@@ -149,11 +186,11 @@ class RetrieveAllCategoriesAndSubcategories(GenericAPIView):
                     {
                         "title": sub_category.title
                     }
-                    for sub_category in category.sub_categories.all()
+                    for sub_category in category.sub_categories
                 ],
                 "image": category.image,
             }
-            for category in categories
+            for category in category_tree().categories
         ]
         return Response({"message": "Fetched successfully", "data": serialized_data, "status": "success"},
                         status=status.HTTP_200_OK)
@@ -191,6 +228,7 @@ class RetrieveAdView(GenericAPIView):
         except Ad.DoesNotExist:
             return Response({"message": "Ad with this id does not exist", "status": "failed"},
                             status=status.HTTP_404_NOT_FOUND)
+        ad_counters.record_view(ad.id)
         data = {
             "id": ad.id,
             "ad_creator": ad.ad_creator.full_name,
@@ -202,6 +240,20 @@ class RetrieveAdView(GenericAPIView):
             "featured": ad.featured,
             "is_approved": ad.is_approved,
             "status": ad.status,
+            "views": ad.views + ad_counters.pending("views", ad.id),
+            "similar_ads": [
+                {
+                    "id": neighbour.similar.id,
+                    "name": neighbour.similar.name,
+                    "price": neighbour.similar.price,
+                    "location": neighbour.similar.location,
+                }
+                for neighbour in SimilarAd.objects.filter(
+                    ad=ad, similar__is_approved=True, similar__status=STATUS_ACTIVE
+                ).select_related('similar').only(
+                    'similar__id', 'similar__name', 'similar__price', 'similar__location'
+                ).order_by('rank')
+            ],
         }
         return Response({"message": "Ad fetched successfully", "data": data}, status=status.HTTP_200_OK)
 
@@ -212,14 +264,19 @@ class FilteredAdsListView(ListAPIView):
     filterset_class = AdFilter
     filter_backends = [DjangoFilterBackend, SearchFilter]
     search_fields = ['name', 'description', 'category__title', 'price']
-    queryset = Ad.objects.filter(is_approved=True, status=STATUS_ACTIVE)
+    queryset = Ad.objects.filter(is_approved=True, status=STATUS_ACTIVE).order_by('-created')
 
     @extend_schema(
         summary="Filtered Ads List",
         description=
         """
         This endpoint retrieves a list of filtered ads.
+        Pass `?fields=` (comma-separated, e.g. `name,price,images`) to receive only those fields; `id` is always included.
         """,
+        parameters=[
+            OpenApiParameter(name="fields", description="comma-separated fields to return (optional)",
+                             required=False),
+        ],
         responses={
             status.HTTP_200_OK: OpenApiResponse(
                 description="Ads filtered successfully.",
@@ -231,8 +288,10 @@ class FilteredAdsListView(ListAPIView):
         },
     )
     def get(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.serializer_class(queryset, many=True)
+        fields = requested_fields(request, self.serializer_class.projections)
+        queryset = project(self.filter_queryset(self.get_queryset()), self.serializer_class.projections, fields)
+        serializer = self.serializer_class(queryset, many=True, fields=fields)
+        ad_counters.record_impressions(ad["id"] for ad in serializer.data)
         return Response({"message": "Ads filtered successfully", "data": serializer.data, "status": "success"},
                         status.HTTP_200_OK)
 
@@ -289,7 +348,7 @@ class RetrieveUserAdsView(GenericAPIView):
     )
     def get(self, request):
         creator = self.request.user
-        ads = Ad.objects.filter(ad_creator=creator)
+        ads = Ad.objects.filter(ad_creator=creator).order_by('-created')
         if not ads.exists():
             return Response({"message": "User has not created any ads", "status": "failed"},
                             status=status.HTTP_404_NOT_FOUND)
@@ -486,7 +545,7 @@ class FavouriteAdListView(GenericAPIView):
     )
     def get(self, request):
         customer = self.request.user
-        favourite_ads = FavouriteAd.objects.select_related('ad').filter(customer=customer)
+        favourite_ads = FavouriteAd.objects.select_related('ad').filter(customer=customer).order_by('-created')
         if not favourite_ads.exists():
             return Response({"message": "Customer has no favourite ads", "status": "failed"},
                             status=status.HTTP_404_NOT_FOUND)
@@ -564,12 +623,12 @@ class ChatListView(GenericAPIView):
     )
     def get(self, request):
         user = self.request.user
-        conversation_list = Chat.objects.filter(Q(initiator=user) | Q(receiver=user))
+        conversation_list = Chat.objects.filter(Q(initiator=user) | Q(receiver=user)).order_by('-created')
 
         # Create a dictionary to group chats by user
         chat_groups = defaultdict(list)
         for chat in conversation_list:
-            other_user = chat.receiver if chat.initiator == user else chat.initiator
+            other_user = chat.receiver_id if chat.initiator_id == user.id else chat.initiator_id
             chat_groups[other_user].append(chat)
 
         # Extract the latest message from each chat group
@@ -579,7 +638,8 @@ class ChatListView(GenericAPIView):
             latest_chat = max(latest_messages, key=lambda message: message.created)
             chats.append(latest_chat.chat)  # Assuming you have a 'chat' field in your Message model.
 
-        # Serialize the chat list
+        # The viewer takes part in every chat
+        identity_map(request).add(request.user)
         serializer = self.serializer_class(instance=chats, many=True, context={"request": request})
 
         return Response(
@@ -610,7 +670,9 @@ class RetrieveChatView(GenericAPIView):
     )
     def get(self, request, *args, **kwargs):
         chat_id = self.kwargs.get('chat_id')
-        chat = Chat.objects.filter(id=chat_id)
+        chat = Chat.objects.filter(id=chat_id).prefetch_related(
+            Prefetch('messages', queryset=Message.objects.order_by('-created'))
+        )
         if not chat.exists():
             return Response({"message": "Chat does not exist", "status": "success"},
                             status=status.HTTP_404_NOT_FOUND)
@@ -645,6 +707,7 @@ class CreateChatView(GenericAPIView):
 
             # Create the chat
             chat = serializer.save()
+            latest_message = chat.messages.order_by('-created').first()
 
             data = {
                 "id": chat.id,
@@ -653,8 +716,8 @@ class CreateChatView(GenericAPIView):
                     "full_name": chat.receiver.full_name,
                 },
                 "receiver_profile_image": chat.receiver.profile.avatar,
-                "message": chat.messages.first().text,
-                "attachment": chat.messages.first().attachment or ""
+                "message": latest_message.text,
+                "attachment": latest_message.attachment or ""
             }
             return Response({"message": "Message sent successfully", "data": data, "status": "success"},
                             status=status.HTTP_201_CREATED)
@@ -689,3 +752,100 @@ class DeleteChatRoomView(GenericAPIView):
         chat.delete()
         return Response({"message": "Chat deleted successfully", "status": "success"},
                         status=status.HTTP_204_NO_CONTENT)
+
+
+class ModerationQueueView(GenericAPIView):
+    permission_classes = [IsAdminUser]
+    serializer_class = ReportedAdSerializer
+    page_size = 50
+
+    @extend_schema(
+        summary="Ad moderation queue",
+        description=
+        """
+        This endpoint allows staff to page through reported ads, most reported first.
+        `duplicate_of` is the listing an ad's description nearly duplicates, if any.
+        Pass the returned `next` cursor as `?cursor=` to fetch the following page.
+        """,
+        parameters=[
+            OpenApiParameter(name="cursor", description="cursor of the page to fetch (optional)", required=False),
+        ],
+        responses={
+            status.HTTP_200_OK: OpenApiResponse(
+                description="Reported ads fetched successfully",
+                response=ReportedAdSerializer(many=True)
+            ),
+        }
+    )
+    def get(self, request):
+        reported_ads = Ad.objects.filter(report_count__gt=0).select_related('fingerprint').only(
+            'id', 'name', 'ad_creator_id', 'status', 'is_approved', 'report_count', 'fingerprint__duplicate_of_id'
+        )
+        ads, next_cursor = keyset_paginate(reported_ads, request.query_params.get('cursor'), self.page_size)
+        serializer = self.serializer_class(ads, many=True)
+        return Response({"message": "Reported ads fetched successfully", "data": serializer.data,
+                         "next": next_cursor, "status": "success"}, status=status.HTTP_200_OK)
+
+
+class ModerateAdsView(GenericAPIView):
+    permission_classes = [IsAdminUser]
+    serializer_class = ModerationActionSerializer
+
+    @extend_schema(
+        summary="Moderate ads in bulk",
+        description=
+        """
+        This endpoint allows staff to approve, feature, unfeature, pause or deny many ads at once.
+        The request should include the following data:
+
+        - `action`: One of `approve`, `feature`, `unfeature`, `pause` or `deny`.
+        - `ads`: The ids of the ads to moderate.
+        """,
+        responses={
+            status.HTTP_200_OK: OpenApiResponse(
+                description="Ads moderated successfully",
+            ),
+        }
+    )
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updated = moderate_ads(serializer.validated_data['ads'], serializer.validated_data['action'])
+        return Response({"message": "Ads moderated successfully", "data": {"updated": updated},
+                         "status": "success"}, status=status.HTTP_200_OK)
+
+
+class ExportAdsView(GenericAPIView):
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [UserRateThrottle]
+
+    @extend_schema(
+        summary="Export ads",
+        description=
+        """
+        This endpoint streams every approved and active ad, one record per line, oldest first.
+        Choose the format with `?output=`: `ndjson` (default) or `csv`. In CSV, image URLs are space-separated.
+        """,
+        parameters=[
+            OpenApiParameter(name="output", description="`ndjson` or `csv` (optional)", required=False),
+        ],
+        responses={
+            status.HTTP_200_OK: OpenApiResponse(description="Ads streamed successfully"),
+        }
+    )
+    def get(self, request):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response({"message": f"output must be one of {', '.join(EXPORT_FORMATS)}", "status": "failed"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        lines = export_lines(output, export_rows(export_queryset()))
+        if isinstance(request._request, ASGIRequest):
+            # Django's ASGI handler iterates streaming content on the event loop, where queries are not allowed:
+            # the export is written out here, in the view's worker thread, and sent from the spooled file
+            return FileResponse(spool_lines(lines), as_attachment=True, filename=f"ads.{output}",
+                                content_type=EXPORT_CONTENT_TYPES[output])
+
+        response = StreamingHttpResponse(lines, content_type=EXPORT_CONTENT_TYPES[output])
+        response['Content-Disposition'] = f'attachment; filename="ads.{output}"'
+        return response
@@ -0,0 +1,12 @@
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def cache_is_shared(alias=DEFAULT_CACHE_ALIAS):
+    """
+    Whether a value written to the cache is seen by every process. An
+    in-memory cache is private to its process and a dummy one keeps nothing,
+    so anything that must hold across processes has to check the database.
+    """
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
@@ -0,0 +1,223 @@
+from operator import attrgetter, itemgetter
+from typing import NamedTuple
+
+from django.core.exceptions import FieldError, ObjectDoesNotExist
+from django.db import models
+from django.utils import timezone
+from rest_framework import ISO_8601, fields as drf_fields, serializers
+from rest_framework.settings import api_settings
+
+
+class ManyValues:
+    """
+    `compiled_values` entry for a SerializerMethodField listing one column of
+    related rows. It is read with a single `values_list()` query for the whole
+    list, in `model`'s default ordering, as a prefetch would be.
+    """
+
+    def __init__(self, model, key, column):
+        self.model = model
+        self.key = key
+        self.column = column
+
+    def load(self, pks):
+        grouped = {pk: [] for pk in pks}
+        rows = self.model._default_manager.filter(**{f"{self.key}__in": pks}).values_list(self.key, self.column)
+        for pk, value in rows:
+            grouped[pk].append(value)
+        return grouped
+
+
+class CompiledField(NamedTuple):
+    name: str
+    get: object
+    column: str
+    convert: object
+    method: bool
+
+
+def _fast_convert(field):
+    # Same result as field.to_representation() for a non-null value, without the call
+    # overhead; None for the fields converted per list (see CompiledSerializer._bound_convert)
+    if isinstance(field, drf_fields.UUIDField):
+        return str if field.uuid_format == "hex_verbose" else None
+    if isinstance(field, drf_fields.CharField):
+        return str
+    if isinstance(field, drf_fields.BooleanField):
+        return bool
+    if isinstance(field, drf_fields.IntegerField):
+        return int
+    if type(field) is drf_fields.ChoiceField:
+        choices = field.choice_strings_to_values
+        return lambda value: value if value == "" else choices.get(str(value), value)
+    return None
+
+
+def _datetime_convert(field):
+    # DateTimeField.to_representation() with the timezone looked up once per list, not per row
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if isinstance(value, str) or not timezone.is_aware(value):
+            return field.to_representation(value)
+        try:
+            value = value.astimezone(field_timezone).isoformat()
+        except OverflowError:
+            return field.to_representation(value)
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+    return convert
+
+
+def _file_convert(field, model_field):
+    # values() gives the file's name where the field expects a FieldFile
+    if not getattr(field, "use_url", api_settings.UPLOADED_FILES_USE_URL):
+        return lambda name: name or None
+    request = field.context.get("request")
+
+    def convert(name):
+        if not name:
+            return None
+        url = model_field.storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    return convert
+
+
+def _instance_getter(source):
+    if "." not in source:
+        return attrgetter(source)
+    getter = attrgetter(source)
+
+    def get(instance):
+        try:
+            return getter(instance)
+        except ObjectDoesNotExist:
+            return None
+
+    return get
+
+
+class CompiledSerializer:
+    """
+    Everything a read-only serializer class needs to render a row, worked out
+    once: each field's source path, its `values()` column and how its value is
+    converted. Rows are emitted as plain dicts, either from `values()` rows
+    (when every SerializerMethodField has a `compiled_values` entry) or from
+    model instances.
+    """
+
+    _compiled = {}
+
+    def __init__(self, serializer):
+        self.fields = []
+        self.values_sources = {}
+        compiled_values = getattr(type(serializer), "compiled_values", {})
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.BaseSerializer) or (
+                    field.source == "*" and not isinstance(field, serializers.SerializerMethodField)):
+                raise TypeError(f"{type(serializer).__name__}.{field.field_name} cannot be compiled")
+            method = isinstance(field, serializers.SerializerMethodField)
+            self.fields.append(CompiledField(
+                name=field.field_name,
+                get=field.method_name if method else _instance_getter(".".join(field.source_attrs)),
+                column=None if method else "__".join(field.source_attrs),
+                convert=None if method else _fast_convert(field),
+                method=method,
+            ))
+            if method and field.field_name in compiled_values:
+                self.values_sources[field.field_name] = compiled_values[field.field_name]
+        self.values_mode = all(field.name in self.values_sources for field in self.fields if field.method)
+
+    @classmethod
+    def of(cls, serializer):
+        key = (type(serializer), tuple(serializer.fields))
+        if key not in cls._compiled:
+            try:
+                cls._compiled[key] = cls(serializer)
+            except TypeError:
+                cls._compiled[key] = None
+        return cls._compiled[key]
+
+    def render_instances(self, serializer, instances):
+        getters = []
+        for field in self.fields:
+            if field.method:
+                getters.append((field.name, getattr(serializer, field.get), None))
+            else:
+                getters.append((field.name, field.get,
+                                field.convert or self._bound_convert(serializer.fields[field.name])))
+        return [self._render(instance, getters) for instance in instances]
+
+    def render_values(self, serializer, queryset):
+        columns, many = {}, {}
+        for name, source in self.values_sources.items():
+            if isinstance(source, ManyValues):
+                many[name] = source
+            else:
+                columns[name] = source
+        rows = list(queryset.prefetch_related(None).values(
+            "pk", *dict.fromkeys(field.column for field in self.fields if not field.method), *columns.values()
+        ))
+        pks = [row["pk"] for row in rows]
+        loaded = {name: source.load(pks) for name, source in many.items()}
+
+        getters = []
+        for field in self.fields:
+            if field.name in loaded:
+                getters.append((field.name, lambda row, grouped=loaded[field.name]: grouped[row["pk"]], None))
+            elif field.method:
+                getters.append((field.name, itemgetter(columns[field.name]), None))
+            else:
+                convert = field.convert or self._bound_convert(serializer.fields[field.name], queryset.model,
+                                                               field.column)
+                getters.append((field.name, itemgetter(field.column), convert))
+        return [self._render(row, getters) for row in rows]
+
+    @staticmethod
+    def _render(row, getters):
+        item = {}
+        for name, get, convert in getters:
+            value = get(row)
+            item[name] = value if convert is None or value is None else convert(value)
+        return item
+
+    @staticmethod
+    def _bound_convert(field, model=None, column=None):
+        # Converters depending on the request or the current timezone, made for each list
+        if type(field) is drf_fields.DateTimeField:
+            return _datetime_convert(field)
+        if model is not None and isinstance(field, drf_fields.FileField):
+            if "__" in column:
+                raise FieldError(f"{column} is read from the instances")
+            return _file_convert(field, model._meta.get_field(column))
+        return field.to_representation
+
+
+class CompiledListSerializer(serializers.ListSerializer):
+    """
+    `list_serializer_class` for read-only serializers on hot list endpoints.
+    The output is the same as DRF's, built by `CompiledSerializer` instead of
+    running every field's `to_representation` per row. Serializers it cannot
+    compile (nested serializers, `source="*"`) are rendered by DRF.
+    """
+
+    def to_representation(self, data):
+        compiled = CompiledSerializer.of(self.child)
+        if compiled is None:
+            return super().to_representation(data)
+        if isinstance(data, models.Manager):
+            data = data.all()
+        # A queryset already holding its rows (a prefetch, for instance) is not read again
+        if isinstance(data, models.QuerySet) and data._result_cache is None and compiled.values_mode:
+            try:
+                return compiled.render_values(self.child, data)
+            except FieldError:
+                # A source that is not a column (a property, say) needs the instances
+                pass
+        return compiled.render_instances(self.child, data)
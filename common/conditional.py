@@ -0,0 +1,43 @@
+from functools import wraps
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def conditional_get(validator):
+    """
+    Decorator for the `get` handler of an API view. `validator(request)`
+    returns `(version, last_modified)` from something much cheaper than the
+    response itself (an aggregate, a generation counter); either may be None.
+    When the client's If-None-Match or If-Modified-Since still matches, a 304
+    is returned without running the handler.
+
+    The ETag also names the negotiated renderer, since JSON and MessagePack
+    representations of the same data are different bytes.
+    """
+
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            version, last_modified = validator(request)
+            etag = None if version is None else quote_etag(f"{request.accepted_renderer.format}-{version}")
+            timestamp = None if last_modified is None else int(last_modified.timestamp())
+
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = handler(view, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+
+            if etag is not None:
+                response.headers.setdefault("ETag", etag)
+            if timestamp is not None:
+                response.headers.setdefault("Last-Modified", http_date(timestamp))
+            # Authenticated data: clients may keep it but must revalidate before reuse
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ("Accept", "Authorization"))
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,75 @@
+from rest_framework import status
+
+from common.exceptions import CustomValidation
+
+
+class Projection:
+    """
+    What one output field reads from the database: model fields for `.only()`
+    (relations traversed with `__`), relations to `select_related` and lookups
+    to prefetch. `value`, when given, computes the field from an instance, for
+    views that build their rows by hand.
+    """
+
+    def __init__(self, *only, select_related=(), prefetch=(), value=None):
+        self.only = only
+        self.select_related = select_related
+        self.prefetch = prefetch
+        self.value = value
+
+
+def requested_fields(request, projections, required=("id",)):
+    """
+    Names from `?fields=a,b,c` plus the `required` ones, in `projections`
+    order, or every field when the parameter is absent.
+    """
+    raw = request.query_params.get("fields")
+    if not raw:
+        return tuple(projections)
+    names = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = names - set(projections)
+    if unknown:
+        raise CustomValidation({"message": f"Unknown fields: {', '.join(sorted(unknown))}", "status": "failed"},
+                               status.HTTP_400_BAD_REQUEST)
+    names.update(required)
+    return tuple(name for name in projections if name in names)
+
+
+def project(queryset, projections, fields):
+    """
+    Narrow `queryset` to what `fields` need: only their columns are selected,
+    and relations or prefetches of fields that were left out are skipped.
+    """
+    only, select_related, prefetch = [queryset.model._meta.pk.name], [], []
+    for name in fields:
+        projection = projections[name]
+        only.extend(projection.only)
+        select_related.extend(projection.select_related)
+        prefetch.extend(projection.prefetch)
+
+    queryset = queryset.only(*dict.fromkeys(only))
+    if select_related:
+        queryset = queryset.select_related(*dict.fromkeys(select_related))
+    if prefetch:
+        queryset = queryset.prefetch_related(*dict.fromkeys(prefetch))
+    return queryset
+
+
+def render_rows(rows, projections, fields):
+    return [{name: projections[name].value(row) for name in fields} for row in rows]
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin taking `fields=` to drop every other field from the
+    output. Subclasses declare a `Projection` per field in `projections`, so
+    views can pass the same names to `project()`.
+    """
+
+    projections = {}
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
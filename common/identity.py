@@ -0,0 +1,105 @@
+from collections import defaultdict
+
+from django.db import models
+from rest_framework import serializers
+
+
+class IdentityMap:
+    """
+    Model instances loaded while handling one request, by model and key, so a
+    row needed by many serialized objects is read once. Missing keys are
+    loaded together with one `in_bulk` query per model; keys with no row are
+    remembered as None.
+    """
+
+    def __init__(self):
+        self._instances = defaultdict(dict)
+
+    def add(self, *instances):
+        """Register instances already loaded, under their primary key and unique columns."""
+        for instance in instances:
+            model = type(instance)
+            # The first instance seen for a row stays the one handed out
+            instance = self._instances[model, "pk"].setdefault(instance.pk, instance)
+            for field in model._meta.concrete_fields:
+                if field.unique and not field.primary_key:
+                    self._instances[model, field.attname].setdefault(getattr(instance, field.attname), instance)
+
+    def get_many(self, model, keys, field="pk"):
+        """
+        `{key: instance or None}` for `keys`, which are values of `field`
+        (the primary key or another unique column, by attname).
+        """
+        known = self._instances[model, field]
+        missing = {key for key in keys if key is not None and key not in known}
+        if missing:
+            loaded = model._default_manager.in_bulk(missing, field_name=field)
+            for key in missing:
+                instance = loaded.get(key)
+                if instance is not None:
+                    self.add(instance)
+                    instance = self._instances[model, "pk"][instance.pk]
+                known[key] = instance
+        return {key: known[key] for key in keys if key in known}
+
+    def get(self, model, key, field="pk"):
+        return self.get_many(model, [key], field).get(key)
+
+    def attach(self, instances, *names):
+        """
+        Fill the `names` relations of every instance from the map, loading the
+        missing ones with a single query, so reading them later runs none.
+        Each name is a foreign key or the reverse side of a one-to-one field,
+        all to the same model. Returns the related instances found.
+        """
+        if not instances:
+            return []
+        relations = [instances[0]._meta.get_field(name) for name in names]
+        model = relations[0].related_model
+        reverse = relations[0].one_to_one and relations[0].auto_created
+        field = relations[0].field.attname if reverse else "pk"
+
+        def key_of(instance, relation):
+            return instance.pk if reverse else getattr(instance, relation.attname)
+
+        related = self.get_many(model, {key_of(instance, relation)
+                                        for relation in relations for instance in instances}, field)
+        for relation in relations:
+            for instance in instances:
+                relation.set_cached_value(instance, related.get(key_of(instance, relation)))
+        return [instance for instance in related.values() if instance is not None]
+
+
+def identity_map(request):
+    """The `IdentityMap` of `request`, created on first use."""
+    if not hasattr(request, "identity_map"):
+        request.identity_map = IdentityMap()
+    return request.identity_map
+
+
+class IdentityMapListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        instances = list(data.all() if isinstance(data, models.Manager) else data)
+        self.child.prime(instances)
+        return super().to_representation(instances)
+
+
+class IdentityMapMixin:
+    """
+    Serializer mixin whose related rows come from the request's
+    `IdentityMap`. With `many=True`, `prime()` gets every instance before any
+    is serialized, to load what they share in batches.
+    """
+
+    class Meta:
+        list_serializer_class = IdentityMapListSerializer
+
+    @property
+    def identity_map(self):
+        request = self.context.get("request")
+        if request is None:
+            return self.context.setdefault("identity_map", IdentityMap())
+        return identity_map(request)
+
+    def prime(self, instances):
+        pass
@@ -0,0 +1,197 @@
+import ipaddress
+import socket
+import threading
+import warnings
+from io import BytesIO
+from urllib.parse import urlsplit
+from urllib.request import HTTPRedirectHandler, build_opener
+
+import numpy as np
+from django.db import DatabaseError, connection, transaction
+from PIL import Image
+
+HASH_BITS = 64
+
+# Images larger than this are not downloaded for hashing
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+
+
+def check_image_url(url):
+    """
+    Reject image URLs that must not be fetched: anything but http(s), and
+    hosts resolving to private, loopback, link-local or otherwise non-public
+    addresses. Image URLs are user supplied, so they could otherwise read
+    local files or reach internal services.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError(f"Only http(s) image URLs are fetched: {url}")
+    try:
+        addresses = socket.getaddrinfo(parts.hostname, parts.port or parts.scheme, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise ValueError(f"Cannot resolve {parts.hostname}: {e}")
+    for *_, sockaddr in addresses:
+        if not ipaddress.ip_address(sockaddr[0].split("%")[0]).is_global:
+            raise ValueError(f"{parts.hostname} resolves to a non-public address")
+
+
+class _CheckedRedirectHandler(HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_image_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+_opener = build_opener(_CheckedRedirectHandler)
+
+
+def fetch_image(url, timeout=10, max_bytes=MAX_IMAGE_BYTES):
+    """
+    Download an image from the store, refusing unsafe URLs (see
+    `check_image_url`) and bodies over `max_bytes`.
+    """
+    check_image_url(url)
+    with _opener.open(url, timeout=timeout) as response:
+        data = response.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise ValueError(f"Image larger than {max_bytes} bytes: {url}")
+    return data
+
+
+def open_image(url, fetch=fetch_image):
+    image = Image.open(BytesIO(fetch(url)))
+    image.load()
+    return image
+
+
+def dhash(image: Image.Image, hash_size=8):
+    """
+    Difference hash: shrink to (hash_size + 1) x hash_size greyscale pixels and
+    set one bit per horizontally adjacent pair that gets brighter. Resizing,
+    recompression and small colour changes leave most bits untouched.
+    """
+    pixels = np.asarray(image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def to_signed(value):
+    """
+    Store an unsigned 64-bit hash in a signed BigIntegerField.
+    """
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def to_unsigned(value):
+    return value + (1 << HASH_BITS) if value < 0 else value
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over hashes under Hamming distance. A search only
+    descends into children whose edge distance is within `max_distance` of the
+    query's distance to the node, which prunes most of the tree for small radii.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, value, key):
+        self.size += 1
+        node = [value, [key], {}]
+        if self.root is None:
+            self.root = node
+            return
+        current = self.root
+        while True:
+            distance = hamming_distance(value, current[0])
+            if distance == 0:
+                current[1].append(key)
+                return
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def search(self, value, max_distance):
+        """
+        Return `(key, distance)` pairs within `max_distance` of `value`, closest first.
+        """
+        if self.root is None:
+            return []
+        matches, stack = [], [self.root]
+        while stack:
+            node_value, keys, children = stack.pop()
+            distance = hamming_distance(value, node_value)
+            if distance <= max_distance:
+                matches.extend((key, distance) for key in keys)
+            for edge, child in children.items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        return sorted(matches, key=lambda match: match[1])
+
+
+def hash_images(queryset, batch_size=200, fetch=fetch_image):
+    """
+    Compute the perceptual hash of every row in `queryset` (a model with `image`
+    and `phash` fields) that has none yet. `fetch(url)` returns an image's
+    bytes. Returns `(hashed, failed)` counts.
+    """
+    model = queryset.model
+    pending, hashed, failed = [], 0, 0
+    for obj in queryset.filter(phash__isnull=True).only('id', 'image').order_by().iterator(chunk_size=batch_size):
+        try:
+            obj.phash = to_signed(dhash(open_image(obj.image, fetch)))
+        except (OSError, ValueError, Image.DecompressionBombError):
+            failed += 1
+            continue
+        pending.append(obj)
+        if len(pending) == batch_size:
+            hashed += model.objects.bulk_update(pending, ['phash'])
+            pending = []
+    if pending:
+        hashed += model.objects.bulk_update(pending, ['phash'])
+    return hashed, failed
+
+
+def hash_images_on_commit(model, pks):
+    """
+    Hash the new images `pks` of `model` in a background thread once the
+    current transaction commits, so uploads are indexed without waiting for
+    the hash_images command.
+    """
+    pks = list(pks)
+    if pks:
+        transaction.on_commit(
+                lambda: threading.Thread(target=_hash_in_thread, args=(model, pks), daemon=True).start()
+        )
+
+
+def _hash_in_thread(model, pks):
+    try:
+        hash_images(model.objects.filter(pk__in=pks))
+    except DatabaseError as e:
+        warnings.warn(f"Could not hash {model.__name__} images: {e}")
+    finally:
+        connection.close()
+
+
+def build_image_index(*querysets):
+    """
+    Load the hashes of all images in `querysets` into a BK-tree keyed by
+    `(model label, primary key)`.
+    """
+    tree = BKTree()
+    for queryset in querysets:
+        label = queryset.model._meta.label
+        for pk, phash in queryset.filter(phash__isnull=False).order_by().values_list('id', 'phash').iterator():
+            tree.add(to_unsigned(phash), (label, pk))
+    return tree
@@ -0,0 +1,51 @@
+from django.db import models
+from django.db.backends.ddl_references import Columns, Statement, Table
+
+
+class TrigramIndex(models.Index):
+    """
+    Index for case-insensitive substring search (`icontains`, admin search) on
+    a single text column.
+
+    On PostgreSQL it is a GIN index with `gin_trgm_ops` over
+    `UPPER(column::text)`, the exact expression Django compares `icontains`
+    against, so `LIKE '%term%'` is answered from the index. It needs the
+    pg_trgm extension (see `create_trigram_extension`).
+
+    SQLite has no trigram operator class; there it falls back to a NOCASE
+    b-tree, which serves prefix (`istartswith`) searches. Other backends get a
+    plain index.
+    """
+
+    def __init__(self, *, fields, name, **kwargs):
+        if len(fields) != 1:
+            raise ValueError("TrigramIndex indexes exactly one field.")
+        super().__init__(fields=fields, name=name, **kwargs)
+
+    def create_sql(self, model, schema_editor, using="", **kwargs):
+        vendor = schema_editor.connection.vendor
+        if vendor == "postgresql":
+            template = "CREATE INDEX %(name)s ON %(table)s USING gin (UPPER(%(columns)s::text) gin_trgm_ops)"
+        elif vendor == "sqlite":
+            template = "CREATE INDEX %(name)s ON %(table)s (%(columns)s COLLATE NOCASE)"
+        else:
+            return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+        table = Table(model._meta.db_table, schema_editor.quote_name)
+        column = model._meta.get_field(self.fields[0]).column
+        return Statement(
+                template,
+                table=table,
+                name=schema_editor.quote_name(self.name),
+                columns=Columns(model._meta.db_table, [column], schema_editor.quote_name),
+        )
+
+
+def create_trigram_extension(apps, schema_editor):
+    """
+    RunPython forwards function for migrations adding a `TrigramIndex`. It is
+    a no-op outside PostgreSQL, so migrations stay portable without importing
+    django.contrib.postgres (and psycopg2) on other databases.
+    """
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
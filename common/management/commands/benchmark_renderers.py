@@ -0,0 +1,82 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from ads.choices import STATUS_ACTIVE
+from ads.models import Ad, AdCategory, AdImage
+from ads.views import RetrieveAllApprovedActiveAdsView
+from common.renderers import MessagePackRenderer, ORJSONRenderer
+from core.models import Profile
+from matrimonials.models import MatrimonialProfile, MatrimonialProfileImage
+from matrimonials.views import RetrieveAllMatrimonialProfilesView
+
+User = get_user_model()
+
+RENDERERS = (JSONRenderer, ORJSONRenderer, MessagePackRenderer)
+
+
+class Command(BaseCommand):
+    help = ('Measures how long DRF\'s JSONRenderer, ORJSONRenderer and MessagePackRenderer take to render the ads '
+            'and matrimonial profile lists. The sample rows are created in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Ads and matrimonial profiles to generate.')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            viewer = self.create_sample(options['rows'])
+            payloads = {
+                # Built without the view, which would cache the sample feed and count impressions for it
+                "ads": {"message": "Ads retrieved successfully",
+                        "data": RetrieveAllApprovedActiveAdsView.get_ads_data('latest'), "status": "success"},
+                "matrimonial profiles": self.fetch(RetrieveAllMatrimonialProfilesView, viewer),
+            }
+            transaction.set_rollback(True)
+
+        for name, data in payloads.items():
+            self.stdout.write(f"{name} ({len(data['data'])} rows):")
+            for renderer_class in RENDERERS:
+                renderer = renderer_class()
+                start = time.perf_counter()
+                for _ in range(options['repeat']):
+                    body = renderer.render(data)
+                elapsed = (time.perf_counter() - start) / options['repeat']
+                self.stdout.write(f"  {renderer_class.__name__}: {elapsed * 1000:.2f} ms, {len(body)} bytes")
+
+    @staticmethod
+    def create_sample(rows):
+        users = User.objects.bulk_create([
+            User(email=f"renderer-benchmark-{i}@example.com", full_name=f"Benchmark User {i}",
+                 phone_number="+10000000000")
+            for i in range(rows + 1)
+        ])
+        Profile.objects.bulk_create([Profile(user=user) for user in users])
+        # bulk_create throughout: the post_save receivers would invalidate the real feed and category caches
+        [category] = AdCategory.objects.bulk_create([AdCategory(title="Benchmark")])
+        ads = Ad.objects.bulk_create([
+            Ad(ad_creator=user, name=f"Benchmark ad {i}", description="Benchmark " * 20, price="100",
+               location="Dhaka", category=category, is_approved=True, status=STATUS_ACTIVE)
+            for i, user in enumerate(users[1:])
+        ])
+        AdImage.objects.bulk_create([AdImage(ad=ad, image=f"https://example.com/{ad.id}.png") for ad in ads])
+        profiles = MatrimonialProfile.objects.bulk_create([
+            MatrimonialProfile(user=user, short_bio="Benchmark " * 20, age=30, gender="Male", country="BD",
+                               city="Dhaka")
+            for user in users[1:]
+        ])
+        MatrimonialProfileImage.objects.bulk_create([
+            MatrimonialProfileImage(matrimonial_profile=profile, image=f"https://example.com/{profile.id}.png")
+            for profile in profiles
+        ])
+        return users[0]
+
+    @staticmethod
+    def fetch(view_class, user):
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, user=user)
+        return view_class.as_view(throttle_classes=[])(request).data
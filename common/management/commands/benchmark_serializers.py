@@ -0,0 +1,87 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework import serializers
+
+from ads.choices import STATUS_ACTIVE
+from ads.models import Ad, AdCategory, AdImage, Chat, Message
+from ads.serializers import AD_IMAGES_PREFETCH, AdSerializer, MessageSerializer
+from core.models import Profile
+from matrimonials.models import MatrimonialProfile, MatrimonialProfileImage
+from matrimonials.serializers import PROFILE_IMAGES_PREFETCH, MatrimonialProfileSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Measures how long DRF\'s ListSerializer and CompiledListSerializer take to serialize the ads, '
+            'matrimonial profiles and chat messages lists, queries included. The sample rows are created in a '
+            'transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Ads, matrimonial profiles and messages to generate.')
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            chat = self.create_sample(options['rows'])
+            cases = {
+                "ads": (AdSerializer, Ad.objects.order_by('-created'), (AD_IMAGES_PREFETCH,)),
+                "matrimonial profiles": (MatrimonialProfileSerializer,
+                                         MatrimonialProfile.objects.select_related('user').order_by('-created'),
+                                         (PROFILE_IMAGES_PREFETCH,)),
+                "messages": (MessageSerializer, chat.messages.order_by('-created'), ()),
+            }
+            for name, (serializer_class, queryset, prefetch) in cases.items():
+                self.stdout.write(f"{name}:")
+                expected = self.measure("DRF", options['repeat'], lambda: serializers.ListSerializer(
+                    queryset.prefetch_related(*prefetch), child=serializer_class()).data)
+                baseline = self.elapsed
+                for mode, data in (("compiled, values()", lambda: queryset.all()),
+                                   ("compiled, instances", lambda: list(queryset.prefetch_related(*prefetch)))):
+                    output = self.measure(mode, options['repeat'],
+                                          lambda: serializer_class(data(), many=True).data, baseline)
+                    if output != expected:
+                        raise CommandError(f"{mode} output differs from DRF's for {name}")
+            transaction.set_rollback(True)
+
+    def measure(self, label, repeat, serialize, baseline=None):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            output = serialize()
+        self.elapsed = (time.perf_counter() - start) / repeat
+        speedup = f", {baseline / self.elapsed:.1f}x" if baseline else ""
+        self.stdout.write(f"  {label}: {self.elapsed * 1000:.2f} ms{speedup}")
+        return output
+
+    @staticmethod
+    def create_sample(rows):
+        users = User.objects.bulk_create([
+            User(email=f"serializer-benchmark-{i}@example.com", full_name=f"Benchmark User {i}",
+                 phone_number="+10000000000")
+            for i in range(rows)
+        ])
+        Profile.objects.bulk_create([Profile(user=user) for user in users])
+        category = AdCategory.objects.create(title="Serializer benchmark")
+        ads = Ad.objects.bulk_create([
+            Ad(ad_creator=user, name=f"Benchmark ad {i}", description="Benchmark " * 20, price="100",
+               location="Dhaka", category=category, is_approved=True, status=STATUS_ACTIVE)
+            for i, user in enumerate(users)
+        ])
+        AdImage.objects.bulk_create([AdImage(ad=ad, image=f"https://example.com/{ad.id}.png") for ad in ads])
+        profiles = MatrimonialProfile.objects.bulk_create([
+            MatrimonialProfile(user=user, short_bio="Benchmark " * 20, age=30, gender="Male", country="BD",
+                               city="Dhaka", religion="Islam")
+            for user in users
+        ])
+        MatrimonialProfileImage.objects.bulk_create([
+            MatrimonialProfileImage(matrimonial_profile=profile, image=f"https://example.com/{profile.id}.png")
+            for profile in profiles
+        ])
+        chat = Chat.objects.create(ad=ads[0], initiator=users[0], receiver=users[1 % rows])
+        Message.objects.bulk_create([
+            Message(chat=chat, sender=users[i % 2 % rows], text=f"Benchmark message {i}") for i in range(rows)
+        ])
+        return chat
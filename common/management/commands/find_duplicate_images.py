@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ads.models import AdImage
+from common.images import build_image_index, to_unsigned
+from matrimonials.models import MatrimonialProfileImage
+
+
+class Command(BaseCommand):
+    help = 'Lists ad and matrimonial profile images that are visually identical to another image in the catalog.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-distance', type=int, default=None,
+                            help='Maximum number of differing hash bits (defaults to IMAGE_DUPLICATE_DISTANCE).')
+
+    def handle(self, *args, **options):
+        max_distance = options['max_distance']
+        if max_distance is None:
+            max_distance = settings.IMAGE_DUPLICATE_DISTANCE
+        querysets = (AdImage.objects.all(), MatrimonialProfileImage.objects.all())
+        tree = build_image_index(*querysets)
+
+        reported = set()
+        for queryset in querysets:
+            label = queryset.model._meta.label
+            for pk, phash, image in queryset.filter(phash__isnull=False).values_list('id', 'phash', 'image'):
+                if (label, pk) in reported:
+                    continue
+                matches = tree.search(to_unsigned(phash), max_distance)
+                if len(matches) < 2:
+                    continue
+                reported.update(key for key, _ in matches)
+                self.stdout.write(image)
+                for (match_label, match_pk), distance in matches:
+                    self.stdout.write(f'    {match_label} {match_pk} (distance {distance})')
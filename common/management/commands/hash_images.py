@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from ads.models import AdImage
+from common.images import hash_images
+from matrimonials.models import MatrimonialProfileImage
+
+
+class Command(BaseCommand):
+    help = 'Computes the perceptual hash of ad and matrimonial profile images that have none yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        for model in (AdImage, MatrimonialProfileImage):
+            hashed, failed = hash_images(model.objects.all(), batch_size=options['batch_size'])
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {hashed} hashed, {failed} could not be read.')
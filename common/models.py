@@ -1,16 +1,74 @@
-from uuid import uuid4
+import secrets
+import threading
+import time
+from uuid import UUID
 
 from django.db import models
 
+_uuid7_lock = threading.Lock()
+_uuid7_last_ms = 0
+_uuid7_counter = 0
+
+
+def uuid7():
+    """
+    Time-ordered UUID (version 7): a 48-bit Unix timestamp in milliseconds,
+    a 12-bit counter and 62 random bits. New rows get increasing keys, so
+    inserts append to the right edge of the primary key index instead of a
+    random leaf. Ids generated by this process are strictly increasing; the
+    counter starts at a random point each millisecond and, once exhausted,
+    borrows the next millisecond.
+    """
+    global _uuid7_last_ms, _uuid7_counter
+    with _uuid7_lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _uuid7_last_ms:
+            _uuid7_last_ms, _uuid7_counter = ms, secrets.randbits(11)
+        else:
+            _uuid7_counter += 1
+            if _uuid7_counter > 0xFFF:
+                _uuid7_last_ms, _uuid7_counter = _uuid7_last_ms + 1, 0
+        ms, counter = _uuid7_last_ms, _uuid7_counter
+
+    return UUID(int=(ms << 80) | (0x7 << 76) | (counter << 64) | (0b10 << 62) | secrets.randbits(62))
+
 
 # Create your models here.
 
 
 class BaseModel(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid4, editable=False, unique=True)
+    # Rows created before uuid7 became the default keep their random uuid4 ids
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False, unique=True)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True, null=True)
 
     class Meta:
         abstract = True
-        ordering = ("-created",)
+
+
+class ParticipantPairModel(BaseModel):
+    """
+    Base for rooms between two parties (`initiator` and `receiver` foreign
+    keys on the concrete model). The pair is also stored in a canonical order,
+    so a unique constraint on it holds whoever started the room, and finding
+    the room is a single index probe.
+    """
+
+    participant_low = models.UUIDField(editable=False)
+    participant_high = models.UUIDField(editable=False)
+
+    class Meta:
+        abstract = True
+
+    @staticmethod
+    def participant_pair(first, second):
+        """
+        Lookup kwargs for the room between `first` and `second` (instances or ids).
+        """
+        low, high = sorted(getattr(party, "pk", party) for party in (first, second))
+        return {"participant_low": low, "participant_high": high}
+
+    def save(self, *args, **kwargs):
+        pair = self.participant_pair(self.initiator_id, self.receiver_id)
+        self.participant_low, self.participant_high = pair["participant_low"], pair["participant_high"]
+        super().save(*args, **kwargs)
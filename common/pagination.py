@@ -0,0 +1,44 @@
+import base64
+import json
+import uuid
+
+from django.db.models import Q
+from rest_framework import status
+
+from common.exceptions import CustomValidation
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """The `(count, id)` pair a cursor from `keyset_paginate` carries."""
+    try:
+        count, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if type(count) is not int:
+            raise TypeError(count)
+        return count, uuid.UUID(last_id)
+    except (ValueError, TypeError, AttributeError):
+        raise CustomValidation({"message": "Invalid cursor", "status": "failed"}, status.HTTP_400_BAD_REQUEST)
+
+
+def keyset_paginate(queryset, cursor, page_size, count_field="report_count"):
+    """
+    Page through `queryset` ordered by `-count_field, id` without OFFSET: the
+    cursor carries the last row's (count, id), so every page is a single range
+    scan on a `(-count_field, id)` index however deep the client goes.
+
+    Returns the rows of the page and the cursor of the next page (None at the end).
+    """
+    queryset = queryset.order_by(f"-{count_field}", "id")
+    if cursor:
+        count, last_id = decode_cursor(cursor)
+        queryset = queryset.filter(Q(**{f"{count_field}__lt": count}) | Q(**{count_field: count, "id__gt": last_id}))
+
+    rows = list(queryset[:page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, count_field), str(last.id)])
@@ -0,0 +1,64 @@
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_drf_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # Types the fast encoders don't know (Decimal, lazy translations, querysets, ...) are
+    # converted exactly as DRF's JSONEncoder would
+    return _drf_encoder.default(obj)
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Replacement for DRF's `JSONRenderer` backed by orjson. UUIDs, datetimes,
+    dicts and lists (including DRF's ReturnDict/ReturnList) are encoded
+    natively in C; the output is the same compact UTF-8 JSON, with UTC
+    datetimes ending in `Z` and U+2028/U+2029 escaped as DRF writes them.
+    Integers beyond 64 bits, which orjson rejects, and indented output
+    (`; indent=` in the Accept header, or the browsable API) are rendered by
+    DRF.
+
+    One difference remains: NaN and infinite floats are written as `null`,
+    where DRF's strict JSON raises ValueError.
+    """
+
+    media_type = "application/json"
+    format = "json"
+    charset = None
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        json_renderer = JSONRenderer()
+        if json_renderer.get_indent(accepted_media_type, renderer_context or {}):
+            return json_renderer.render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(data, default=_default, option=self.options)
+        except orjson.JSONEncodeError:
+            return json_renderer.render(data, accepted_media_type, renderer_context)
+        # Valid JSON, but line terminators in JavaScript source
+        return content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders responses as MessagePack for clients sending
+    `Accept: application/msgpack` (or `?format=msgpack`). Values MessagePack
+    has no type for (UUIDs, datetimes, decimals) are sent as their JSON
+    representation.
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=_default, use_bin_type=True, datetime=False)
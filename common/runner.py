@@ -0,0 +1,33 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Runs the suite with the settings that assume long-lived processes
+    switched off: the ad counter flusher would otherwise write into the test
+    database from its own thread and flush once more at exit, after the test
+    database is gone, and the token blacklist filter and ad duplicate index
+    would be loaded from threads outside the test's transaction. The cache is
+    kept in memory, so the suite needs no Redis server.
+    """
+
+    test_settings = {
+        "AD_COUNTER_FLUSH_INTERVAL": None,
+        "TOKEN_BLACKLIST_FILTER_REBUILD_IN_BACKGROUND": False,
+        "AD_DUPLICATE_INDEX_PRELOAD": False,
+        "CACHES": {
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            },
+        },
+    }
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._test_settings = override_settings(**self.test_settings)
+        self._test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._test_settings.disable()
+        super().teardown_test_environment(**kwargs)
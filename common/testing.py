@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+
+TEST_PHONE_NUMBER = "+123456789"
+TEST_PASSWORD = "string"
+
+
+def create_user(email, full_name="Test User", **extra_fields):
+    """
+    Create a user with the phone number and password the tests share, unless
+    given others.
+    """
+    extra_fields.setdefault("phone_number", TEST_PHONE_NUMBER)
+    extra_fields.setdefault("password", TEST_PASSWORD)
+    return get_user_model().objects.create_user(email=email, full_name=full_name, **extra_fields)
+
+
+class AuthenticatedAPITestCase(APITestCase):
+    """
+    API test case whose client is signed in as `cls.user`, which subclasses
+    create in setUpTestData.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.user)
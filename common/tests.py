@@ -0,0 +1,103 @@
+import datetime
+import io
+from decimal import Decimal
+from unittest import mock
+
+import msgpack
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.urls import reverse_lazy
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnList
+
+from ads.cache import feed_generation
+from ads.models import Ad
+from common.models import uuid7
+from common.renderers import MessagePackRenderer, ORJSONRenderer
+from common.testing import AuthenticatedAPITestCase, create_user
+
+
+# Create your tests here.
+
+
+class UUID7TestCase(SimpleTestCase):
+    def test_layout(self):
+        value = uuid7()
+        self.assertEqual(value.version, 7)
+        self.assertEqual(value.variant, "specified in RFC 4122")
+
+    def test_ids_increase_within_and_across_milliseconds(self):
+        ids = [uuid7() for _ in range(10000)]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), len(ids))
+
+    def test_ids_keep_increasing_when_the_clock_stalls(self):
+        with mock.patch("common.models.time.time_ns", return_value=1_700_000_000_000 * 1_000_000):
+            ids = [uuid7() for _ in range(5000)]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), len(ids))
+
+
+class RendererTestCase(SimpleTestCase):
+    created = datetime.datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc)
+    data = {
+        "message": gettext_lazy("Ads retrieved successfully"),
+        "data": ReturnList([
+            {"id": uuid7(), "price": Decimal("9.50"), "created": created, "title": "Café",
+             "images": ("a.png", "b.png"), "nested": {1: None}},
+        ], serializer=None),
+        "status": "success",
+    }
+
+    def test_orjson_output_matches_drf(self):
+        self.assertEqual(ORJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_orjson_edge_cases(self):
+        # Line and paragraph separators are escaped, as DRF does for JavaScript consumers
+        data = {"text": "line\u2028paragraph\u2029end"}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertIn(b"\\u2028", ORJSONRenderer().render(data))
+        # Integers orjson cannot encode are rendered by DRF
+        data = {"big": 2 ** 64, "small": -2 ** 70}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        # The documented difference: DRF rejects NaN, orjson writes null
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({"value": float("nan")})
+        self.assertEqual(ORJSONRenderer().render({"value": float("nan")}), b'{"value":null}')
+
+    def test_indented_output_is_rendered_by_drf(self):
+        for media_type, context in (("application/json; indent=2", {}), ("application/json", {"indent": 4})):
+            with self.subTest(media_type=media_type, context=context):
+                self.assertEqual(ORJSONRenderer().render(self.data, media_type, context),
+                                 JSONRenderer().render(self.data, media_type, context))
+                self.assertIn(b"\n  ", ORJSONRenderer().render(self.data, media_type, context))
+
+    def test_msgpack_round_trips_to_the_json_representation(self):
+        decoded = msgpack.unpackb(MessagePackRenderer().render(self.data), strict_map_key=False)
+        row = decoded["data"][0]
+        self.assertEqual(row["id"], str(self.data["data"][0]["id"]))
+        self.assertEqual((row["price"], row["created"]), (9.5, "2024-01-02T03:04:05.678901Z"))
+        self.assertEqual(decoded["message"], "Ads retrieved successfully")
+
+
+class ContentNegotiationTestCase(AuthenticatedAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("renderer@example.com", "Renderer")
+
+    def test_accept_header_selects_the_renderer(self):
+        response = self.client.get(reverse_lazy("all_ads"))
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response.json()["status"], "success")
+
+        response = self.client.get(reverse_lazy("all_ads"), HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content)["status"], "success")
+
+    def test_renderer_benchmark_leaves_the_feed_caches_alone(self):
+        generation = feed_generation()
+        call_command("benchmark_renderers", rows=2, repeat=1, stdout=io.StringIO())
+        self.assertEqual(feed_generation(), generation)
+        self.assertFalse(Ad.objects.exists())
@@ -1,12 +1,13 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
+from common.admin import PerformantAdminMixin
 from core.forms import CustomUserChangeForm, CustomUserCreationForm
-from core.models import Feedback, Profile, User, UserReport
+from core.models import AccountDeletionJob, Feedback, Profile, User, UserReport
 
 
 @admin.register(User)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(PerformantAdminMixin, UserAdmin):
     add_form = CustomUserCreationForm
     form = CustomUserChangeForm
     model = User
@@ -17,14 +18,13 @@ class CustomUserAdmin(UserAdmin):
         "country",
         "is_staff",
         "is_active",
-        "is_verified"
+        "is_verified",
+        "report_count",
     )
     list_filter = (
-        "email",
-        "phone_number",
-        "full_name",
         "is_staff",
         "is_active",
+        "is_verified",
     )
     list_per_page = 30
     fieldsets = (
@@ -46,20 +46,21 @@ class CustomUserAdmin(UserAdmin):
             {"fields": ("is_staff", "is_active", "groups", "user_permissions")},
         ),
     )
-    search_fields = ("email",)
+    search_fields = ("email", "full_name")
     ordering = ("email",)
 
 
 @admin.register(Profile)
-class ProfileAdmin(admin.ModelAdmin):
+class ProfileAdmin(PerformantAdminMixin, admin.ModelAdmin):
     list_display = (
         "full_name",
         "email_address",
         "phone_number"
     )
+    list_select_related = ("user",)
     list_per_page = 30
     ordering = ("user__email",)
-    search_fields = ("email_address",)
+    search_fields = ("user__email", "user__full_name")
 
     @staticmethod
     def full_name(obj: Profile):
@@ -75,7 +76,7 @@ class ProfileAdmin(admin.ModelAdmin):
 
 
 @admin.register(Feedback)
-class FeedbackAdmin(admin.ModelAdmin):
+class FeedbackAdmin(PerformantAdminMixin, admin.ModelAdmin):
     list_display = ("user", "feedback_text")
     list_per_page = 30
     ordering = ("user__full_name",)
@@ -97,8 +98,9 @@ class FeedbackAdmin(admin.ModelAdmin):
 
 
 @admin.register(UserReport)
-class UserReportAdmin(admin.ModelAdmin):
+class UserReportAdmin(PerformantAdminMixin, admin.ModelAdmin):
     list_display = ("reporter_email", "offender_email", "report")
+    list_select_related = ("reporter", "offender")
     list_per_page = 30
 
     @staticmethod
@@ -115,3 +117,11 @@ class UserReportAdmin(admin.ModelAdmin):
         if len(obj.text) > max_length:
             return obj.text[:max_length] + '...'
         return obj.text
+
+
+@admin.register(AccountDeletionJob)
+class AccountDeletionJobAdmin(PerformantAdminMixin, admin.ModelAdmin):
+    list_display = ("email", "status", "step", "deleted_rows", "created", "completed_at")
+    list_filter = ("status",)
+    readonly_fields = ("user", "email", "status", "step", "deleted_rows", "error", "completed_at")
+    list_per_page = 30
@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from common.cache import cache_is_shared
+from core.models import Profile
+
+User = get_user_model()
+
+# What views read from `request.user` and `request.user.profile`. Anything else
+# (the password hash in particular, which never goes to the cache) is deferred
+# and loaded on access.
+USER_FIELDS = ("id", "email", "full_name", "phone_number", "country", "is_active", "is_staff", "is_superuser",
+               "is_verified")
+PROFILE_FIELDS = ("id", "user_id", "description", "language", "avatar")
+
+
+def cached_user_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(cached_user_key(user_id))
+
+
+def _from_values(model, values):
+    """
+    Rebuild a model instance from an `{attname: value}` projection, as if it
+    had been loaded with `.only()`.
+    """
+    field_names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db(router.db_for_read(model), field_names, [values[name] for name in field_names])
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that keeps a projection of the user and their profile
+    in the cache for AUTH_USER_CACHE_TTL seconds, so most authenticated
+    requests need no query to resolve `request.user` or `request.user.profile`.
+    Entries are dropped whenever the user or profile is saved or deleted and
+    on logout; the TTL bounds staleness after bulk `update()`s, which send no
+    signals. Without a shared cache those invalidations stay in the process
+    that made them, so the user is loaded on every request instead.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        if cache_is_shared():
+            user = self._cached_user(user_id)
+        else:
+            # Invalidations made by other processes would never reach this process's entry
+            user = self._load_user(user_id)
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
+
+    def _cached_user(self, user_id):
+        key = cached_user_key(user_id)
+        cached = cache.get(key)
+        if cached is None:
+            user = self._load_user(user_id)
+            profile = getattr(user, "profile", None)
+            cached = (
+                {name: getattr(user, name) for name in USER_FIELDS},
+                None if profile is None else {name: getattr(profile, name) for name in PROFILE_FIELDS},
+            )
+            cache.set(key, cached, settings.AUTH_USER_CACHE_TTL)
+            return user
+        return self._build_user(*cached)
+
+    @staticmethod
+    def _load_user(user_id):
+        try:
+            return (
+                User.objects.select_related("profile")
+                .only(*USER_FIELDS, *(f"profile__{name}" for name in PROFILE_FIELDS))
+                .get(**{api_settings.USER_ID_FIELD: user_id})
+            )
+        except User.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+    @staticmethod
+    def _build_user(user_values, profile_values):
+        user = _from_values(User, user_values)
+        profile = None
+        if profile_values is not None:
+            profile = _from_values(Profile, profile_values)
+            Profile.user.field.set_cached_value(profile, user)
+        User.profile.related.set_cached_value(user, profile)
+        return user
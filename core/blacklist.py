@@ -0,0 +1,144 @@
+import hashlib
+import math
+import threading
+import time
+import warnings
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from common.cache import cache_is_shared
+
+# Floor for the filter's capacity, leaving room for tokens blacklisted between rebuilds
+BLACKLIST_FILTER_MIN_CAPACITY = 1024
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings. `item in filter` is False only for
+    items that were never added; True may be a false positive at roughly
+    `error_rate` while fewer than `capacity` items have been added.
+    """
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing: k positions from the two halves of a single digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+_filter_lock = threading.Lock()
+_filter = None
+_filter_built_at = 0.0
+_rebuilding = False
+
+
+def recently_blacklisted_key(jti):
+    return f"auth:blacklisted:{jti}"
+
+
+def rebuild_blacklist_filter():
+    """
+    Load the JTIs of every unexpired blacklisted token into a fresh filter.
+    Expired tokens fail signature validation before the blacklist is checked,
+    so they are left out.
+    """
+    global _filter, _filter_built_at
+    built_at = time.monotonic()
+    jtis = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now()).values_list("token__jti", flat=True)
+    bloom = BloomFilter(max(jtis.count() * 2, BLACKLIST_FILTER_MIN_CAPACITY),
+                        settings.TOKEN_BLACKLIST_FILTER_ERROR_RATE)
+    for jti in jtis.iterator(chunk_size=2000):
+        bloom.add(jti)
+    with _filter_lock:
+        _filter, _filter_built_at = bloom, built_at
+    return bloom
+
+
+def _rebuild_in_background():
+    global _rebuilding
+    try:
+        rebuild_blacklist_filter()
+    except DatabaseError as e:
+        warnings.warn(f"Could not rebuild the token blacklist filter: {e}")
+    finally:
+        connection.close()
+        with _filter_lock:
+            _rebuilding = False
+
+
+def get_blacklist_filter():
+    """
+    This process's filter, or None when it has none that can be trusted. A
+    filter older than TOKEN_BLACKLIST_FILTER_TTL is replaced from a background
+    thread, and served meanwhile until it is twice that old, as long as
+    `record_blacklisted` keeps newer JTIs in the cache.
+    """
+    global _rebuilding
+    ttl = settings.TOKEN_BLACKLIST_FILTER_TTL
+    with _filter_lock:
+        bloom, age = _filter, time.monotonic() - _filter_built_at
+    if bloom is not None and age < ttl:
+        return bloom
+    if not settings.TOKEN_BLACKLIST_FILTER_REBUILD_IN_BACKGROUND:
+        return rebuild_blacklist_filter()
+
+    with _filter_lock:
+        start, _rebuilding = not _rebuilding, True
+    if start:
+        threading.Thread(target=_rebuild_in_background, daemon=True).start()
+    return bloom if bloom is not None and age < 2 * ttl else None
+
+
+def record_blacklisted(jti):
+    """
+    Make a newly blacklisted JTI visible before the filters are rebuilt: this
+    process adds it to its filter, and every process finds it in the shared
+    cache for as long as it may still serve a filter built without it.
+    """
+    cache.set(recently_blacklisted_key(jti), True, 2 * settings.TOKEN_BLACKLIST_FILTER_TTL)
+    with _filter_lock:
+        if _filter is not None:
+            _filter.add(jti)
+
+
+def is_blacklisted(jti):
+    # The filter only stands in for the table when a JTI blacklisted by another process
+    # reaches this one through the cache; a hit may be a false positive, so the table has the final say
+    if cache_is_shared():
+        bloom = get_blacklist_filter()
+        if bloom is not None and jti not in bloom:
+            return cache.get(recently_blacklisted_key(jti), False)
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+class FilteredRefreshToken(RefreshToken):
+    """
+    Refresh token whose blacklist check goes through the in-process Bloom
+    filter, so with a shared cache a token that was never blacklisted costs a
+    cache lookup rather than a query on the blacklist table.
+    """
+
+    def check_blacklist(self):
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
@@ -5,3 +5,15 @@ GENDER_CHOICES = (
     (GENDER_MALE, "Male"),
     (GENDER_FEMALE, "Female"),
 )
+
+DELETION_PENDING = "Pending"
+DELETION_RUNNING = "Running"
+DELETION_COMPLETED = "Completed"
+DELETION_FAILED = "Failed"
+
+DELETION_STATUS_CHOICES = (
+    (DELETION_PENDING, "Pending"),
+    (DELETION_RUNNING, "Running"),
+    (DELETION_COMPLETED, "Completed"),
+    (DELETION_FAILED, "Failed"),
+)
@@ -0,0 +1,101 @@
+import threading
+import warnings
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from ads.choices import STATUS_ACTIVE
+from ads.models import Ad, AdImage, AdReport, Chat, FavouriteAd, Message as AdMessage, SimilarAd
+from ads.moderation import MODERATION_PAUSE, moderate_ads
+from core.choices import DELETION_COMPLETED, DELETION_FAILED, DELETION_RUNNING
+from core.models import AccountDeletionJob, Feedback, Otp, User, UserReport
+from matrimonials.models import BookmarkedProfile, ConnectionRequest, Conversation, FavouriteProfile, \
+    MatrimonialProfile, MatrimonialProfileImage, Message as MatrimonialMessage
+
+
+def deletion_plan(user):
+    """
+    Querysets of everything that cascades from `user`, children before their
+    parents, so each step deletes leaf rows and the user's own row goes last
+    with almost nothing left to cascade to.
+    """
+    ads = Ad.objects.filter(ad_creator=user)
+    chats = Chat.objects.filter(Q(initiator=user) | Q(receiver=user) | Q(ad__in=ads))
+    conversations = Conversation.objects.filter(Q(initiator__user=user) | Q(receiver__user=user))
+    return [
+        AdMessage.objects.filter(Q(chat__in=chats) | Q(sender=user)),
+        chats,
+        FavouriteAd.objects.filter(Q(customer=user) | Q(ad__in=ads)),
+        AdReport.objects.filter(Q(reporter=user) | Q(ad__in=ads)),
+        AdImage.objects.filter(ad__in=ads),
+        SimilarAd.objects.filter(Q(ad__in=ads) | Q(similar__in=ads)),
+        ads,
+        MatrimonialMessage.objects.filter(Q(conversation__in=conversations) | Q(sender__user=user)),
+        conversations,
+        ConnectionRequest.objects.filter(Q(sender__user=user) | Q(receiver__user=user)),
+        FavouriteProfile.objects.filter(Q(user__user=user) | Q(profile__user=user)),
+        BookmarkedProfile.objects.filter(Q(user=user) | Q(profile__user=user)),
+        MatrimonialProfileImage.objects.filter(matrimonial_profile__user=user),
+        MatrimonialProfile.objects.filter(user=user),
+        UserReport.objects.filter(Q(reporter=user) | Q(offender=user)),
+        Otp.objects.filter(user=user),
+        Feedback.objects.filter(user=user),
+        User.objects.filter(pk=user.pk),
+    ]
+
+
+def schedule_account_deletion(user):
+    """
+    Deactivate `user` and take their ads out of the feeds straight away, and
+    delete their data in the background once that is committed.
+    """
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=["is_active", "updated"])
+        moderate_ads(Ad.objects.filter(ad_creator=user, status=STATUS_ACTIVE), MODERATION_PAUSE)
+        job = AccountDeletionJob.objects.create(user=user, email=user.email)
+        transaction.on_commit(lambda: start_account_deletion(job.pk))
+    return job
+
+
+def start_account_deletion(job_id):
+    threading.Thread(target=_run_in_thread, args=(job_id,), daemon=True).start()
+
+
+def _run_in_thread(job_id):
+    try:
+        run_account_deletion(job_id)
+    except Exception as e:
+        warnings.warn(f"Account deletion job {job_id} failed: {e}")
+    finally:
+        connection.close()
+
+
+def run_account_deletion(job_id):
+    """
+    Delete the job's user and everything that references them, in chunks of
+    ACCOUNT_DELETION_CHUNK_SIZE rows, each in its own short transaction. Safe
+    to rerun on a job that was interrupted: it picks up whatever is left.
+    """
+    jobs = AccountDeletionJob.objects.filter(pk=job_id)
+    job = jobs.get()
+    if job.user_id is None:
+        # The user row went last, so the job was only interrupted before being marked done
+        jobs.update(status=DELETION_COMPLETED, completed_at=job.completed_at or timezone.now())
+        return
+
+    jobs.update(status=DELETION_RUNNING, error="")
+    try:
+        for queryset in deletion_plan(job.user):
+            model = queryset.model
+            jobs.update(step=model._meta.label)
+            while ids := list(queryset.values_list("pk", flat=True)[:settings.ACCOUNT_DELETION_CHUNK_SIZE]):
+                deleted, _ = model.objects.filter(pk__in=ids).delete()
+                jobs.update(deleted_rows=F("deleted_rows") + deleted)
+    except Exception as e:
+        jobs.update(status=DELETION_FAILED, error=str(e))
+        raise
+
+    jobs.update(status=DELETION_COMPLETED, step="", completed_at=timezone.now())
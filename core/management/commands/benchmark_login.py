@@ -0,0 +1,62 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from django.utils.module_loading import import_string
+from rest_framework.test import APIRequestFactory
+
+from core.views import LoginView
+
+User = get_user_model()
+
+BENCHMARK_EMAIL = "login-benchmark@example.com"
+BENCHMARK_PASSWORD = "benchmark-password"
+
+
+class Command(BaseCommand):
+    help = ('Measures login throughput of LoginView with each configured password hasher. '
+            'The benchmark user is created in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=50)
+        parser.add_argument('--hasher', action='append', dest='hashers',
+                            help='Algorithm to measure (e.g. argon2, pbkdf2_sha256); repeatable. Defaults to all.')
+
+    def handle(self, *args, **options):
+        hashers = {import_string(path).algorithm: path for path in settings.PASSWORD_HASHERS}
+        selected = options['hashers'] or list(hashers)
+        unknown = set(selected) - set(hashers)
+        if unknown:
+            raise CommandError(f"Unknown hashers: {', '.join(sorted(unknown))}. Choose from {', '.join(hashers)}.")
+
+        # Middleware and throttling are left out so only the view's own work is measured
+        view = LoginView.as_view(throttle_classes=[])
+        factory = APIRequestFactory()
+        body = {"email": BENCHMARK_EMAIL, "password": BENCHMARK_PASSWORD}
+
+        for algorithm in selected:
+            hasher = import_string(hashers[algorithm])()
+            if hasher.library:
+                try:
+                    hasher._load_library()
+                except ValueError:
+                    library = hasher.library[0] if isinstance(hasher.library, tuple) else hasher.library
+                    self.stdout.write(f"{algorithm}: skipped, {library} is not installed")
+                    continue
+
+            with override_settings(PASSWORD_HASHERS=[hashers[algorithm]]), transaction.atomic():
+                User.objects.create_user(email=BENCHMARK_EMAIL, full_name="Login Benchmark",
+                                         phone_number="+10000000000", password=BENCHMARK_PASSWORD, is_verified=True)
+                start = time.perf_counter()
+                for _ in range(options['logins']):
+                    response = view(factory.post('/', body, format='json'))
+                    if response.status_code != 200:
+                        raise CommandError(f"Login failed with {algorithm}: {response.data}")
+                elapsed = time.perf_counter() - start
+                transaction.set_rollback(True)
+
+            self.stdout.write(f"{algorithm}: {options['logins']} logins in {elapsed:.2f}s "
+                              f"({options['logins'] / elapsed:.1f}/s, {elapsed / options['logins'] * 1000:.1f} ms each)")
@@ -9,7 +9,7 @@ class Command(BaseCommand):
     help = 'Creates a superuser.'
 
     def handle(self, *args, **options):
-        if not User.objects.filter(email=config('ADMIN_EMAIL')).exists():
+        if not User.objects.filter(email=User.objects.normalize_email(config('ADMIN_EMAIL'))).exists():
             User.objects.create_superuser(
                     email=config('ADMIN_EMAIL'),
                     full_name=config('ADMIN_FULL_NAME'),
@@ -0,0 +1,145 @@
+import csv
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import transaction
+from django_countries import countries
+
+from core.models import Profile, User
+
+USER_COLUMNS = ("full_name", "phone_number", "country")
+TRUE_VALUES = {"1", "true", "yes", "y"}
+
+
+def read_rows(path, file_format):
+    with open(path, newline="", encoding="utf-8") as source:
+        if file_format == "csv":
+            yield from csv.DictReader(source)
+        else:
+            for line in source:
+                # Blank lines still count as rows so checkpoints line up with the file
+                yield json.loads(line) if line.strip() else {}
+
+
+def row_errors(row):
+    """
+    Messages for the values of `row` that the User model would reject. Country
+    is free text on the model, so it only has to name a known country.
+    """
+    errors = []
+    for column in ("full_name", "phone_number"):
+        if value := row.get(column):
+            try:
+                User._meta.get_field(column).clean(str(value), None)
+            except ValidationError as e:
+                errors.extend(f"{column}: {message}" for message in e.messages)
+    country = row.get("country")
+    if country and not (countries.alpha2(country) or countries.by_name(country)):
+        errors.append(f"country: {country} is not a known country")
+    return errors
+
+
+def read_checkpoint(path):
+    try:
+        with open(path, encoding="utf-8") as checkpoint:
+            return json.load(checkpoint)["rows"]
+    except FileNotFoundError:
+        return 0
+
+
+def write_checkpoint(path, rows):
+    # Written to a temporary file and renamed, so a crash never leaves a truncated checkpoint
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as checkpoint:
+        json.dump({"rows": rows}, checkpoint)
+    os.replace(temporary, path)
+
+
+class Command(BaseCommand):
+    help = ('Imports users from a CSV or JSON Lines file with the columns email, full_name, phone_number, country, '
+            'password and is_verified. Rows with values the User model rejects are reported and skipped. Rows '
+            'are streamed in chunks: passwords are hashed in a process pool, then users and their profiles are inserted with bulk_create, bypassing the per-user post_save signals. '
+            'Progress is checkpointed after every chunk; rerunning the command resumes from there.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=('csv', 'jsonl'),
+                            help='Defaults to the file extension (.csv, otherwise JSON Lines).')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Processes hashing passwords.')
+        parser.add_argument('--checkpoint', help='Defaults to <path>.checkpoint.')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.is_file():
+            raise CommandError(f"{path} does not exist.")
+        file_format = options['format'] or ('csv' if path.suffix.lower() == '.csv' else 'jsonl')
+        checkpoint = options['checkpoint'] or f"{path}.checkpoint"
+
+        done = read_checkpoint(checkpoint)
+        if done:
+            self.stdout.write(f"Resuming after row {done}.")
+        rows = itertools.islice(read_rows(path, file_format), done, None)
+
+        created = skipped = 0
+        # Workers set Django up themselves where processes are spawned rather than forked
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+            while chunk := list(itertools.islice(rows, options['chunk_size'])):
+                chunk_created = self.import_chunk(chunk, pool, options['workers'], first_row=done + 1)
+                created += chunk_created
+                skipped += len(chunk) - chunk_created
+                done += len(chunk)
+                write_checkpoint(checkpoint, done)
+                self.stdout.write(f"{done} rows read, {created} users created.")
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(f"Imported {created} users, skipped {skipped} rows.")
+
+    def import_chunk(self, chunk, pool, workers, first_row=1):
+        rows = {}
+        for number, row in enumerate(chunk, first_row):
+            email = User.objects.normalize_email(row.get("email"))
+            try:
+                validate_email(email)
+            except ValidationError:
+                self.stderr.write(f"Row {number}: invalid email {email!r}, skipped.")
+                continue
+            if errors := row_errors(row):
+                self.stderr.write(f"Row {number}: {'; '.join(errors)}, skipped.")
+                continue
+            # The first row wins for emails repeated in the file
+            rows.setdefault(email, row)
+
+        # Emails already present include the users of a chunk whose checkpoint was never written
+        existing = set(User.objects.filter(email__in=rows).values_list("email", flat=True))
+        rows = {email: row for email, row in rows.items() if email not in existing}
+        if not rows:
+            return 0
+
+        passwords = pool.map(make_password, [row.get("password") or None for row in rows.values()],
+                             chunksize=max(1, len(rows) // (workers * 4)))
+        users = [
+            User(
+                    **{column: row.get(column) or None for column in USER_COLUMNS},
+                    email=email,
+                    password=password,
+                    is_verified=str(row.get("is_verified", "")).strip().lower() in TRUE_VALUES,
+            )
+            for (email, row), password in zip(rows.items(), passwords)
+        ]
+
+        with transaction.atomic():
+            # Ids are generated client-side, so the profiles can point at the users straight away
+            User.objects.bulk_create(users)
+            Profile.objects.bulk_create([Profile(user=user) for user in users])
+        return len(users)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from core.choices import DELETION_FAILED, DELETION_PENDING, DELETION_RUNNING
+from core.deletion import run_account_deletion
+from core.models import AccountDeletionJob
+
+
+class Command(BaseCommand):
+    help = ('Runs account deletion jobs that did not finish in the background, e.g. because the worker that '
+            'started them was restarted. Deactivated users stay deactivated until their job completes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true')
+
+    def handle(self, *args, **options):
+        statuses = [DELETION_PENDING, DELETION_RUNNING]
+        if options['retry_failed']:
+            statuses.append(DELETION_FAILED)
+
+        job_ids = list(AccountDeletionJob.objects.filter(status__in=statuses).order_by('created')
+                       .values_list('id', flat=True))
+        for job_id in job_ids:
+            run_account_deletion(job_id)
+        self.stdout.write(f"Ran {len(job_ids)} account deletion jobs.")
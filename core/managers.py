@@ -19,6 +19,21 @@ class CustomUserManager(BaseUserManager):
         except ValidationError:
             raise ValueError("You must provide a valid email address")
 
+    @classmethod
+    def normalize_email(cls, email):
+        """
+        Emails are stored lower-cased, so every lookup by email is an exact
+        match on the unique index whatever case the user typed.
+        """
+        return super().normalize_email(email or "").strip().lower()
+
+    def get_by_email(self, email):
+        return self.get(email=self.normalize_email(email))
+
+    def get_by_natural_key(self, email):
+        # Authentication is followed by reads of the profile (login response, token claims)
+        return self.select_related("profile").get(email=self.normalize_email(email))
+
     def create_user(self, email, full_name, phone_number, password, **extra_fields):
         """
         Create and save a user with the given email and password.
@@ -0,0 +1,25 @@
+# Generated by Django 4.1.7 on 2026-10-19 13:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0004_remove_profile_country_user_country_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="report_count",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Number of reports filed against this user."
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["-report_count", "id"], name="core_user_report__5e892e_idx"
+            ),
+        ),
+    ]
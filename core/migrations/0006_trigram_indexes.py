@@ -0,0 +1,26 @@
+# Generated by Django 4.1.7 on 2026-10-19 13:33
+
+import common.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0005_user_report_count_user_core_user_report__5e892e_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(common.indexes.create_trigram_extension, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="user",
+            index=common.indexes.TrigramIndex(
+                fields=["email"], name="core_user_email_trgm"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=common.indexes.TrigramIndex(
+                fields=["full_name"], name="core_user_full_name_trgm"
+            ),
+        ),
+    ]
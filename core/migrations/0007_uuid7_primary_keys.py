@@ -0,0 +1,68 @@
+# Generated by Django 4.1.7 on 2026-10-19 13:35
+
+import common.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0006_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="feedback",
+            name="id",
+            field=models.UUIDField(
+                default=common.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="otp",
+            name="id",
+            field=models.UUIDField(
+                default=common.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="profile",
+            name="id",
+            field=models.UUIDField(
+                default=common.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="user",
+            name="id",
+            field=models.UUIDField(
+                default=common.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="userreport",
+            name="id",
+            field=models.UUIDField(
+                default=common.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.1.7 on 2026-10-19 13:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0007_uuid7_primary_keys"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="feedback",
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name="otp",
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name="userreport",
+            options={},
+        ),
+        migrations.AddIndex(
+            model_name="otp",
+            index=models.Index(
+                fields=["user", "-created"], name="core_otp_user_id_11eb32_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.1.7 on 2026-10-19 13:39
+
+from django.db import migrations, models
+from django.db.models.functions import Lower
+import django.db.models.functions.text
+
+
+def lowercase_emails(apps, schema_editor):
+    """
+    Lower-case stored emails. Accounts whose emails only differ by case can't
+    be merged automatically, so they stop the migration for an operator to
+    resolve first.
+    """
+    User = apps.get_model("core", "User")
+    users = User.objects.exclude(email=Lower("email")).only("id", "email")
+
+    clashes = [
+        user.email for user in users
+        if User.objects.filter(email__iexact=user.email).exclude(id=user.id).exists()
+    ]
+    if clashes:
+        raise RuntimeError(
+            "These emails belong to several accounts differing only by case, merge them before migrating: "
+            + ", ".join(sorted(clashes))
+        )
+    users.update(email=Lower("email"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0008_explicit_orderings"),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_emails, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="user",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("email"),
+                name="core_user_email_ci_unique",
+            ),
+        ),
+    ]
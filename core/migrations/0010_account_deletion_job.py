@@ -0,0 +1,77 @@
+# Generated by Django 4.1.7 on 2026-10-19 13:47
+
+import common.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0009_case_insensitive_email"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AccountDeletionJob",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=common.models.uuid7,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        unique=True,
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("updated", models.DateTimeField(auto_now=True, null=True)),
+                (
+                    "email",
+                    models.EmailField(
+                        help_text="Email of the account being deleted.", max_length=254
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("Pending", "Pending"),
+                            ("Running", "Running"),
+                            ("Completed", "Completed"),
+                            ("Failed", "Failed"),
+                        ],
+                        default="Pending",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "step",
+                    models.CharField(
+                        blank=True,
+                        help_text="The model whose rows are being deleted.",
+                        max_length=100,
+                    ),
+                ),
+                ("deleted_rows", models.PositiveIntegerField(default=0)),
+                ("error", models.TextField(blank=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="deletion_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="accountdeletionjob",
+            index=models.Index(
+                fields=["status", "created"], name="core_accoun_status_3056be_idx"
+            ),
+        ),
+    ]
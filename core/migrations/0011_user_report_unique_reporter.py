@@ -0,0 +1,42 @@
+# Generated by Django 4.1.7 on 2026-10-19 15:02
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+
+def remove_repeated_reports(apps, schema_editor):
+    """
+    Keep the first report of each user on an offender, and take the repeats
+    off the offender's report count so the unique constraint holds.
+    """
+    User = apps.get_model("core", "User")
+    UserReport = apps.get_model("core", "UserReport")
+
+    seen = set()
+    repeats = {}
+    reports = (UserReport.objects.filter(offender__isnull=False, reporter__isnull=False)
+               .order_by("created").values_list("id", "offender_id", "reporter_id"))
+    for report_id, offender_id, reporter_id in reports.iterator():
+        if (offender_id, reporter_id) in seen:
+            repeats.setdefault(offender_id, []).append(report_id)
+        seen.add((offender_id, reporter_id))
+    for offender_id, report_ids in repeats.items():
+        UserReport.objects.filter(id__in=report_ids).delete()
+        User.objects.filter(id=offender_id).update(report_count=Greatest(F("report_count") - len(report_ids), 0))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0010_account_deletion_job"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_repeated_reports, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="userreport",
+            constraint=models.UniqueConstraint(
+                fields=("offender", "reporter"), name="unique_offender_reporter"
+            ),
+        ),
+    ]
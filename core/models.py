@@ -1,10 +1,13 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django_countries.fields import CountryField
 
+from common.indexes import TrigramIndex
 from common.models import BaseModel
+from core.choices import DELETION_PENDING, DELETION_STATUS_CHOICES
 from core.validators import validate_phone_number
 from .managers import CustomUserManager
 
@@ -20,6 +23,7 @@ class User(BaseModel, AbstractUser):
     is_verified = models.BooleanField(
             default=False, help_text=_("Indicates whether the user's email is verified.")
     )
+    report_count = models.PositiveIntegerField(default=0, help_text=_("Number of reports filed against this user."))
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["full_name", "phone_number"]
@@ -29,6 +33,15 @@ class User(BaseModel, AbstractUser):
     class Meta:
         verbose_name = "User"
         verbose_name_plural = "Users"
+        constraints = [
+            # Guards writes that bypass CustomUserManager.normalize_email
+            models.UniqueConstraint(Lower('email'), name="core_user_email_ci_unique"),
+        ]
+        indexes = [
+            models.Index(fields=['-report_count', 'id']),
+            TrigramIndex(fields=['email'], name="core_user_email_trgm"),
+            TrigramIndex(fields=['full_name'], name="core_user_full_name_trgm"),
+        ]
 
 
 class Otp(BaseModel):
@@ -40,6 +53,11 @@ class Otp(BaseModel):
     expiry_date = models.DateTimeField(null=True, auto_now_add=True, editable=False,
                                        help_text=_("The date and time when the OTP will expire."))
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created']),
+        ]
+
     def __str__(self):
         return f"{self.user.full_name} ----- {self.code}"
 
@@ -93,5 +111,30 @@ class UserReport(BaseModel):
     offender = models.ForeignKey(User, on_delete=models.CASCADE, null=True, related_name="offense_reported_for")
     text = models.TextField()
 
+    class Meta:
+        constraints = [
+            # A user's report count is the number of people reporting them, not how often one of them does
+            models.UniqueConstraint(fields=['offender', 'reporter'], name="unique_offender_reporter"),
+        ]
+
     def __str__(self):
         return f"Reporter {self.reporter.email} --- Offender {self.offender.email} --- {self.text[30]}"
+
+
+class AccountDeletionJob(BaseModel):
+    # Kept after the user is gone, as a record of the deletion
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name="deletion_jobs")
+    email = models.EmailField(help_text=_("Email of the account being deleted."))
+    status = models.CharField(max_length=20, choices=DELETION_STATUS_CHOICES, default=DELETION_PENDING)
+    step = models.CharField(max_length=100, blank=True, help_text=_("The model whose rows are being deleted."))
+    deleted_rows = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created']),
+        ]
+
+    def __str__(self):
+        return f"{self.email} --- {self.status}"
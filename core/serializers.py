@@ -1,10 +1,13 @@
 import re
 
 from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
 from django_countries.serializer_fields import CountryField
-from rest_framework import serializers
+from rest_framework import serializers, status
+from rest_framework_simplejwt.serializers import TokenBlacklistSerializer, TokenRefreshSerializer
 
 from common.exceptions import CustomValidation
+from core.blacklist import FilteredRefreshToken
 from core.models import Feedback, User, UserReport
 
 
@@ -84,7 +87,7 @@ class RegisterSerializer(serializers.Serializer):
         full_name = attrs.get('full_name')
         phone_number = attrs.get('phone_number')
 
-        if User.objects.filter(email=email).exists():
+        if User.objects.filter(email=User.objects.normalize_email(email)).exists():
             raise CustomValidation({"message": "User with this email address already exists", "status": "failed"})
 
         try:
@@ -211,4 +214,25 @@ class ReportUserSerializer(serializers.Serializer):
         except User.DoesNotExist:
             raise CustomValidation({"message": "User does not exist", "status": "failed"})
 
-        return UserReport.objects.create(reporter=reporter, offender=offender, **validated_data)
+        try:
+            with transaction.atomic():
+                return UserReport.objects.create(reporter=reporter, offender=offender, **validated_data)
+        except IntegrityError:
+            raise CustomValidation({"message": "You have already reported this user", "status": "failed"},
+                                   status.HTTP_400_BAD_REQUEST)
+
+
+class ReportedUserSerializer(serializers.Serializer):
+    id = serializers.UUIDField()
+    email = serializers.CharField()
+    full_name = serializers.CharField()
+    is_active = serializers.BooleanField()
+    report_count = serializers.IntegerField()
+
+
+class LogoutSerializer(TokenBlacklistSerializer):
+    token_class = FilteredRefreshToken
+
+
+class RefreshTokenSerializer(TokenRefreshSerializer):
+    token_class = FilteredRefreshToken
@@ -1,8 +1,13 @@
 from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.functions import Greatest
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
 
-from core.models import Profile
+from core.authentication import invalidate_cached_user
+from core.blacklist import record_blacklisted
+from core.models import Profile, UserReport
 
 User = get_user_model()
 
@@ -14,9 +19,45 @@ def handle_profile_creation(sender, instance, created, **kwargs):
 
 
 @receiver(post_delete, sender=Profile)
-def handle_user_account_deletion(sender, instance, **kwargs):
+def handle_user_account_deletion(sender, instance, origin=None, **kwargs):
+    # Profiles deleted as part of their user's cascade must not delete the user a second time
+    if isinstance(origin, User) or getattr(origin, "model", None) is User:
+        return
     try:
         user = getattr(instance, 'user')
         user.delete()
     except User.DoesNotExist:
-        pass
\ No newline at end of file
+        pass
+
+
+@receiver(post_save, sender=UserReport)
+def handle_user_report_creation(sender, instance, created, **kwargs):
+    if created and instance.offender_id is not None:
+        User.objects.filter(id=instance.offender_id).update(report_count=F('report_count') + 1)
+
+
+@receiver(post_delete, sender=UserReport)
+def handle_user_report_deletion(sender, instance, **kwargs):
+    if instance.offender_id is not None:
+        User.objects.filter(id=instance.offender_id).update(report_count=Greatest(F('report_count') - 1, 0))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def handle_user_change(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def handle_profile_change(sender, instance, **kwargs):
+    invalidate_cached_user(instance.user_id)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def handle_token_blacklisted(sender, instance, created, **kwargs):
+    if not created:
+        return
+    record_blacklisted(instance.token.jti)
+    if instance.token.user_id is not None:
+        invalidate_cached_user(instance.token.user_id)
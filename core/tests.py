@@ -1,16 +1,38 @@
+import io
+import json
+import os
 import random
+import tempfile
+import time
 from datetime import timedelta
+from unittest import mock
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import check_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models.signals import post_save
+from django.db import IntegrityError, transaction
+from django.test import override_settings
 from django.urls import reverse_lazy
 from django.utils import timezone
 from faker import Faker
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 
-from core.models import Otp
+from core.authentication import CachedJWTAuthentication, cached_user_key
+from ads.choices import STATUS_ACTIVE
+from ads.models import Ad, Chat, Message
+from common.testing import create_user
+from core.blacklist import BloomFilter, get_blacklist_filter, is_blacklisted, rebuild_blacklist_filter
+from core.choices import DELETION_COMPLETED
+from core.deletion import run_account_deletion
+from core.models import AccountDeletionJob, Otp, Profile, User, UserReport
+from matrimonials.models import Conversation, MatrimonialProfile, Message as MatrimonialMessage
 
 
 class AuthenticationTestCase(APITestCase):
@@ -183,3 +205,344 @@ class AuthenticationTestCase(APITestCase):
         }
         response = self.client.patch(reverse_lazy("list_update_profile"), data=updated_data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class EmailNormalizationTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.User = get_user_model()
+        cls.user = create_user(" Jane.Doe@Example.COM", "Jane Doe", is_verified=True)
+
+    def test_emails_are_stored_lower_cased(self):
+        self.assertEqual(self.user.email, "jane.doe@example.com")
+        self.assertEqual(self.User.objects.get_by_email("JANE.DOE@example.com"), self.user)
+
+    def test_case_variants_cannot_register_twice(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            create_user("jane.doe@EXAMPLE.com", "Jane")
+        # Writes that skip the manager are caught by the functional unique constraint
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.User.objects.create(email="Jane.Doe@example.com", full_name="Jane", phone_number="+123456789")
+
+    def test_auth_flows_ignore_case(self):
+        response = self.client.post(reverse_lazy("login"), {"email": "JANE.DOE@Example.com", "password": "string"},
+                                    format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["data"]["email"], "jane.doe@example.com")
+
+        response = self.client.post(reverse_lazy("request_password_code"), {"email": "Jane.Doe@EXAMPLE.COM"},
+                                    format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(1):
+            self.User.objects.get_by_email("JANE.doe@example.com")
+
+
+class LoginTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # An account created before Argon2 became the preferred hasher
+        with override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.PBKDF2PasswordHasher"]):
+            cls.user = create_user("login@example.com", "Login User", is_verified=True)
+
+    def _login(self):
+        return self.client.post(reverse_lazy("login"), {"email": "login@example.com", "password": "string"},
+                                format="json")
+
+    def test_password_is_verified_once_per_login(self):
+        with mock.patch.object(User, "check_password", autospec=True, side_effect=User.check_password) as check:
+            response = self._login()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(check.call_count, 1)
+
+        access = AccessToken(response.json()["tokens"]["access"])
+        self.assertEqual(access["user_id"], str(self.user.id))
+
+    def test_login_upgrades_the_stored_hash(self):
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+        self.assertEqual(self._login().status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("argon2$"))
+        self.assertEqual(self._login().status_code, status.HTTP_200_OK)
+
+
+class CachedJWTAuthenticationTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("cached@example.com", "Cached User", is_verified=True)
+        cls.user.profile.avatar = "https://example.com/avatar.png"
+        cls.user.profile.save()
+
+    def setUp(self):
+        cache.clear()
+        self.authentication = CachedJWTAuthentication()
+        self.token = AccessToken.for_user(self.user)
+        patcher = mock.patch("core.authentication.cache_is_shared", return_value=True)
+        self.cache_is_shared = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeat_requests_resolve_the_user_from_the_cache(self):
+        with self.assertNumQueries(1):
+            self.authentication.get_user(self.token)
+        with self.assertNumQueries(0):
+            user = self.authentication.get_user(self.token)
+            self.assertEqual((user.pk, user.email, user.profile.avatar),
+                             (self.user.pk, "cached@example.com", "https://example.com/avatar.png"))
+        # The password hash is never cached, it is loaded on demand
+        self.assertIn("password", user.get_deferred_fields())
+        self.assertTrue(user.check_password("string"))
+
+    def test_saves_and_logout_invalidate_the_cached_user(self):
+        self.authentication.get_user(self.token)
+        profile = self.user.profile
+        profile.avatar = "https://example.com/new.png"
+        profile.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authentication.get_user(self.token).profile.avatar, "https://example.com/new.png")
+
+        refresh = RefreshToken.for_user(self.user)
+        self.authentication.get_user(self.token)
+        self.assertIsNotNone(cache.get(cached_user_key(self.user.pk)))
+        response = self.client.post(reverse_lazy("logout"), {"refresh": str(refresh)}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(cache.get(cached_user_key(self.user.pk)))
+
+    def test_deactivated_users_are_rejected(self):
+        self.authentication.get_user(self.token)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(reverse_lazy("retrieve_update_profile"), HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_without_a_shared_cache_users_are_loaded_on_every_request(self):
+        self.cache_is_shared.return_value = False
+        self.authentication.get_user(self.token)
+        # Deactivated by another process, or by an update() that sends no signal
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+        with self.assertNumQueries(1), self.assertRaises(AuthenticationFailed):
+            self.authentication.get_user(self.token)
+
+
+class TokenBlacklistTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("blacklist@example.com", "Blacklist User", is_verified=True)
+
+    def setUp(self):
+        cache.clear()
+        rebuild_blacklist_filter()
+        # As with the Redis cache the site runs on, unless a test says otherwise
+        patcher = mock.patch("core.blacklist.cache_is_shared", return_value=True)
+        self.cache_is_shared = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _refresh(self, token):
+        return self.client.post(reverse_lazy("refresh_token"), {"refresh": str(token)}, format="json")
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        items = [str(i) for i in range(1000)]
+        for item in items:
+            bloom.add(item)
+        self.assertTrue(all(item in bloom for item in items))
+        false_positives = sum(str(i) in bloom for i in range(1000, 11000))
+        self.assertLess(false_positives, 300)
+
+    def test_refresh_skips_the_blacklist_table_for_valid_tokens(self):
+        refresh = RefreshToken.for_user(self.user)
+        with self.assertNumQueries(0):
+            response = self._refresh(refresh)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_blacklisted_tokens_are_rejected_before_and_after_a_rebuild(self):
+        refresh = RefreshToken.for_user(self.user)
+        other = RefreshToken.for_user(self.user)
+        rebuild_blacklist_filter()
+        self.client.post(reverse_lazy("logout"), {"refresh": str(refresh)}, format="json")
+        self.assertEqual(self._refresh(refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # A process whose filter predates the logout finds the token in the shared cache
+        other.blacklist()
+        with mock.patch("core.blacklist._filter", BloomFilter(1024, 0.01)):
+            self.assertEqual(self._refresh(other).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Once the cache entry is gone the rebuilt filter has it
+        cache.clear()
+        rebuild_blacklist_filter()
+        self.assertEqual(self._refresh(other).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_without_a_shared_cache_filter_misses_check_the_table(self):
+        self.cache_is_shared.return_value = False
+        refresh = RefreshToken.for_user(self.user)
+        refresh.blacklist()
+        # Another process: its filter predates the logout and its cache never saw it
+        cache.clear()
+        with mock.patch("core.blacklist._filter", BloomFilter(1024, 0.01)):
+            self.assertEqual(self._refresh(refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_BLACKLIST_FILTER_REBUILD_IN_BACKGROUND=True, TOKEN_BLACKLIST_FILTER_TTL=300)
+    def test_stale_filters_are_rebuilt_in_the_background(self):
+        stale = BloomFilter(1024, 0.01)
+        with mock.patch("core.blacklist._filter", stale), mock.patch("core.blacklist._rebuilding", False), \
+                mock.patch("core.blacklist.threading.Thread") as thread:
+            with mock.patch("core.blacklist._filter_built_at", time.monotonic() - 400):
+                with self.assertNumQueries(0):
+                    self.assertIs(get_blacklist_filter(), stale)
+                    self.assertIs(get_blacklist_filter(), stale)
+            self.assertEqual(thread.call_count, 1)
+
+            # Too old to trust: the table is checked until the rebuild lands
+            refresh = RefreshToken.for_user(self.user)
+            with mock.patch("core.blacklist._filter_built_at", time.monotonic() - 700):
+                self.assertIsNone(get_blacklist_filter())
+                with self.assertNumQueries(1):
+                    self.assertFalse(is_blacklisted(refresh["jti"]))
+
+    def test_sweeper_deletes_only_expired_tokens(self):
+        live = RefreshToken.for_user(self.user)
+        expired = [RefreshToken.for_user(self.user) for _ in range(3)]
+        for token in expired:
+            token.blacklist()
+        OutstandingToken.objects.filter(jti__in=[token["jti"] for token in expired]).update(
+                expires_at=timezone.now() - timedelta(days=1))
+
+        call_command("sweep_tokens", chunk_size=2, stdout=mock.MagicMock())
+
+        self.assertEqual(list(OutstandingToken.objects.values_list("jti", flat=True)), [live["jti"]])
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class ImportUsersTestCase(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = f"{self.directory.name}/users.jsonl"
+        rows = [
+            {"email": "First@Example.com", "full_name": "First", "password": "secret", "is_verified": True},
+            {"email": "not-an-email", "full_name": "Invalid"},
+            {"email": "second@example.com", "full_name": "Second", "phone_number": "+123456789"},
+            {"email": "FIRST@example.com", "full_name": "Duplicate"},
+            {"email": "third@example.com", "full_name": "Third", "password": "secret", "country": "BD"},
+            {"email": "fourth@example.com", "full_name": "Fourth", "phone_number": "0123456789"},
+            {"email": "fifth@example.com", "full_name": "Fifth", "country": "Atlantis"},
+        ]
+        with open(self.path, "w") as file:
+            file.writelines(json.dumps(row) + "\n" for row in rows)
+
+    def _import(self):
+        stderr = io.StringIO()
+        call_command("import_users", self.path, chunk_size=2, workers=1, stdout=mock.MagicMock(), stderr=stderr)
+        return stderr.getvalue()
+
+    def test_users_and_profiles_are_bulk_inserted_without_signals(self):
+        receiver = mock.MagicMock()
+        post_save.connect(receiver, sender=User)
+        self.addCleanup(post_save.disconnect, receiver, sender=User)
+
+        self._import()
+
+        receiver.assert_not_called()
+        self.assertEqual(sorted(User.objects.values_list("email", flat=True)),
+                         ["first@example.com", "second@example.com", "third@example.com"])
+        self.assertEqual(Profile.objects.count(), 3)
+        first = User.objects.get_by_email("first@example.com")
+        self.assertEqual((first.full_name, first.is_verified), ("First", True))
+        self.assertTrue(first.check_password("secret"))
+        self.assertFalse(User.objects.get_by_email("second@example.com").has_usable_password())
+
+    def test_rows_with_invalid_values_are_reported_and_skipped(self):
+        errors = self._import().splitlines()
+
+        self.assertFalse(User.objects.filter(email__in=["fourth@example.com", "fifth@example.com"]).exists())
+        self.assertEqual(User.objects.get_by_email("third@example.com").country, "BD")
+        self.assertEqual(len(errors), 3)
+        self.assertTrue(errors[0].startswith("Row 2: invalid email"))
+        self.assertIn("Row 6: phone_number: Phone number must start with a plus sign (+)", errors[1])
+        self.assertIn("Row 7: country: Atlantis is not a known country", errors[2])
+
+    def test_import_resumes_from_the_checkpoint(self):
+        with open(f"{self.path}.checkpoint", "w") as checkpoint:
+            json.dump({"rows": 2}, checkpoint)
+
+        self._import()
+
+        # The first two rows were imported before; the duplicate further down now creates that email
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(User.objects.get_by_email("first@example.com").full_name, "Duplicate")
+        self.assertFalse(os.path.exists(f"{self.path}.checkpoint"))
+
+        # Rerunning a finished import creates nothing new
+        self._import()
+        self.assertEqual(User.objects.count(), 3)
+
+
+@override_settings(ACCOUNT_DELETION_CHUNK_SIZE=2)
+class AccountDeletionTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("leaving@example.com", "Leaving User", is_verified=True)
+        cls.other = create_user("staying@example.com", "Staying User", is_verified=True)
+
+        ad = Ad.objects.create(ad_creator=cls.user, name="Bike", description="A bike", is_approved=True,
+                               status=STATUS_ACTIVE)
+        other_ad = Ad.objects.create(ad_creator=cls.other, name="Car", description="A car", is_approved=True,
+                                     status=STATUS_ACTIVE)
+        for chat_ad, initiator, receiver in ((ad, cls.other, cls.user), (other_ad, cls.user, cls.other)):
+            chat = Chat.objects.create(ad=chat_ad, initiator=initiator, receiver=receiver)
+            Message.objects.bulk_create([Message(chat=chat, sender=initiator, text=str(i)) for i in range(5)])
+
+        profiles = [MatrimonialProfile.objects.create(user=user, age=30, gender="Male", country="BD", city="Dhaka")
+                    for user in (cls.user, cls.other)]
+        conversation = Conversation.objects.create(initiator=profiles[0], receiver=profiles[1])
+        MatrimonialMessage.objects.create(conversation=conversation, sender=profiles[1], text="Hi")
+
+    def test_account_is_deactivated_and_deleted_in_the_background(self):
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.delete(reverse_lazy("delete_account"))
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(len(callbacks), 1)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        # The user's ads leave the feed before the background deletion gets to them
+        feed = Ad.objects.filter(is_approved=True, status=STATUS_ACTIVE)
+        self.assertEqual(list(feed.values_list("name", flat=True)), ["Car"])
+
+        run_account_deletion(response.data["data"]["id"])
+
+        job = AccountDeletionJob.objects.get()
+        self.assertEqual((job.status, job.user, job.email), (DELETION_COMPLETED, None, "leaving@example.com"))
+        self.assertFalse(User.objects.filter(email="leaving@example.com").exists())
+        self.assertEqual(list(Ad.objects.values_list("name", flat=True)), ["Car"])
+        self.assertFalse(Chat.objects.exists())
+        self.assertFalse(Conversation.objects.exists())
+        self.assertEqual(MatrimonialProfile.objects.get().user, self.other)
+        self.assertTrue(Profile.objects.filter(user=self.other).exists())
+        # 1 user, 1 profile, 1 ad, 2 chats, 10 messages, 1 matrimonial profile, 1 conversation, 1 message
+        self.assertEqual(job.deleted_rows, 18)
+
+    def test_deleting_a_user_deletes_it_once(self):
+        with mock.patch.object(User, "delete", autospec=True, side_effect=User.delete) as delete:
+            self.other.delete()
+        delete.assert_called_once()
+
+
+class ReportUserTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reporter = create_user("reporter@example.com", "Reporter")
+        cls.offender = create_user("offender@example.com", "Offender")
+
+    def test_a_user_reporting_another_again_is_not_counted(self):
+        self.client.force_authenticate(user=self.reporter)
+        url = reverse_lazy("report_user")
+        response = self.client.post(url, {"offender_id": self.offender.id, "text": "Spam"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for _ in range(3):
+            response = self.client.post(url, {"offender_id": self.offender.id, "text": "Spam"})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.offender.refresh_from_db()
+        self.assertEqual(self.offender.report_count, 1)
+        self.assertEqual(UserReport.objects.filter(offender=self.offender).count(), 1)
@@ -10,6 +10,7 @@ urlpatterns = [
     path('feedback/', views.CreateFeedbackView.as_view(), name="create_feedback"),
     path('login/', views.LoginView.as_view(), name="login"),
     path('logout/', views.LogoutView.as_view(), name="logout"),
+    path('moderation/users/', views.ReportedUsersQueueView.as_view(), name="users_moderation_queue"),
     path('register/', views.RegisterView.as_view(), name="register"),
     path('password/change/user/', views.AuthChangePasswordView.as_view(), name="auth_change_password"),
     path('password/code/verify/user/', views.AuthVerifyPasswordOtpView.as_view(), name="auth_verify_password_code"),
@@ -1,21 +1,25 @@
 from django.contrib.auth import authenticate
+from django.contrib.auth.models import update_last_login
 from django.db import transaction
-from drf_spectacular.utils import OpenApiResponse, extend_schema
+from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema
 from rest_framework import status
 from rest_framework.generics import GenericAPIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
 from rest_framework_simplejwt.exceptions import TokenError
-from rest_framework_simplejwt.serializers import TokenBlacklistSerializer, TokenObtainPairSerializer, \
-    TokenRefreshSerializer
-from rest_framework_simplejwt.views import TokenBlacklistView, TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenBlacklistView, TokenRefreshView
 
+from common.pagination import keyset_paginate
+from core.deletion import schedule_account_deletion
 from core.emails import Util
 from core.models import Profile, User
-from core.serializers import ChangePasswordSerializer, FeedbackSerializer, LoginSerializer, ProfileSerializer, \
+from core.serializers import ChangePasswordSerializer, FeedbackSerializer, LoginSerializer, LogoutSerializer, \
+    ProfileSerializer, RefreshTokenSerializer, \
     RegisterSerializer, \
-    ReportUserSerializer, RequestNewPasswordCodeSerializer, ResendEmailVerificationSerializer, UpdateProfileSerializer, \
+    ReportedUserSerializer, ReportUserSerializer, RequestNewPasswordCodeSerializer, ResendEmailVerificationSerializer, UpdateProfileSerializer, \
     VerifyEmailSerializer, \
     VerifyPasswordOTPSerializer
 from core.utils import decrypt_token_to_profile, encrypt_profile_to_token
@@ -51,11 +55,11 @@ class VerifyPasswordOtpView(GenericAPIView):
             email = self.request.data.get("email")
             code = self.request.data.get("code")
             try:
-                user = User.objects.get(email=email)
+                user = User.objects.get_by_email(email)
             except User.DoesNotExist:
                 return Response({"message": "Account not found", "status": "failed"}, status=status.HTTP_404_NOT_FOUND)
 
-            otp = user.otp.first()
+            otp = user.otp.order_by('-created').first()
             if otp is None or otp.code is None:
                 return Response({"message": "No OTP found for this account", "status": "failed"},
                                 status=status.HTTP_400_BAD_REQUEST)
@@ -115,8 +119,10 @@ class ChangePasswordView(GenericAPIView):
                             status=status.HTTP_200_OK)
 
 
-class LoginView(TokenObtainPairView):
-    serializer_class = TokenObtainPairSerializer
+class LoginView(GenericAPIView):
+    # Like TokenObtainPairView: a stale bearer token must not block logging in
+    authentication_classes = ()
+    serializer_class = LoginSerializer
     throttle_classes = [UserRateThrottle]
 
     @extend_schema(
@@ -137,10 +143,11 @@ class LoginView(TokenObtainPairView):
 
     )
     def post(self, request):
-        serializer = LoginSerializer(data=request.data)
+        serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
         email = serializer.validated_data["email"]
         password = serializer.validated_data["password"]
+        # The only password check of the request; it also upgrades the stored hash to the preferred hasher
         user = authenticate(request, email=email, password=password)
         if not user:
             return Response({"message": "Invalid credentials", "status": "failed"}, status=status.HTTP_400_BAD_REQUEST)
@@ -148,9 +155,12 @@ class LoginView(TokenObtainPairView):
             return Response({"message": "Account is not active, contact the admin", "status": "failed"},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        tokens = super().post(request)
+        refresh = RefreshToken.for_user(user)
+        if jwt_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, user)
+        tokens = {"refresh": str(refresh), "access": str(refresh.access_token)}
 
-        return Response({"message": "Logged in successfully", "tokens": tokens.data,
+        return Response({"message": "Logged in successfully", "tokens": tokens,
                          "data": {
                              "full_name": user.full_name,
                              "email": user.email,
@@ -163,7 +173,7 @@ class LoginView(TokenObtainPairView):
 
 
 class LogoutView(TokenBlacklistView):
-    serializer_class = TokenBlacklistSerializer
+    serializer_class = LogoutSerializer
 
     @extend_schema(
             summary="Logout",
@@ -249,7 +259,7 @@ class RetrieveUpdateProfileView(GenericAPIView):
 
 
 class RefreshView(TokenRefreshView):
-    serializer_class = TokenRefreshSerializer
+    serializer_class = RefreshTokenSerializer
 
     @extend_schema(
             summary="Refresh token",
@@ -270,7 +280,11 @@ class RefreshView(TokenRefreshView):
     )
     def post(self, request):
         serializer = self.serializer_class(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError:
+            return Response({"message": "Token is invalid, expired or blacklisted.", "status": "failed"},
+                            status=status.HTTP_401_UNAUTHORIZED)
         access_token = serializer.validated_data['access']
         return Response({"message": "Refreshed successfully", "token": access_token, "status": "success"},
                         status=status.HTTP_200_OK)
@@ -335,7 +349,7 @@ class RequestNewPasswordCodeView(GenericAPIView):
         serializer.is_valid(raise_exception=True)
         email = self.request.data.get('email')
         try:
-            user = User.objects.get(email=email)
+            user = User.objects.get_by_email(email)
         except User.DoesNotExist:
             return Response({"message": "Account not found", "status": "failed"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -367,7 +381,7 @@ class ResendEmailVerificationCodeView(GenericAPIView):
         serializer.is_valid(raise_exception=True)
         email = request.data.get('email')
         try:
-            user = User.objects.get(email=email)
+            user = User.objects.get_by_email(email)
         except User.DoesNotExist:
             return Response({"message": "Account not found", "status": "failed"}, status=status.HTTP_404_NOT_FOUND)
         if user.is_verified:
@@ -406,11 +420,11 @@ class VerifyEmailView(GenericAPIView):
         email = request.data.get("email")
         code = request.data.get("code")
         try:
-            user = User.objects.get(email=email)
+            user = User.objects.get_by_email(email)
         except User.DoesNotExist:
             return Response({"message": "Account not found", "status": "failed"}, status=status.HTTP_404_NOT_FOUND)
 
-        otp = user.otp.first()
+        otp = user.otp.order_by('-created').first()
         if user.is_verified:
             if otp is not None:
                 otp.delete()
@@ -487,6 +501,39 @@ class ReportUserView(GenericAPIView):
         return Response({"message": "Ad reported successfully", "status": "success"}, status=status.HTTP_200_OK)
 
 
+class ReportedUsersQueueView(GenericAPIView):
+    permission_classes = [IsAdminUser]
+    serializer_class = ReportedUserSerializer
+    page_size = 50
+
+    @extend_schema(
+            summary="User moderation queue",
+            description=
+            """
+            This endpoint allows staff to page through reported users, most reported first.
+            Pass the returned `next` cursor as `?cursor=` to fetch the following page.
+            """,
+            parameters=[
+                OpenApiParameter(name="cursor", description="cursor of the page to fetch (optional)",
+                                 required=False),
+            ],
+            responses={
+                status.HTTP_200_OK: OpenApiResponse(
+                        description="Reported users fetched successfully",
+                        response=ReportedUserSerializer(many=True)
+                ),
+            }
+    )
+    def get(self, request):
+        reported_users = User.objects.filter(report_count__gt=0).only(
+                'id', 'email', 'full_name', 'is_active', 'report_count'
+        )
+        users, next_cursor = keyset_paginate(reported_users, request.query_params.get('cursor'), self.page_size)
+        serializer = self.serializer_class(users, many=True)
+        return Response({"message": "Reported users fetched successfully", "data": serializer.data,
+                         "next": next_cursor, "status": "success"}, status=status.HTTP_200_OK)
+
+
 class DeleteUserAccount(GenericAPIView):
     permission_classes = [IsAuthenticated]
     throttle_classes = [UserRateThrottle]
@@ -496,18 +543,19 @@ class DeleteUserAccount(GenericAPIView):
             description=
             """
             This endpoint allows an authenticated user to delete their account.
+            The account is deactivated immediately and its data is deleted in the background.
             """,
             responses={
-                status.HTTP_204_NO_CONTENT: OpenApiResponse(
-                        description="Account deleted successfully.",
+                status.HTTP_202_ACCEPTED: OpenApiResponse(
+                        description="Account deactivated and scheduled for deletion.",
                 ),
             }
     )
     def delete(self, request):
         user = self.request.user
-        user.delete()
-        return Response({"message": "Account deleted successfully", "status": "success"},
-                        status=status.HTTP_204_NO_CONTENT)
+        job = schedule_account_deletion(user)
+        return Response({"message": "Account scheduled for deletion", "data": {"id": job.id, "status": job.status},
+                         "status": "success"}, status=status.HTTP_202_ACCEPTED)
 
 
 class AuthVerifyPasswordOtpView(GenericAPIView):
@@ -538,11 +586,11 @@ class AuthVerifyPasswordOtpView(GenericAPIView):
         code = serializer.validated_data['code']
 
         try:
-            user = User.objects.get(email=email)
+            user = User.objects.get_by_email(email)
         except User.DoesNotExist:
             return Response({"message": "Account not found", "status": "failed"}, status=status.HTTP_404_NOT_FOUND)
 
-        otp = user.otp.first()
+        otp = user.otp.order_by('-created').first()
         if otp is None or otp.code is None:
             return Response({"message": "No OTP found for this account", "status": "failed"},
                             status=status.HTTP_400_BAD_REQUEST)
@@ -585,10 +633,10 @@ class AuthChangePasswordView(GenericAPIView):
         email = request.user.email
         password = serializer.validated_data['password']
         try:
-            user = User.objects.get(email=email)
+            user = User.objects.get_by_email(email)
         except User.DoesNotExist:
             return Response({"message": "Account not found", "status": "failed"}, status=status.HTTP_404_NOT_FOUND)
-        otp = user.otp.first()
+        otp = user.otp.order_by('-created').first()
         if otp is None or otp.code is None:
             return Response({"message": "No OTP found for this account", "status": "failed"},
                             status=status.HTTP_400_BAD_REQUEST)
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.admin import TabularInline
 
+from common.admin import PerformantAdminMixin
 from matrimonials.models import MatrimonialProfile, MatrimonialProfileImage
 
 
@@ -13,10 +14,11 @@ class MatrimonialProfileImageAdmin(TabularInline):
 
 
 @admin.register(MatrimonialProfile)
-class MatrimonialProfileAdmin(admin.ModelAdmin):
+class MatrimonialProfileAdmin(PerformantAdminMixin, admin.ModelAdmin):
     inlines = (MatrimonialProfileImageAdmin,)
     list_display = ('full_name', 'gender', 'country', 'city', 'religion', 'income',)
+    list_select_related = ('user',)
     list_filter = ('gender', 'country', 'city', 'religion', 'profession',)
     list_per_page = 20
     ordering = ('gender', 'religion',)
-    search_fields = ('full_name', 'country',)
+    search_fields = ('user__full_name', 'country',)
@@ -0,0 +1,90 @@
+# Generated by Django 4.1.7 on 2026-10-19 13:35
+
+import common.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("matrimonials", "0011_matrimonialprofileimage_phash"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="bookmarkedprofile",
+            name="id",
+            field=models.UUIDField(
+                default=common.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="connectionrequest",
+            name="id",
+            field=models.UUIDField(
+                default=common.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="conversation",
+            name="id",
+            field=models.UUIDField(
+                default=common.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="favouriteprofile",
+            name="id",
+            field=models.UUIDField(
+                default=common.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="matrimonialprofile",
+            name="id",
+            field=models.UUIDField(
+                default=common.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="matrimonialprofileimage",
+            name="id",
+            field=models.UUIDField(
+                default=common.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="message",
+            name="id",
+            field=models.UUIDField(
+                default=common.models.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+                unique=True,
+            ),
+        ),
+    ]
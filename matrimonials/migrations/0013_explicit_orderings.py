@@ -0,0 +1,51 @@
+# Generated by Django 4.1.7 on 2026-10-19 13:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("matrimonials", "0012_uuid7_primary_keys"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="bookmarkedprofile",
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name="connectionrequest",
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name="conversation",
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name="favouriteprofile",
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name="message",
+            options={},
+        ),
+        migrations.AddIndex(
+            model_name="connectionrequest",
+            index=models.Index(
+                fields=["sender", "-created"], name="matrimonial_sender__71e05a_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="connectionrequest",
+            index=models.Index(
+                fields=["receiver", "-created"], name="matrimonial_receive_b55d77_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["conversation", "-created"],
+                name="matrimonial_convers_b06fa9_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.1.7 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+def backfill_participant_pairs(apps, schema_editor):
+    """
+    Store the canonical participant pair of every conversation, then merge
+    conversations between the same two profiles into the oldest one so the
+    unique constraint holds.
+    """
+    Conversation = apps.get_model("matrimonials", "Conversation")
+    Message = apps.get_model("matrimonials", "Message")
+
+    rooms = {}
+    pending = []
+    conversations = Conversation.objects.order_by("created").only("id", "initiator_id", "receiver_id")
+    for conversation in conversations.iterator():
+        conversation.participant_low, conversation.participant_high = sorted(
+                (conversation.initiator_id, conversation.receiver_id)
+        )
+        key = (conversation.participant_low, conversation.participant_high)
+        keeper = rooms.setdefault(key, conversation.id)
+        if keeper != conversation.id:
+            Message.objects.filter(conversation_id=conversation.id).update(conversation_id=keeper)
+            conversation.delete()
+            continue
+        pending.append(conversation)
+        if len(pending) == 500:
+            Conversation.objects.bulk_update(pending, ["participant_low", "participant_high"])
+            pending = []
+    Conversation.objects.bulk_update(pending, ["participant_low", "participant_high"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("matrimonials", "0013_explicit_orderings"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="conversation",
+            name="participant_low",
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="participant_high",
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_participant_pairs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="conversation",
+            name="participant_low",
+            field=models.UUIDField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name="conversation",
+            name="participant_high",
+            field=models.UUIDField(editable=False),
+        ),
+        migrations.AddConstraint(
+            model_name="conversation",
+            constraint=models.UniqueConstraint(
+                fields=("participant_low", "participant_high"),
+                name="unique_conversation_participants",
+            ),
+        ),
+    ]
@@ -1,7 +1,7 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
-from common.models import BaseModel
+from common.models import BaseModel, ParticipantPairModel
 from core.choices import GENDER_CHOICES
 from matrimonials.choices import CONNECTION_CHOICES, CONNECTION_PENDING, EDUCATION_CHOICES, RELIGION_CHOICES
 
@@ -42,6 +42,11 @@ class MatrimonialProfileImage(BaseModel):
     matrimonial_profile = models.ForeignKey(MatrimonialProfile, on_delete=models.CASCADE, related_name="images",
                                             null=True)
     image = models.CharField(max_length=255, null=True)
+    phash = models.BigIntegerField(null=True, blank=True, db_index=True, help_text="Perceptual (difference) hash")
+
+    class Meta:
+        # A profile has at most a handful of images and clients rely on their order
+        ordering = ("-created",)
 
     def __str__(self):
         return str(self.matrimonial_profile.full_name)
@@ -62,14 +67,26 @@ class ConnectionRequest(BaseModel):
                                  related_name="connection_requests_receiver")
     status = models.CharField(max_length=20, choices=CONNECTION_CHOICES, default=CONNECTION_PENDING)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['sender', '-created']),
+            models.Index(fields=['receiver', '-created']),
+        ]
+
     def __str__(self):
         return f"{self.sender} --- {self.receiver} --- {self.status}"
 
 
-class Conversation(BaseModel):
+class Conversation(ParticipantPairModel):
     initiator = models.ForeignKey(MatrimonialProfile, on_delete=models.CASCADE, related_name="conversations_initiator")
     receiver = models.ForeignKey(MatrimonialProfile, on_delete=models.CASCADE, related_name="conversations_receiver")
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['participant_low', 'participant_high'],
+                                    name="unique_conversation_participants"),
+        ]
+
 
 class Message(BaseModel):
     sender = models.ForeignKey(MatrimonialProfile, on_delete=models.CASCADE, related_name="message_sender")
@@ -77,6 +94,11 @@ class Message(BaseModel):
     attachment = models.FileField(blank=True)
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name="messages")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['conversation', '-created']),
+        ]
+
 
 class FavouriteProfile(BaseModel):
     user = models.ForeignKey(MatrimonialProfile, on_delete=models.CASCADE, null=True, related_name="favourite_profiles")
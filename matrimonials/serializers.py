@@ -1,11 +1,19 @@
-from django.db.models import Q
+from django.db.models import Prefetch
 from rest_framework import serializers
 
+from common.compiled import CompiledListSerializer, ManyValues
 from common.exceptions import CustomValidation
+from common.fieldsets import Projection, SparseFieldsetMixin
+from common.identity import IdentityMapMixin
+from common.images import hash_images_on_commit
 from core.choices import GENDER_CHOICES
 from matrimonials.choices import CONNECTION_CHOICES, EDUCATION_CHOICES, RELIGION_CHOICES
 from matrimonials.models import ConnectionRequest, Conversation, MatrimonialProfile, MatrimonialProfileImage, Message
 
+PROFILE_IMAGES_PREFETCH = Prefetch(
+    "images", queryset=MatrimonialProfileImage.objects.only("id", "matrimonial_profile_id", "image")
+)
+
 
 class CreateMatrimonialProfileSerializer(serializers.Serializer):
     images = serializers.ListField(child=serializers.CharField(), max_length=6)
@@ -35,6 +43,7 @@ class CreateMatrimonialProfileSerializer(serializers.Serializer):
             for image in images
         ]
         MatrimonialProfileImage.objects.bulk_create(matrimonial_images)
+        hash_images_on_commit(MatrimonialProfileImage, [image.id for image in matrimonial_images])
 
         return profile
 
@@ -52,11 +61,32 @@ class CreateMatrimonialProfileSerializer(serializers.Serializer):
                 for image in images
             ]
             MatrimonialProfileImage.objects.bulk_create(matrimonial_images)
+            hash_images_on_commit(MatrimonialProfileImage, [image.id for image in matrimonial_images])
 
         return instance
 
 
-class MatrimonialProfileSerializer(serializers.Serializer):
+class MatrimonialProfileSerializer(SparseFieldsetMixin, serializers.Serializer):
+    projections = {
+        "id": Projection(),
+        "full_name": Projection("user__full_name", select_related=("user",)),
+        "images": Projection(prefetch=(PROFILE_IMAGES_PREFETCH,)),
+        "short_bio": Projection("short_bio"),
+        "religion": Projection("religion"),
+        "gender": Projection("gender"),
+        "height": Projection("height"),
+        "education": Projection("education"),
+        "profession": Projection("profession"),
+        "country": Projection("country"),
+        "city": Projection("city"),
+        "age": Projection("age"),
+        "income": Projection("income"),
+    }
+    compiled_values = {"images": ManyValues(MatrimonialProfileImage, "matrimonial_profile_id", "image")}
+
+    class Meta:
+        list_serializer_class = CompiledListSerializer
+
     id = serializers.UUIDField(read_only=True)
     full_name = serializers.CharField(source="user.full_name", read_only=True)
     images = serializers.SerializerMethodField()
@@ -76,13 +106,18 @@ class MatrimonialProfileSerializer(serializers.Serializer):
         return [image.image for image in obj.images.all()]
 
 
-class ConnectionRequestSerializer(serializers.Serializer):
+class ConnectionRequestSerializer(IdentityMapMixin, serializers.Serializer):
     id = serializers.UUIDField(read_only=True)
     sender = serializers.UUIDField(read_only=True)
     receiver = serializers.UUIDField()
     status = serializers.ChoiceField(choices=CONNECTION_CHOICES, read_only=True)
     created = serializers.DateTimeField(read_only=True)
 
+    def prime(self, connection_requests):
+        # Sender and receiver are rendered with their user's name
+        profiles = self.identity_map.attach(connection_requests, "sender", "receiver")
+        self.identity_map.attach(profiles, "user")
+
     def create(self, validated_data):
         user = self.context['request'].user
         try:
@@ -120,8 +155,11 @@ class ConnectionRequestSerializer(serializers.Serializer):
 
         if instance.status == 'Accepted':
             # Create a new Conversation instance and add it to ConversationListSerializer
-            conversation = Conversation.objects.create(initiator=instance.sender, receiver=instance.receiver)
-            conversation_serializer = ConversationListSerializer(conversation)
+            conversation, _ = Conversation.objects.get_or_create(
+                **Conversation.participant_pair(instance.sender, instance.receiver),
+                defaults={"initiator": instance.sender, "receiver": instance.receiver}
+            )
+            conversation_serializer = ConversationListSerializer(conversation, context=self.context)
 
             instance.delete()
             return conversation_serializer.data
@@ -133,6 +171,11 @@ class MatrimonialProfileImageSerializer(serializers.Serializer):
 
 
 class MessageSerializer(serializers.Serializer):
+    compiled_values = {"sender_id": "sender_id"}
+
+    class Meta:
+        list_serializer_class = CompiledListSerializer
+
     id = serializers.UUIDField(read_only=True)
     sender_id = serializers.SerializerMethodField()
     text = serializers.CharField(required=False)
@@ -141,7 +184,7 @@ class MessageSerializer(serializers.Serializer):
 
     @staticmethod
     def get_sender_id(obj: Message):
-        return obj.sender.id
+        return obj.sender_id
 
     def validate(self, attrs):
         user = self.context["request"].user
@@ -168,25 +211,31 @@ def validate_profiles(attrs):
     return attrs
 
 
-class ConversationListSerializer(serializers.Serializer):
+class ConversationListSerializer(IdentityMapMixin, serializers.Serializer):
     id = serializers.UUIDField()
     receiving_user = serializers.SerializerMethodField()
     avatar = serializers.SerializerMethodField()
     last_message = serializers.SerializerMethodField()
 
+    def prime(self, conversations):
+        profiles = self.identity_map.attach(conversations, "initiator", "receiver")
+        self.identity_map.attach(profiles, "user")
+
+    def is_initiator(self, obj: Conversation):
+        profile = self.identity_map.get(MatrimonialProfile, self.context["request"].user.id, field="user_id")
+        return profile is not None and profile.id == obj.initiator_id
+
     def get_avatar(self, obj: Conversation):
-        current_user = self.context["request"].user
-        if current_user == obj.initiator:
+        if self.is_initiator(obj):
             image = obj.receiver.images.first()
             return MatrimonialProfileImageSerializer(image).data or None
         return MatrimonialProfileImageSerializer(obj.initiator.images.first()).data or None
 
     def get_receiving_user(self, obj: Conversation):
-        current_user = self.context["request"].user
-        if current_user == obj.initiator:
-            return {"full_name": obj.receiver.user.full_name, "id": obj.receiver.id}
+        if self.is_initiator(obj):
+            return {"full_name": obj.receiver.user.full_name, "id": obj.receiver_id}
         else:
-            return {"full_name": obj.initiator.user.full_name, "id": obj.initiator.id}
+            return {"full_name": obj.initiator.user.full_name, "id": obj.initiator_id}
 
     @staticmethod
     def get_last_message(obj: Conversation):
@@ -223,23 +272,15 @@ class ConversationCreateSerializer(serializers.Serializer):
         if receiver == initiator:
             raise CustomValidation({"message": "Initiator cannot chat with him/herself", "status": "failed"})
 
-        # Check if a conversation already exists between the initiator and receiver
-        existing_conversation = Conversation.objects.filter(
-            (Q(initiator=initiator) & Q(receiver=receiver)) |
-            (Q(initiator=receiver) & Q(receiver=initiator))
-        ).first()
-
-        if existing_conversation:
-            # Create and add a message to the existing chat
-            if text or attachment:
-                Message.objects.create(sender=initiator, conversation=existing_conversation, text=text,
-                                       attachment=attachment)
-            return existing_conversation
-        else:
-            conversation = Conversation.objects.create(initiator=initiator, receiver=receiver)
-            if text or attachment:
-                Message.objects.create(sender=initiator, conversation=conversation, text=text, attachment=attachment)
-            return conversation
+        # One conversation per pair of profiles, whoever writes first; the unique
+        # constraint makes concurrent first messages land in the same conversation
+        conversation, _ = Conversation.objects.get_or_create(
+            **Conversation.participant_pair(initiator, receiver),
+            defaults={"initiator": initiator, "receiver": receiver}
+        )
+        if text or attachment:
+            Message.objects.create(sender=initiator, conversation=conversation, text=text, attachment=attachment)
+        return conversation
 
 
 class ConversationSerializer(serializers.Serializer):
@@ -1,3 +1,79 @@
-from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse_lazy
+from rest_framework import status
+
+from common.testing import AuthenticatedAPITestCase, create_user
+from matrimonials.models import ConnectionRequest, Conversation, MatrimonialProfile, MatrimonialProfileImage, Message
+
 
 # Create your tests here.
+
+
+class SparseFieldsetTestCase(AuthenticatedAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("viewer@example.com", "Viewer")
+        other = create_user("match@example.com", "Match")
+        cls.profile = MatrimonialProfile.objects.create(user=other, short_bio="Bio", age=30, gender="Male",
+                                                        country="BD", city="Dhaka")
+        MatrimonialProfileImage.objects.create(matrimonial_profile=cls.profile, image="https://example.com/p.png")
+
+    def test_profiles_select_only_the_requested_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse_lazy("retrieve_all_matrimonial_profile"), {"fields": "full_name,age"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["data"], [{"id": str(self.profile.id), "full_name": "Match", "age": 30}])
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertNotIn('"short_bio"', queries.captured_queries[0]["sql"])
+
+        response = self.client.get(reverse_lazy("retrieve_user_matrimonial_profile",
+                                                kwargs={"matrimonial_profile_id": self.profile.id}),
+                                   {"fields": "images"})
+        self.assertEqual(response.json()["data"], {"id": str(self.profile.id), "images": ["https://example.com/p.png"]})
+
+
+class IdentityMapTestCase(AuthenticatedAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, *others = [
+            create_user(f"identity-{i}@example.com", f"Identity User {i}")
+            for i in range(4)
+        ]
+        cls.profiles = [MatrimonialProfile.objects.create(user=user, age=30, gender="Male", country="Bangladesh",
+                                                          city="Dhaka")
+                        for user in (cls.user, *others)]
+
+    def test_connection_request_queries_do_not_grow_with_requests(self):
+        def list_requests():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse_lazy("connection-request-list"))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return response.data, len(queries.captured_queries)
+
+        viewer_profile, *other_profiles = self.profiles
+        ConnectionRequest.objects.create(sender=viewer_profile, receiver=other_profiles[0])
+        ConnectionRequest.objects.create(sender=other_profiles[1], receiver=viewer_profile)
+        _, few = list_requests()
+
+        ConnectionRequest.objects.create(sender=viewer_profile, receiver=other_profiles[2])
+        ConnectionRequest.objects.create(sender=other_profiles[2], receiver=viewer_profile)
+        data, more = list_requests()
+        self.assertEqual(few, more)
+        self.assertEqual([request["receiver"] for request in data["sent_requests"]],
+                         ["Identity User 3", "Identity User 1"])
+        self.assertEqual([request["sender"] for request in data["received_requests"]],
+                         ["Identity User 3", "Identity User 2"])
+
+    def test_conversation_list_shows_the_other_participant(self):
+        viewer_profile, *other_profiles = self.profiles
+        for i, other in enumerate(other_profiles):
+            initiator, receiver = (viewer_profile, other) if i % 2 else (other, viewer_profile)
+            conversation = Conversation.objects.create(initiator=initiator, receiver=receiver)
+            Message.objects.create(conversation=conversation, sender=initiator, text=f"Hello {i}")
+
+        response = self.client.get(reverse_lazy("conversations_list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([conversation["receiving_user"] for conversation in response.data["data"]],
+                         [{"full_name": profile.user.full_name, "id": profile.id}
+                          for profile in reversed(other_profiles)])
@@ -2,7 +2,7 @@ from collections import defaultdict
 from operator import attrgetter
 
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Prefetch, Q
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema
 from rest_framework import status
@@ -11,24 +11,47 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.throttling import UserRateThrottle
 
+from common.fieldsets import Projection, project, render_rows, requested_fields
+from common.identity import identity_map
 from matrimonials.filters import MatrimonialFilter
 from matrimonials.models import BookmarkedProfile, ConnectionRequest, Conversation, FavouriteProfile, \
-    MatrimonialProfile
+    MatrimonialProfile, Message
 from matrimonials.serializers import ConnectionRequestSerializer, ConversationListSerializer, \
     ConversationSerializer, CreateMatrimonialProfileSerializer, MatrimonialProfileSerializer, \
-    ConversationCreateSerializer
+    ConversationCreateSerializer, PROFILE_IMAGES_PREFETCH
 
 
 class RetrieveAllMatrimonialProfilesView(GenericAPIView):
     permission_classes = [IsAuthenticated]
     throttle_classes = [UserRateThrottle]
+    projections = {
+        "id": Projection(value=attrgetter("id")),
+        "full_name": Projection("user__full_name", select_related=("user",), value=attrgetter("full_name")),
+        "short_bio": Projection("short_bio", value=attrgetter("short_bio")),
+        "gender": Projection("gender", value=attrgetter("gender")),
+        "religion": Projection("religion", value=attrgetter("religion")),
+        "country": Projection("country", value=attrgetter("country")),
+        "city": Projection("city", value=attrgetter("city")),
+        "education": Projection("education", value=attrgetter("education")),
+        "profession": Projection("profession", value=attrgetter("profession")),
+        "income": Projection("income", value=attrgetter("income")),
+        "age": Projection("age", value=attrgetter("age")),
+        "height": Projection("height", value=attrgetter("height")),
+        "images": Projection(prefetch=(PROFILE_IMAGES_PREFETCH,),
+                             value=lambda profile: [image.image for image in profile.images.all()]),
+    }
 
     @extend_schema(
         summary="Get all matrimonial profiles",
         description=
         """
         This endpoint allows an authenticated user to retrieve all matrimonial profile.
+        Pass `?fields=` (comma-separated, e.g. `full_name,age,images`) to receive only those fields; `id` is always included.
         """,
+        parameters=[
+            OpenApiParameter(name="fields", description="comma-separated fields to return (optional)",
+                             required=False),
+        ],
         responses={
             status.HTTP_200_OK: OpenApiResponse(
                 description="All Matrimonial Profile retrieved successfully",
@@ -37,25 +60,10 @@ class RetrieveAllMatrimonialProfilesView(GenericAPIView):
         }
     )
     def get(self, request):
-        all_matrimonial_profiles = MatrimonialProfile.objects.all().exclude(user=self.request.user)
-        data = [
-            {
-                "id": profile.id,
-                "full_name": profile.full_name,
-                "short_bio": profile.short_bio,
-                "gender": profile.gender,
-                "religion": profile.religion,
-                "country": profile.country,
-                "city": profile.city,
-                "education": profile.education,
-                "profession": profile.profession,
-                "income": profile.income,
-                "age": profile.age,
-                "height": profile.height,
-                "images": [image.image for image in profile.images.all()]
-            }.copy()
-            for profile in all_matrimonial_profiles
-        ]
+        fields = requested_fields(request, self.projections)
+        all_matrimonial_profiles = MatrimonialProfile.objects.exclude(user=self.request.user).order_by('-created')
+        all_matrimonial_profiles = project(all_matrimonial_profiles, self.projections, fields)
+        data = render_rows(all_matrimonial_profiles, self.projections, fields)
         return Response(
             {"message": "All matrimonial profiles fetched", "data": data, "status": "success"},
             status=status.HTTP_200_OK)
@@ -171,7 +179,12 @@ class RetrieveOtherUsersMatrimonialProfileView(GenericAPIView):
         description=
         """
         This endpoint allows an authenticated user to retrieve another user's matrimonial profile.
+        Pass `?fields=` (comma-separated, e.g. `full_name,age,images`) to receive only those fields; `id` is always included.
         """,
+        parameters=[
+            OpenApiParameter(name="fields", description="comma-separated fields to return (optional)",
+                             required=False),
+        ],
         responses={
             status.HTTP_200_OK: OpenApiResponse(
                 description="Matrimonial Profile retrieved successfully",
@@ -191,12 +204,15 @@ class RetrieveOtherUsersMatrimonialProfileView(GenericAPIView):
             return Response({"message": "Matrimonial Profile ID is required", "status": "failed"},
                             status=status.HTTP_400_BAD_REQUEST)
         else:
+            projections = self.serializer_class.projections
+            fields = requested_fields(request, projections)
             try:
-                matrimonial_profile = MatrimonialProfile.objects.get(id=matrimonial_profile_id)
+                matrimonial_profile = project(MatrimonialProfile.objects.all(), projections, fields).get(
+                    id=matrimonial_profile_id)
             except MatrimonialProfile.DoesNotExist:
                 return Response({"message": "Matrimonial profile does not exist", "status": "failed"},
                                 status=status.HTTP_404_NOT_FOUND)
-            serialized_profile = MatrimonialProfileSerializer(matrimonial_profile).data
+            serialized_profile = self.serializer_class(matrimonial_profile, fields=fields).data
             return Response({"message": "Matrimonial profile retrieved successfully", "data": serialized_profile,
                              "status": "success"}, status=status.HTTP_200_OK)
 
@@ -287,7 +303,9 @@ class BookmarkMatrimonialProfileListView(GenericAPIView):
     )
     def get(self, request):
         user = self.request.user
-        bookmarked_profiles = BookmarkedProfile.objects.select_related('user', 'profile').filter(user=user)
+        bookmarked_profiles = BookmarkedProfile.objects.select_related('user', 'profile').filter(
+            user=user
+        ).order_by('-created')
         if not bookmarked_profiles.exists():
             return Response({"message": "Customer has no profile bookmarked", "status": "failed"},
                             status=status.HTTP_404_NOT_FOUND)
@@ -318,7 +336,7 @@ class FilterMatrimonialProfilesView(GenericAPIView):
     serializer_class = MatrimonialProfileSerializer
     filterset_class = MatrimonialFilter
     filter_backends = [DjangoFilterBackend]
-    queryset = MatrimonialProfile.objects.all()
+    queryset = MatrimonialProfile.objects.order_by('-created')
     throttle_classes = [UserRateThrottle]
 
     @extend_schema(
@@ -398,8 +416,10 @@ class ConnectionRequestListCreateView(GenericAPIView):
         except MatrimonialProfile.DoesNotExist:
             return Response({"message": "User does not have a matrimonial profile", "status": "failed"},
                             status=status.HTTP_404_NOT_FOUND)
-        sent_requests = ConnectionRequest.objects.filter(sender=matrimonial_profile)
-        received_requests = ConnectionRequest.objects.filter(receiver=matrimonial_profile)
+        # Sender of every sent and receiver of every received request
+        identity_map(request).add(matrimonial_profile)
+        sent_requests = ConnectionRequest.objects.filter(sender=matrimonial_profile).order_by('-created')
+        received_requests = ConnectionRequest.objects.filter(receiver=matrimonial_profile).order_by('-created')
         serialized_sent_requests = self.serializer_class(sent_requests, many=True, context={"request": request}).data
         serialized_received_requests = self.serializer_class(received_requests, many=True,
                                                              context={"request": request}).data
@@ -554,21 +574,24 @@ class ConversationsListView(GenericAPIView):
             return Response({"message": "User does not have a matrimonial profile", "status": "failed"},
                             status=status.HTTP_404_NOT_FOUND)
         conversation_list = Conversation.objects.filter(Q(initiator=matrimonial_profile) |
-                                                        Q(receiver=matrimonial_profile))
+                                                        Q(receiver=matrimonial_profile)).order_by('-created')
 
         chat_groups = defaultdict(list)
         for chat in conversation_list:
-            other_user = chat.receiver if chat.initiator == user else chat.initiator
-            chat_groups[other_user].append(chat)
+            other_profile = chat.receiver_id if chat.initiator_id == matrimonial_profile.id else chat.initiator_id
+            chat_groups[other_profile].append(chat)
 
         # Extract the latest message from each chat group
         chats = []
         for user, user_chats in chat_groups.items():
-            latest_messages = [chat.messages.order_by('-created').first() for chat in user_chats]
-            latest_chat = max(latest_messages, key=lambda message: message.created)
-            chats.append(latest_chat.chat)  # Assuming you have a 'chat' field in your Message model.
-
-        # Serialize the chat list
+            latest_messages = [message for message in
+                               (chat.messages.order_by('-created').first() for chat in user_chats) if message]
+            if latest_messages:
+                latest_chat = max(latest_messages, key=lambda message: message.created)
+                chats.append(latest_chat.conversation)
+
+        # The viewer's profile is rendered alongside every conversation
+        identity_map(request).add(matrimonial_profile)
         serializer = self.serializer_class(instance=chats, many=True, context={"request": request})
 
         return Response(
@@ -599,7 +622,9 @@ class RetrieveConversationView(GenericAPIView):
     )
     def get(self, request, *args, **kwargs):
         convo_id = self.kwargs.get('convo_id')
-        conversation = Conversation.objects.filter(id=convo_id)
+        conversation = Conversation.objects.filter(id=convo_id).prefetch_related(
+            Prefetch('messages', queryset=Message.objects.order_by('-created'))
+        )
         if not conversation.exists():
             return Response({"message": "Conversation does not exist", "status": "success"},
                             status=status.HTTP_404_NOT_FOUND)
@@ -639,6 +664,7 @@ class CreateConversationView(GenericAPIView):
 
             # Create the chat
             conversation = serializer.save()
+            latest_message = conversation.messages.order_by('-created').first()
 
             data = {
                 "id": conversation.id,
@@ -647,8 +673,8 @@ class CreateConversationView(GenericAPIView):
                     "full_name": conversation.receiver.full_name,
                 },
                 "receiver_profile_image": conversation.receiver.matrimonial_profile.images.first() or "",
-                "message": conversation.messages.first().text,
-                "attachment": conversation.messages.first().attachment or ""
+                "message": latest_message.text,
+                "attachment": latest_message.attachment or ""
             }
             return Response({"message": "Message sent successfully", "data": data, "status": "success"},
                             status=status.HTTP_201_CREATED)
@@ -716,7 +742,7 @@ class ListFavouriteProfileView(GenericAPIView):
     )
     def get(self, request):
         user = self.request.user
-        favourite_profiles = FavouriteProfile.objects.select_related('profile').filter(user=user)
+        favourite_profiles = FavouriteProfile.objects.select_related('profile').filter(user=user).order_by('-created')
         if not favourite_profiles.exists():
             return Response({"message": "User has no favourite profiles", "status": "failed"},
                             status=status.HTTP_404_NOT_FOUND)